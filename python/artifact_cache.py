@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Artifact Cache for BeforeDoctor training
+Keys a training run by the hashes of its input files, trainer source and
+parameters, stores the models/JSON/Dart files it produced under that key and
+restores them on a later hit instead of retraining
+"""
+
+import os
+import ast
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+from importlib import metadata as importlib_metadata
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR.parent / "beforedoctor" / "assets" / "data"
+DEFAULT_CACHE_DIR = BASE_DIR / "processed" / "artifact_cache"
+DEFAULT_MAX_GB = 2.0
+DEFAULT_MAX_AGE_DAYS = 30
+
+# Library versions change what a trainer produces, so they are part of every key
+KEYED_PACKAGES = ("numpy", "pandas", "scipy", "scikit-learn", "joblib")
+
+# Per training run: files it reads, entry scripts it runs and files it writes.
+# Paths are relative to python/ (the trainers' working directory) and may be globs.
+# Local modules imported by the entry scripts are added to the key automatically.
+TRAINING_MODULE_ARTIFACTS = {
+    "cdc": {
+        "inputs": ["processed/cdc_training_data.csv"],
+        "sources": ["cdc_training/cdc_model_trainer.py"],
+        "outputs": [
+            "models/risk_assessment_model.pkl",
+            "models/action_recommendation_model.pkl",
+            "outputs/risk_assessment_evaluation.json",
+            "outputs/action_recommendation_evaluation.json",
+            "outputs/cdc_flutter_integration.dart",
+        ],
+    },
+    "voice": {
+        "inputs": [str(DATA_DIR / "pediatric_symptom_dataset_comprehensive.json")],
+        "sources": ["voice_training/voice_model_trainer.py"],
+        "outputs": [
+            "models/symptom_classifier.pkl",
+            "models/severity_classifier.pkl",
+            "models/symptom_linear_head.pkl",
+            "models/vectorizer.pkl",
+            "processed/voice_model_integration.dart",
+            "processed/voice_training_results.json",
+        ],
+    },
+    "treatment": {
+        "inputs": [str(DATA_DIR / "pediatric_symptom_treatment_large.json")],
+        "sources": ["treatment_training/treatment_model_trainer.py"],
+        "outputs": [
+            "models/treatment_recommender.pkl",
+            "models/treatment_priority.pkl",
+            "models/treatment_encoders.pkl",
+            "processed/treatment_lookup_index.json",
+            "processed/treatment_model_integration.dart",
+            "processed/treatment_training_results.json",
+        ],
+    },
+    "diseases_symptoms": {
+        # Downloaded from Hugging Face; keyed by the dataset's current commit sha
+        "inputs": [],
+        "hf_datasets": ["QuyenAnhDE/Diseases_Symptoms"],
+        "sources": ["diseases_symptoms_training/diseases_symptoms_trainer.py"],
+        "outputs": [
+            "diseases_symptoms_training/data/dataset_info.json",
+            "diseases_symptoms_training/processed/*.csv",
+            "diseases_symptoms_training/models/*.pkl",
+            "diseases_symptoms_training/outputs/*.json",
+            "diseases_symptoms_training/outputs/*.dart",
+        ],
+        "params": {"engine": "random_forest"},
+    },
+    "final_models": {
+        "inputs": [str(DATA_DIR / "pediatric_symptom_dataset_comprehensive.json"),
+                   str(DATA_DIR / "pediatric_symptom_treatment_large.json")],
+        "sources": ["train_final_models.py"],
+        "outputs": [
+            "models/symptom_classifier.pkl",
+            "models/symptom_vectorizer.pkl",
+            "models/treatment_recommender.pkl",
+            "models/treatment_encoders.pkl",
+            "models/treatment_cooccurrence.pkl",
+            "models/risk_assessor.pkl",
+            "models/risk_vectorizer.pkl",
+            "models/text_inference_graph.pkl",
+            "flutter_integration.dart",
+        ],
+    },
+}
+
+
+def _is_glob(pattern: str) -> bool:
+    return any(char in pattern for char in "*?[")
+
+
+def _local_imports(path: Path, root: Path) -> List[Path]:
+    """Modules imported by ``path`` that live next to it or directly under ``root``"""
+    try:
+        tree = ast.parse(path.read_text(encoding='utf-8'))
+    except (OSError, SyntaxError, UnicodeDecodeError):
+        return []
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    found = []
+    for name in sorted(names):
+        for directory in (path.parent, root):
+            candidate = directory / f"{name}.py"
+            if candidate.is_file():
+                found.append(candidate)
+                break
+    return found
+
+
+def _hf_dataset_revision(dataset_id: str) -> Optional[str]:
+    """Commit sha of a Hugging Face dataset, or None when it cannot be resolved"""
+    try:
+        from huggingface_hub import HfApi
+    except ImportError:
+        return None
+    try:
+        return HfApi().dataset_info(dataset_id).sha
+    except Exception as e:
+        logger.warning(f"⚠️ Could not resolve revision of {dataset_id}: {e}")
+        return None
+
+
+def _package_versions() -> Dict[str, Optional[str]]:
+    versions = {}
+    for package in KEYED_PACKAGES:
+        try:
+            versions[package] = importlib_metadata.version(package)
+        except importlib_metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+class ArtifactCache:
+    """Content-addressed store of training outputs
+
+    Output files are stored once per content hash under ``objects/``; each
+    key has a small manifest under ``entries/`` mapping output paths to
+    object hashes, so identical files produced by different runs are shared.
+    Input and source hashes are memoized by (size, mtime) so unchanged
+    multi-megabyte datasets are not re-read on every run.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, root=BASE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.root = Path(root)
+        self.objects_dir = self.cache_dir / "objects"
+        self.entries_dir = self.cache_dir / "entries"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self._digest_index_path = self.cache_dir / "file_digests.json"
+        self._digest_index = self._read_json(self._digest_index_path) or {}
+
+    @staticmethod
+    def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_json(path: Path, data: Dict[str, Any]):
+        # Write-then-rename so a crash never leaves a truncated manifest
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+
+    def _expand(self, patterns: Sequence[str]) -> List[Path]:
+        paths = []
+        for pattern in patterns:
+            if _is_glob(pattern):
+                paths.extend(sorted(p for p in self.root.glob(pattern) if p.is_file()))
+            else:
+                paths.append(self.root / pattern)
+        return paths
+
+    def _relative(self, path: Path) -> str:
+        # Relative to python/, so keys do not depend on where the repo is checked out
+        return Path(os.path.relpath(path, self.root)).as_posix()
+
+    def source_closure(self, sources: Sequence[str]) -> List[Path]:
+        """``sources`` plus every local module they import, transitively"""
+        pending = [path.resolve() for path in self._expand(sources)]
+        seen = set()
+        while pending:
+            path = pending.pop()
+            if path in seen:
+                continue
+            seen.add(path)
+            if path.suffix == '.py':
+                pending.extend(p.resolve() for p in _local_imports(path, self.root))
+        return sorted(seen)
+
+    def file_digest(self, path: Path) -> Optional[str]:
+        """SHA-256 of a file, or None if it does not exist"""
+        path = Path(path).resolve()
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        cached = self._digest_index.get(str(path))
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self._digest_index[str(path)] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                         'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def key(self, name: str, inputs: Sequence[str] = (), sources: Sequence[str] = (),
+            params: Optional[Dict[str, Any]] = None) -> str:
+        """Key over input and source file contents, params and library versions"""
+        description = {
+            'version': CACHE_VERSION,
+            'name': name,
+            'inputs': {self._relative(p): self.file_digest(p) for p in self._expand(inputs)},
+            'sources': {self._relative(p): self.file_digest(p) for p in self.source_closure(sources)},
+            'params': params or {},
+            'python': list(sys.version_info[:2]),
+            'packages': _package_versions(),
+        }
+        self._write_json(self._digest_index_path, self._digest_index)
+        encoded = json.dumps(description, sort_keys=True, default=str).encode('utf-8')
+        return f"{name}-{hashlib.sha256(encoded).hexdigest()[:32]}"
+
+    def module_key(self, module_name: str, params: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Key for a run described in ``TRAINING_MODULE_ARTIFACTS``
+
+        None when a remote dataset's revision cannot be resolved: the run
+        must then not be cached, or upstream changes would go unnoticed.
+        """
+        spec = TRAINING_MODULE_ARTIFACTS[module_name]
+        revisions = {dataset_id: _hf_dataset_revision(dataset_id) for dataset_id in spec.get('hf_datasets', [])}
+        if None in revisions.values():
+            logger.warning(f"⚠️ {module_name} is not cached: dataset revision unknown")
+            return None
+        params = {**spec.get('params', {}), **(params or {})}
+        if revisions:
+            params['hf_datasets'] = revisions
+        return self.key(module_name, spec['inputs'], spec['sources'], params)
+
+    def _object_path(self, sha256: str) -> Path:
+        return self.objects_dir / sha256[:2] / sha256[2:]
+
+    def _entry_path(self, key: str) -> Path:
+        return self.entries_dir / f"{key}.json"
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        manifest = self._read_json(self._entry_path(key))
+        if manifest is None:
+            return None
+        if not all(self._object_path(f['sha256']).exists() for f in manifest['files']):
+            logger.warning(f"⚠️ Cache entry {key} is missing objects, dropping it")
+            self._entry_path(key).unlink(missing_ok=True)
+            return None
+        return manifest
+
+    def restore(self, key: str) -> Optional[Dict[str, Any]]:
+        """Copy a hit's files back into place; returns its manifest, or None on a miss"""
+        manifest = self.lookup(key)
+        if manifest is None:
+            return None
+        for entry in manifest['files']:
+            destination = self.root / entry['path']
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            tmp = destination.with_name(destination.name + ".restoring")
+            shutil.copyfile(self._object_path(entry['sha256']), tmp)
+            os.replace(tmp, destination)
+        manifest['last_used'] = time.time()
+        self._write_json(self._entry_path(key), manifest)
+        logger.info(f"♻️ Restored {len(manifest['files'])} artifacts for {manifest['name']} from cache ({key})")
+        return manifest
+
+    def store(self, key: str, name: str, outputs: Sequence[str],
+              metadata: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Store the files matching ``outputs`` under ``key``"""
+        files = []
+        for path in self._expand(outputs):
+            sha256 = self.file_digest(path)
+            if sha256 is None:
+                continue
+            target = self._object_path(sha256)
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                tmp = target.with_name(target.name + ".tmp")
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, target)
+            files.append({'path': path.relative_to(self.root).as_posix(), 'sha256': sha256,
+                          'bytes': path.stat().st_size})
+        self._write_json(self._digest_index_path, self._digest_index)
+
+        if not files:
+            logger.warning(f"⚠️ No artifacts found for {name}, nothing cached")
+            return None
+        now = time.time()
+        manifest = {
+            'version': CACHE_VERSION,
+            'key': key,
+            'name': name,
+            'created': now,
+            'last_used': now,
+            'files': files,
+            'bytes': sum(f['bytes'] for f in files),
+            'metadata': metadata or {},
+        }
+        self._write_json(self._entry_path(key), manifest)
+        logger.info(f"💾 Cached {len(files)} artifacts for {name} ({manifest['bytes'] / 1024:.1f} KB, {key})")
+        return manifest
+
+    def _manifests(self) -> List[Dict[str, Any]]:
+        manifests = [self._read_json(path) for path in self.entries_dir.glob("*.json")]
+        return [m for m in manifests if m]
+
+    @staticmethod
+    def _object_bytes(manifests) -> Dict[str, int]:
+        return {f['sha256']: f['bytes'] for m in manifests for f in m['files']}
+
+    def evict(self, max_bytes: Optional[int] = None, max_age_days: Optional[float] = None) -> Dict[str, Any]:
+        """Drop entries unused for ``max_age_days``, then least recently used ones
+        until the shared objects fit in ``max_bytes``; unreferenced objects are deleted"""
+        manifests = sorted(self._manifests(), key=lambda m: m['last_used'])
+        removed = []
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * 86400
+            removed = [m for m in manifests if m['last_used'] < cutoff]
+            manifests = [m for m in manifests if m['last_used'] >= cutoff]
+        if max_bytes is not None:
+            while manifests and sum(self._object_bytes(manifests).values()) > max_bytes:
+                removed.append(manifests.pop(0))
+        for manifest in removed:
+            self._entry_path(manifest['key']).unlink(missing_ok=True)
+
+        referenced = self._object_bytes(manifests)
+        freed = 0
+        for path in self.objects_dir.glob("*/*"):
+            if path.parent.name + path.name not in referenced:
+                freed += path.stat().st_size
+                path.unlink()
+
+        stats = {
+            'entries_removed': len(removed),
+            'bytes_freed': freed,
+            'entries': len(manifests),
+            'bytes': sum(referenced.values()),
+        }
+        if removed or freed:
+            logger.info(f"🧹 Artifact cache eviction: {stats}")
+        return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Inspect or evict the training artifact cache")
+    parser.add_argument('--max-gb', type=float, default=DEFAULT_MAX_GB)
+    parser.add_argument('--max-age-days', type=float, default=DEFAULT_MAX_AGE_DAYS)
+    args = parser.parse_args()
+
+    cache = ArtifactCache()
+    print(json.dumps(cache.evict(int(args.max_gb * 1024 ** 3), args.max_age_days), indent=2))
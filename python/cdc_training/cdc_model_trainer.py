@@ -15,6 +15,12 @@ import json
 import os
 import logging
 from datetime import datetime
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from training_scheduler import training_n_jobs
+from training_progress import progress_reporter, fit_forest_with_progress
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -83,10 +89,11 @@ class CDCModelTrainer:
         risk_model = RandomForestClassifier(
             n_estimators=100,
             max_depth=10,
-            random_state=42
+            random_state=42,
+            n_jobs=training_n_jobs()
         )
         
-        risk_model.fit(X_train, y_train)
+        fit_forest_with_progress(risk_model, X_train, y_train)
         
         # Evaluate model
         y_pred = risk_model.predict(X_test)
@@ -129,10 +136,11 @@ class CDCModelTrainer:
         action_model = RandomForestClassifier(
             n_estimators=100,
             max_depth=10,
-            random_state=42
+            random_state=42,
+            n_jobs=training_n_jobs()
         )
         
-        action_model.fit(X_train, y_train)
+        fit_forest_with_progress(action_model, X_train, y_train)
         
         # Evaluate model
         y_pred = action_model.predict(X_test)
@@ -283,22 +291,31 @@ class CDCActionRecommender {
         """Main training pipeline"""
         logger.info("Starting CDC model training pipeline...")
         
+        progress = progress_reporter()
+        
         # Load training data
+        progress.phase("load_data")
         df = self.load_training_data()
         if df is None:
             logger.error("Failed to load training data")
             return False
         
         # Prepare features
+        progress.phase("prepare_features")
         X, y_risk, y_action = self.prepare_features(df)
         
         # Train risk assessment model
+        progress.phase("train_risk_assessment")
         risk_model, risk_accuracy = self.train_risk_assessment_model(X, y_risk)
+        progress.metric("risk_assessment_accuracy", risk_accuracy)
         
         # Train action recommendation model
+        progress.phase("train_action_recommendation")
         action_model, action_accuracy = self.train_action_recommendation_model(X, y_action)
+        progress.metric("action_recommendation_accuracy", action_accuracy)
         
         # Create Flutter integration code
+        progress.phase("flutter_integration")
         self.create_flutter_integration_code()
         
         # Create training summary
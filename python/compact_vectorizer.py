@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Compact TF-IDF Vectorizer Serialization for BeforeDoctor
+Pickles a fitted vectorizer as a sorted UTF-8 term table plus a float32 IDF
+array, without sklearn's ``stop_words_`` set or vocabulary dict, and rebuilds
+a transform-capable object on load
+"""
+
+import io
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+import joblib
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import normalize
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# CountVectorizer parameters that shape tokenization; everything else
+# (max_df, min_df, max_features) is already baked into the fitted vocabulary
+ANALYZER_PARAMS = ('input', 'encoding', 'decode_error', 'strip_accents', 'lowercase', 'preprocessor',
+                   'tokenizer', 'stop_words', 'token_pattern', 'ngram_range', 'analyzer')
+
+
+class CompactTfidfVectorizer(BaseEstimator, TransformerMixin):
+    """Transform-only TF-IDF vectorizer over a sorted term table
+
+    ``terms`` is sorted so a whole batch of tokens is looked up with one
+    ``np.searchsorted``; ``columns`` maps sorted position to feature column
+    when the source vocabulary was not in sorted order. Output matches the
+    source vectorizer's ``transform`` up to float32 rounding of ``idf``.
+    """
+
+    def __init__(self, terms, idf=None, columns=None, analyzer_params=None,
+                 norm='l2', sublinear_tf=False, binary=False, dtype=np.float64):
+        self.terms = terms
+        self.idf = idf
+        self.columns = columns
+        self.analyzer_params = analyzer_params
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.binary = binary
+        self.dtype = dtype
+
+    @classmethod
+    def from_vocabulary(cls, vocabulary: Dict[str, int], **kwargs) -> 'CompactTfidfVectorizer':
+        names = np.array(list(vocabulary), dtype=str)
+        positions = np.array(list(vocabulary.values()), dtype=np.int32)
+        order = np.argsort(names, kind='stable')
+        columns = positions[order]
+        if np.array_equal(columns, np.arange(len(columns))):
+            columns = None
+        return cls(names[order], columns=columns, **kwargs)
+
+    def __getstate__(self):
+        encoded = [term.encode('utf-8') for term in self.terms.tolist()]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return {
+            'format_version': FORMAT_VERSION,
+            'terms': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+            'term_offsets': offsets,
+            'idf': None if self.idf is None else np.asarray(self.idf, dtype=np.float32),
+            'columns': None if self.columns is None else np.asarray(self.columns, dtype=np.int32),
+            'analyzer_params': self.analyzer_params,
+            'norm': self.norm,
+            'sublinear_tf': self.sublinear_tf,
+            'binary': self.binary,
+            'dtype': np.dtype(self.dtype).str,
+        }
+
+    def __setstate__(self, state):
+        blob = state['terms'].tobytes()
+        offsets = state['term_offsets']
+        terms = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        self.__init__(np.array(terms, dtype=str), idf=state['idf'], columns=state['columns'],
+                      analyzer_params=state['analyzer_params'], norm=state['norm'],
+                      sublinear_tf=state['sublinear_tf'], binary=state['binary'],
+                      dtype=np.dtype(state['dtype']))
+
+    @property
+    def n_features(self) -> int:
+        return len(self.terms)
+
+    def _analyzer(self):
+        # Rebuilt from the parameters rather than pickled: it is a closure
+        analyzer = self.__dict__.get('_analyze')
+        if analyzer is None:
+            analyzer = self._analyze = CountVectorizer(**(self.analyzer_params or {})).build_analyzer()
+        return analyzer
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, raw_documents):
+        if isinstance(raw_documents, str):
+            raise ValueError("Iterable over raw text documents expected, string object received.")
+        analyze = self._analyzer()
+        tokens, lengths = [], []
+        for document in raw_documents:
+            document_tokens = analyze(document)
+            tokens.extend(document_tokens)
+            lengths.append(len(document_tokens))
+
+        rows = np.repeat(np.arange(len(lengths), dtype=np.int32), lengths)
+        cols = np.zeros(0, dtype=np.int32)
+        if tokens and self.n_features:
+            tokens = np.asarray(tokens, dtype=str)
+            positions = np.minimum(np.searchsorted(self.terms, tokens), self.n_features - 1)
+            found = self.terms[positions] == tokens
+            cols = positions[found] if self.columns is None else self.columns[positions[found]]
+            rows = rows[found]
+        else:
+            rows = rows[:0]
+
+        # Duplicate (row, col) pairs are summed into term counts
+        X = sparse.csr_matrix((np.ones(len(cols), dtype=np.float64), (rows, cols)),
+                              shape=(len(lengths), self.n_features))
+        if self.binary:
+            X.data[:] = 1
+        if self.sublinear_tf:
+            np.log(X.data, out=X.data)
+            X.data += 1
+        if self.idf is not None:
+            X.data *= self.idf[X.indices]
+        if self.norm:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X.astype(self.dtype, copy=False)
+
+    def get_feature_names_out(self, input_features=None):
+        if self.columns is None:
+            return self.terms.astype(object)
+        names = np.empty(self.n_features, dtype=object)
+        names[self.columns] = self.terms
+        return names
+
+
+def _analyzer_params(vectorizer: CountVectorizer) -> Dict[str, Any]:
+    params = vectorizer.get_params(deep=False)
+    return {name: params[name] for name in ANALYZER_PARAMS if name in params}
+
+
+def compact_vectorizer(model):
+    """Compact form of a fitted vectorizer, or of the vectorizer steps of a Pipeline
+
+    Handles ``TfidfVectorizer``, ``CountVectorizer`` and ``TfidfProjection``
+    (count vectorizer + TF-IDF transformer). Anything without a vocabulary,
+    such as ``HashingVectorizer`` or a classifier, is returned unchanged.
+    """
+    if isinstance(model, Pipeline):
+        return Pipeline([(name, compact_vectorizer(step)) for name, step in model.steps])
+    if isinstance(model, CompactTfidfVectorizer):
+        return model
+
+    if isinstance(model, CountVectorizer) and hasattr(model, 'vocabulary_'):
+        counter, tfidf = model, model if isinstance(model, TfidfVectorizer) else None
+    elif isinstance(getattr(model, 'vectorizer', None), CountVectorizer) and hasattr(model, 'tfidf'):
+        counter, tfidf = model.vectorizer, model.tfidf
+    else:
+        return model
+
+    vocabulary = getattr(counter, 'vocabulary_', None) or counter.vocabulary
+    use_idf = tfidf is not None and tfidf.use_idf
+    return CompactTfidfVectorizer.from_vocabulary(
+        vocabulary,
+        idf=np.asarray(tfidf.idf_, dtype=np.float32) if use_idf else None,
+        analyzer_params=_analyzer_params(counter),
+        norm=tfidf.norm if tfidf is not None else None,
+        sublinear_tf=tfidf.sublinear_tf if tfidf is not None else False,
+        binary=counter.binary,
+        dtype=counter.dtype if tfidf is None else getattr(tfidf, 'dtype', np.float64),
+    )
+
+
+def _measure(model, sample_texts: Optional[Sequence[str]]) -> Tuple[Dict[str, Any], Any]:
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    size = buffer.tell()
+
+    # Cold load includes the first transform, where the analyzer is rebuilt
+    start = time.perf_counter()
+    buffer.seek(0)
+    loaded = joblib.load(buffer)
+    if sample_texts:
+        loaded.transform(list(sample_texts[:1]))
+    load_ms = (time.perf_counter() - start) * 1000
+    return {'bytes': size, 'cold_load_ms': round(load_ms, 3)}, loaded
+
+
+def compare_serialization(original, compact, sample_texts: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Pickle size, cold-load time and output drift of the original vs the compact form"""
+    original_stats, original_loaded = _measure(original, sample_texts)
+    compact_stats, compact_loaded = _measure(compact, sample_texts)
+    results = {'original': original_stats, 'compact': compact_stats,
+               'size_ratio': round(compact_stats['bytes'] / max(original_stats['bytes'], 1), 4)}
+    if sample_texts:
+        texts = list(sample_texts)
+        before = _vectorize(original_loaded, texts)
+        after = _vectorize(compact_loaded, texts)
+        if before is not None and after is not None:
+            results['max_abs_diff'] = float(abs(before - after).max()) if before.nnz or after.nnz else 0.0
+    return results
+
+
+def _vectorize(model, texts):
+    """Feature matrix of the first (vectorizer) step of a model"""
+    if isinstance(model, Pipeline):
+        model = model.steps[0][1]
+    if not hasattr(model, 'transform'):
+        return None
+    return sparse.csr_matrix(model.transform(texts))
+
+
+def dump_compact(model, path, sample_texts: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Save the compact form of ``model`` to ``path`` and report the savings"""
+    path = Path(path)
+    compact = compact_vectorizer(model)
+    joblib.dump(compact, path)
+    report = compare_serialization(model, compact, sample_texts)
+    report['path'] = str(path)
+    logger.info(f"💾 Compact vectorizer saved: {path} ({report['original']['bytes'] / 1024:.1f} KB -> "
+                f"{report['compact']['bytes'] / 1024:.1f} KB, cold load {report['original']['cold_load_ms']:.1f} ms -> "
+                f"{report['compact']['cold_load_ms']:.1f} ms)")
+    return report
+
+
+if __name__ == "__main__":
+    import json
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Rewrite saved vectorizer pickles in compact form")
+    parser.add_argument('paths', nargs='+', help="Pickled vectorizers or Pipelines")
+    parser.add_argument('--sample', default=None, help="Text file with one sample document per line")
+    args = parser.parse_args()
+
+    sample = None
+    if args.sample:
+        with open(args.sample, 'r', encoding='utf-8') as f:
+            sample = [line.strip() for line in f if line.strip()]
+
+    for model_path in args.paths:
+        print(json.dumps(dump_compact(joblib.load(model_path), model_path, sample), indent=2))
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Co-occurrence Treatment Recommender for BeforeDoctor
+Sparse (symptom, age band, severity) x treatment count matrix with additive
+smoothing, scored for a whole batch of queries with one sparse product
+"""
+
+import io
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import joblib
+from scipy import sparse
+
+from similarity_index import _top_k_rows
+
+logger = logging.getLogger(__name__)
+
+FEATURE_GROUPS = ('symptom', 'age_band', 'severity')
+
+
+class CooccurrenceRecommender:
+    """Naive Bayes over co-occurrence counts, with smoothing ``alpha``
+
+    ``score(t | s, a, v) ∝ log P(t) + Σ_g log P(g-value | t)`` where
+    ``P(f | t) = (C[f, t] + alpha) / (n_t + alpha * |V_g|)``. Writing
+    ``log(C + alpha) = log(alpha) + log1p(C / alpha)`` keeps the feature part
+    sparse, so a batch of one-hot queries is scored as ``Q @ L + bias``.
+    Counts can be added at any time with :meth:`partial_fit`.
+    """
+
+    def __init__(self, alpha: float = 0.5):
+        self.alpha = alpha
+        self.vocabularies: Dict[str, Dict[str, int]] = {group: {} for group in FEATURE_GROUPS}
+        self.treatments: Dict[str, int] = {}
+        self.treatment_names: List[str] = []
+        self.counts = sparse.csr_matrix((0, 0), dtype=np.float64)
+        self.treatment_counts = np.zeros(0, dtype=np.float64)
+        self._scoring = None
+
+    def __getstate__(self):
+        # The scoring cache is derived from the counts; keep pickles minimal
+        state = self.__dict__.copy()
+        state['_scoring'] = None
+        return state
+
+    # Feature ids are laid out group by group: [symptoms | age bands | severities]
+    def _group_offsets(self) -> Dict[str, int]:
+        offsets, total = {}, 0
+        for group in FEATURE_GROUPS:
+            offsets[group] = total
+            total += len(self.vocabularies[group])
+        return offsets
+
+    @property
+    def n_features(self) -> int:
+        return sum(len(v) for v in self.vocabularies.values())
+
+    def _feature_ids(self, group: str, values: Sequence[str], grow: bool) -> np.ndarray:
+        vocabulary = self.vocabularies[group]
+        ids = np.empty(len(values), dtype=np.int64)
+        for i, value in enumerate(values):
+            value = str(value)
+            code = vocabulary.get(value)
+            if code is None:
+                if grow:
+                    code = vocabulary[value] = len(vocabulary)
+                else:
+                    code = -1
+            ids[i] = code
+        return ids
+
+    def partial_fit(self, symptoms: Sequence[str], age_bands: Sequence[str],
+                    severities: Sequence[str], treatments: Sequence[str]) -> 'CooccurrenceRecommender':
+        """Add one co-occurrence per (symptom, age band, severity, treatment) row"""
+        old_sizes = {group: len(self.vocabularies[group]) for group in FEATURE_GROUPS}
+        local = {group: self._feature_ids(group, values, grow=True)
+                 for group, values in zip(FEATURE_GROUPS, (symptoms, age_bands, severities))}
+        treatment_ids = np.empty(len(treatments), dtype=np.int64)
+        for i, treatment in enumerate(treatments):
+            treatment = str(treatment)
+            code = self.treatments.get(treatment)
+            if code is None:
+                code = self.treatments[treatment] = len(self.treatment_names)
+                self.treatment_names.append(treatment)
+            treatment_ids[i] = code
+
+        # New vocabulary values shift later groups, so re-lay existing rows out
+        offsets = self._group_offsets()
+        shape = (self.n_features, len(self.treatment_names))
+        if self.counts.shape[0]:
+            old = self.counts.tocoo()
+            row_map = np.concatenate([
+                np.arange(old_sizes[group]) + offsets[group] for group in FEATURE_GROUPS
+            ])
+            existing = sparse.coo_matrix((old.data, (row_map[old.row], old.col)), shape=shape)
+        else:
+            existing = sparse.coo_matrix(shape, dtype=np.float64)
+
+        rows = np.concatenate([local[group] + offsets[group] for group in FEATURE_GROUPS])
+        cols = np.tile(treatment_ids, len(FEATURE_GROUPS))
+        added = sparse.coo_matrix((np.ones(len(rows)), (rows, cols)), shape=shape)
+        self.counts = (existing.tocsr() + added.tocsr()).tocsr()
+
+        treatment_counts = np.zeros(len(self.treatment_names))
+        treatment_counts[:len(self.treatment_counts)] = self.treatment_counts
+        np.add.at(treatment_counts, treatment_ids, 1)
+        self.treatment_counts = treatment_counts
+        self._scoring = None
+        return self
+
+    def fit(self, symptoms, age_bands, severities, treatments) -> 'CooccurrenceRecommender':
+        """Discard existing counts and count the given rows"""
+        fresh = type(self)(alpha=self.alpha)
+        self.__dict__.update(fresh.__dict__)
+        return self.partial_fit(symptoms, age_bands, severities, treatments)
+
+    def _scoring_terms(self) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """Cached sparse ``log1p(C / alpha)`` and the dense per-treatment bias"""
+        if self._scoring is None:
+            alpha = self.alpha
+            log_counts = self.counts.copy()
+            log_counts.data = np.log1p(log_counts.data / alpha)
+            n_t = self.treatment_counts
+            bias = np.log(n_t + alpha) - np.log(n_t.sum() + alpha * len(n_t))
+            for group in FEATURE_GROUPS:
+                bias += np.log(alpha) - np.log(n_t + alpha * max(len(self.vocabularies[group]), 1))
+            self._scoring = (log_counts.tocsr(), bias)
+        return self._scoring
+
+    def _query_matrix(self, symptoms, age_bands, severities) -> sparse.csr_matrix:
+        offsets = self._group_offsets()
+        n_queries = len(symptoms)
+        rows, cols = [], []
+        for group, values in zip(FEATURE_GROUPS, (symptoms, age_bands, severities)):
+            ids = self._feature_ids(group, values, grow=False)
+            known = ids >= 0
+            rows.append(np.nonzero(known)[0])
+            cols.append(ids[known] + offsets[group])
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        return sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_queries, self.n_features))
+
+    def score_batch(self, symptoms, age_bands, severities) -> np.ndarray:
+        """Log-scores of every treatment for every query, shape ``(n_queries, n_treatments)``"""
+        log_counts, bias = self._scoring_terms()
+        queries = self._query_matrix(symptoms, age_bands, severities)
+        return np.asarray((queries @ log_counts).todense()) + bias
+
+    def recommend_batch(self, symptoms, age_bands, severities, top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Top-k treatments per query with normalized probabilities"""
+        scores = self.score_batch(symptoms, age_bands, severities)
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        indices, top = _top_k_rows(probabilities, top_k)
+        return [
+            [{'treatment': self.treatment_names[i], 'score': round(float(p), 4)} for i, p in zip(row_i, row_p)]
+            for row_i, row_p in zip(indices, top)
+        ]
+
+    def recommend(self, symptom: str, age_band: str, severity: str = 'unknown', top_k: int = 5) -> List[Dict[str, Any]]:
+        return self.recommend_batch([symptom], [age_band], [severity], top_k)[0]
+
+    def predict(self, symptoms, age_bands, severities) -> List[str]:
+        scores = self.score_batch(symptoms, age_bands, severities)
+        return [self.treatment_names[i] for i in scores.argmax(axis=1)]
+
+    @classmethod
+    def from_treatment_store(cls, dataset, alpha: float = 0.5) -> 'CooccurrenceRecommender':
+        """Count every medication and home-care item of every record in a ``CompactTreatmentDataset``"""
+        symptoms, age_bands, treatments = [], [], []
+        for field in ('medication_name', 'home_care'):
+            record_index, codes = dataset.explode(field)
+            symptom_table = np.asarray(dataset.strings('symptom'), dtype=object)
+            age_table = np.asarray(dataset.strings('age_group'), dtype=object)
+            item_table = np.asarray(dataset.strings(field), dtype=object)
+            symptoms.append(symptom_table[dataset.codes('symptom')[record_index]])
+            age_bands.append(age_table[dataset.codes('age_group')[record_index]])
+            treatments.append(item_table[np.asarray(codes)])
+        symptoms, age_bands, treatments = (np.concatenate(v) for v in (symptoms, age_bands, treatments))
+        severities = np.full(len(symptoms), 'unknown', dtype=object)
+        return cls(alpha=alpha).fit(symptoms, age_bands, severities, treatments)
+
+
+def _pickled_bytes(obj) -> int:
+    buffer = io.BytesIO()
+    joblib.dump(obj, buffer)
+    return buffer.tell()
+
+
+def compare_with_classifier(recommender: CooccurrenceRecommender, classifier, encoded_queries,
+                            symptoms, age_bands, severities) -> Dict[str, Any]:
+    """Model size and batch latency vs an sklearn classifier on the same queries"""
+    start = time.perf_counter()
+    recommender.recommend_batch(symptoms, age_bands, severities, top_k=5)
+    cooccurrence_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    classifier.predict_proba(encoded_queries)
+    classifier_ms = (time.perf_counter() - start) * 1000
+
+    results = {
+        'queries': len(symptoms),
+        'cooccurrence': {'bytes': _pickled_bytes(recommender), 'batch_ms': round(cooccurrence_ms, 3),
+                         'nonzeros': int(recommender.counts.nnz)},
+        'classifier': {'bytes': _pickled_bytes(classifier), 'batch_ms': round(classifier_ms, 3)}
+    }
+    logger.info(f"⏱️ Co-occurrence recommender vs classifier: {results}")
+    return results
+
+
+def train_cooccurrence_recommender(data, models_dir) -> Tuple[CooccurrenceRecommender, Optional[Dict[str, Any]]]:
+    """Fit on a treatment store, save ``treatment_cooccurrence.pkl`` and compare
+    with the RandomForest recommender when one was saved next to it;
+    returns the recommender and the comparison (None when skipped)
+
+    The comparison only uses records whose symptom, age group and severity
+    the forest's encoders know; records the forest never saw (e.g. without
+    a treatment) would make ``LabelEncoder.transform`` raise.
+    """
+    models_dir = Path(models_dir)
+
+    # Counts every medication and home-care item, not one class per record
+    recommender = CooccurrenceRecommender.from_treatment_store(data)
+    model_path = models_dir / "treatment_cooccurrence.pkl"
+    joblib.dump(recommender, model_path)
+    logger.info(f"💾 Saved co-occurrence recommender to {model_path} "
+                f"({recommender.counts.nnz} non-zero counts, {len(recommender.treatment_names)} treatments)")
+
+    forest_path = models_dir / "treatment_recommender.pkl"
+    encoders_path = models_dir / "treatment_encoders.pkl"
+    if not (forest_path.exists() and encoders_path.exists()):
+        return recommender, None
+
+    encoders = joblib.load(encoders_path)
+    symptoms = np.asarray(data.categorical('symptom'), dtype=object)
+    ages = np.asarray(data.categorical('age_group'), dtype=object)
+    severities = np.full(len(symptoms), 'unknown', dtype=object)
+    known = (np.isin(symptoms, encoders['symptom_encoder'].classes_)
+             & np.isin(ages, encoders['age_encoder'].classes_)
+             & np.isin(severities, encoders['severity_encoder'].classes_))
+    if not known.any():
+        logger.warning("⚠️ No records share the RandomForest encoders' classes, skipping comparison")
+        return recommender, None
+
+    symptoms, ages, severities = symptoms[known], ages[known], severities[known]
+    encoded = np.column_stack([
+        encoders['symptom_encoder'].transform(symptoms),
+        encoders['age_encoder'].transform(ages),
+        encoders['severity_encoder'].transform(severities)
+    ])
+    comparison = compare_with_classifier(recommender, joblib.load(forest_path), encoded,
+                                         symptoms, ages, severities)
+    return recommender, comparison
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Zero-copy dataset ingestion for BeforeDoctor
+Links Kaggle downloads into training directories instead of copying them and
+reads CSV members straight out of zip bundles without extracting to disk
+"""
+
+import os
+import io
+import shutil
+import zipfile
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+logger = logging.getLogger(__name__)
+
+
+class ZipMember:
+    """A CSV (or other) member inside a zip archive
+
+    Picklable, so it can be handed to profiler worker processes, and usable
+    anywhere a source path is expected through :func:`open_source`.
+    """
+
+    def __init__(self, zip_path: Union[str, Path], member: str):
+        self.zip_path = str(zip_path)
+        self.member = member
+
+    @property
+    def name(self) -> str:
+        return Path(self.member).name
+
+    @property
+    def suffix(self) -> str:
+        return Path(self.member).suffix
+
+    def __eq__(self, other):
+        return isinstance(other, ZipMember) and (self.zip_path, self.member) == (other.zip_path, other.member)
+
+    def __hash__(self):
+        return hash((self.zip_path, self.member))
+
+    def __str__(self):
+        return f"{self.zip_path}!{self.member}"
+
+    __repr__ = __str__
+
+
+@contextmanager
+def open_source(source) -> Iterator[Union[str, io.BufferedIOBase]]:
+    """Yield something ``pd.read_csv`` can consume for a path or ZipMember"""
+    if isinstance(source, ZipMember):
+        with zipfile.ZipFile(source.zip_path, 'r') as archive:
+            with archive.open(source.member, 'r') as stream:
+                yield stream
+    else:
+        yield source
+
+
+def link_or_copy(source: Path, dest: Path) -> str:
+    """Place ``source`` at ``dest`` without copying bytes when possible
+
+    Tries a hardlink, then a symlink, and only falls back to a copy when the
+    filesystem supports neither. Returns the method used. Linked files share
+    storage with the kagglehub cache, so consumers must treat them as
+    read-only.
+    """
+    source, dest = Path(source), Path(dest)
+    if dest.exists() or dest.is_symlink():
+        if dest.is_file() and os.path.samefile(source, dest):
+            return 'existing'
+        dest.unlink()
+
+    try:
+        os.link(source, dest)
+        return 'hardlink'
+    except OSError:
+        pass
+    try:
+        os.symlink(source.resolve(), dest)
+        return 'symlink'
+    except OSError:
+        pass
+    shutil.copy2(source, dest)
+    return 'copy'
+
+
+def link_tree(source: Path, dest_dir: Path) -> dict:
+    """Link every file under ``source`` (a file or directory) into ``dest_dir``
+
+    Returns a count of files per method used.
+    """
+    source, dest_dir = Path(source), Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    methods = {}
+
+    if source.is_file():
+        pairs = [(source, dest_dir / source.name)]
+    else:
+        pairs = []
+        for item in source.rglob("*"):
+            if item.is_file():
+                target = dest_dir / item.relative_to(source)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                pairs.append((item, target))
+
+    for item, target in pairs:
+        method = link_or_copy(item, target)
+        methods[method] = methods.get(method, 0) + 1
+
+    logger.info(f"Linked {len(pairs)} files into {dest_dir}: {methods}")
+    return methods
+
+
+def iter_csv_sources(data_dir: Path) -> Iterator[Union[Path, ZipMember]]:
+    """Yield every CSV under ``data_dir``, including members of zip bundles"""
+    for file_path in sorted(Path(data_dir).rglob("*")):
+        if not file_path.is_file():
+            continue
+        suffix = file_path.suffix.lower()
+        if suffix == '.csv':
+            yield file_path
+        elif suffix == '.zip':
+            try:
+                with zipfile.ZipFile(file_path, 'r') as archive:
+                    members = [info.filename for info in archive.infolist()
+                               if not info.is_dir() and info.filename.lower().endswith('.csv')]
+            except zipfile.BadZipFile as e:
+                logger.error(f"Cannot read zip bundle {file_path}: {e}")
+                continue
+            for member in members:
+                yield ZipMember(file_path, member)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Streaming CSV Profiler for BeforeDoctor datasets
+Single-pass, chunked profiling (rows, nulls, dtypes, distinct estimates, samples)
+with files profiled in parallel across processes
+"""
+
+import os
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+from dataset_ingest import open_source
+
+logger = logging.getLogger(__name__)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter fed with pandas Series
+
+    Values are hashed with ``pd.util.hash_pandas_object`` and registers are
+    updated with numpy, so a chunk is absorbed without a Python-level loop.
+    With the default precision (14) the standard error is about 0.8% and each
+    counter uses 16 KB regardless of the number of values seen.
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_series(self, series: pd.Series):
+        """Absorb all non-null values of a Series"""
+        series = series.dropna()
+        if series.empty:
+            return
+        hashes = pd.util.hash_pandas_object(series, index=False).to_numpy(dtype=np.uint64)
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.int64)
+        rest = hashes & np.uint64((1 << width) - 1)
+        # rank = position of the leftmost 1-bit within the remaining bits
+        _, exponent = np.frexp(rest.astype(np.float64))
+        rank = np.where(rest == 0, width + 1, width - exponent + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: 'HyperLogLog'):
+        """Merge another counter with the same precision"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        """Estimated number of distinct values"""
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+def _merge_dtype(current: str, new: str) -> str:
+    """Combine the dtypes a column had in different chunks"""
+    if current is None or current == new:
+        return new
+    numeric = {'int64', 'float64', 'bool'}
+    if current in numeric and new in numeric:
+        return 'float64'
+    return 'object'
+
+
+def profile_csv(source, chunksize: int = 100_000, sample_rows: int = 3,
+                hll_precision: int = 14) -> Dict[str, Any]:
+    """Profile a CSV in one chunked pass with bounded memory
+
+    ``source`` is a path, a ``dataset_ingest.ZipMember`` (streamed out of the
+    zip without extracting) or anything ``pd.read_csv`` accepts. Memory is
+    bound by ``chunksize`` rows plus one HyperLogLog counter per column.
+    """
+    rows = 0
+    columns: List[str] = []
+    missing: Dict[str, int] = {}
+    dtypes: Dict[str, str] = {}
+    distinct: Dict[str, HyperLogLog] = {}
+    sample = []
+
+    with open_source(source) as handle:
+        for chunk in pd.read_csv(handle, chunksize=chunksize, low_memory=False):
+            if not columns:
+                columns = [str(col) for col in chunk.columns]
+                missing = {col: 0 for col in columns}
+                distinct = {col: HyperLogLog(hll_precision) for col in columns}
+                sample = json.loads(chunk.head(sample_rows).to_json(orient='records'))
+
+            rows += len(chunk)
+            for col, count in chunk.isnull().sum().items():
+                missing[str(col)] += int(count)
+            for col, dtype in chunk.dtypes.items():
+                dtypes[str(col)] = _merge_dtype(dtypes.get(str(col)), str(dtype))
+            for col in chunk.columns:
+                distinct[str(col)].add_series(chunk[col])
+
+    return {
+        "rows": rows,
+        "columns": columns,
+        "shape": [rows, len(columns)],
+        "dtypes": dtypes,
+        "missing_values": missing,
+        "unique_values": {col: min(counter.count(), rows) for col, counter in distinct.items()},
+        "unique_values_method": "hyperloglog",
+        "sample_data": sample,
+    }
+
+
+def _profile_worker(args):
+    source, kwargs = args
+    try:
+        return source, profile_csv(source, **kwargs), None
+    except Exception as e:
+        return source, None, str(e)
+
+
+def profile_files(sources: List, max_workers: int = None, **kwargs) -> Dict[Any, Dict[str, Any]]:
+    """Profile several CSV sources in parallel worker processes
+
+    Returns ``{source: profile}``; sources that fail are logged and reported
+    as ``{"error": message}``.
+    """
+    sources = list(sources)
+    if not sources:
+        return {}
+
+    max_workers = max_workers or min(len(sources), os.cpu_count() or 1)
+    jobs = [(source, kwargs) for source in sources]
+
+    if max_workers <= 1 or len(sources) == 1:
+        results = map(_profile_worker, jobs)
+        return _collect(results)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return _collect(executor.map(_profile_worker, jobs))
+
+
+def _collect(results) -> Dict[Any, Dict[str, Any]]:
+    profiles = {}
+    for source, profile, error in results:
+        if error:
+            logger.error(f"Error profiling {source}: {error}")
+            profiles[source] = {"error": error}
+        else:
+            name = getattr(source, 'name', None) or Path(str(source)).name
+            logger.info(f"Profiled {name}: {profile['rows']} rows, {len(profile['columns'])} columns")
+            profiles[source] = profile
+    return profiles
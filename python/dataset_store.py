@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Processed Dataset Store for BeforeDoctor
+Writes processed datasets once to a primary Parquet file and generates
+JSON/CSV copies only when something asks for them
+"""
+
+import json
+import time
+import logging
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_FORMAT = 'parquet'
+SECONDARY_FORMATS = ('json', 'csv')
+
+
+def _dataset_path(directory: Path, name: str, fmt: str) -> Path:
+    return Path(directory) / f"{name}.{fmt}"
+
+
+def _manifest_path(directory: Path, name: str) -> Path:
+    return Path(directory) / f"{name}.manifest.json"
+
+
+def write_dataset(df: pd.DataFrame, directory, name: str, compression: str = 'zstd',
+                  row_group_size: int = 50_000, secondary_formats: List[str] = ()) -> Dict[str, Any]:
+    """Write ``df`` to the primary Parquet store
+
+    ``df`` may also be a Hugging Face ``datasets.Dataset``, which is written
+    batch by batch straight from Arrow without a pandas conversion.
+    ``secondary_formats`` are written immediately only when listed; otherwise
+    :func:`ensure_format` generates them on demand. Returns the manifest,
+    which records bytes written and write time.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    primary = _dataset_path(directory, name, PRIMARY_FORMAT)
+    if hasattr(df, 'column_names'):
+        df.to_parquet(primary, batch_size=row_group_size, compression=compression)
+        columns = df.column_names
+    else:
+        df.to_parquet(primary, index=False, engine='pyarrow',
+                      compression=compression, row_group_size=row_group_size)
+        columns = df.columns
+    elapsed = time.perf_counter() - start
+
+    manifest = {
+        'name': name,
+        'primary_format': PRIMARY_FORMAT,
+        'compression': compression,
+        'row_group_size': row_group_size,
+        'rows': len(df),
+        'columns': [str(col) for col in columns],
+        'bytes_written': {PRIMARY_FORMAT: primary.stat().st_size},
+        'write_seconds': round(elapsed, 3),
+        'written_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    with open(_manifest_path(directory, name), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"💾 Parquet saved: {primary} ({manifest['bytes_written'][PRIMARY_FORMAT] / 1024:.1f} KB, {elapsed:.2f}s)")
+
+    for fmt in secondary_formats:
+        ensure_format(directory, name, fmt)
+
+    return manifest
+
+
+def read_dataset(directory, name: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read a dataset from the primary store, projecting ``columns`` if given
+
+    Falls back to a legacy ``{name}.json`` when no Parquet file exists yet.
+    """
+    start = time.perf_counter()
+    primary = _dataset_path(directory, name, PRIMARY_FORMAT)
+
+    if primary.exists():
+        df = pd.read_parquet(primary, columns=columns, engine='pyarrow')
+        source = primary
+    else:
+        source = _dataset_path(directory, name, 'json')
+        logger.warning(f"⚠️ No Parquet store for {name}, reading legacy JSON {source}")
+        df = pd.read_json(source, orient='records')
+        if columns:
+            df = df[columns]
+
+    logger.info(f"📂 Loaded {len(df)} rows from {source} in {time.perf_counter() - start:.3f}s")
+    return df
+
+
+def ensure_format(directory, name: str, fmt: str) -> Path:
+    """Return the path of a secondary format, generating it if missing or stale"""
+    if fmt not in SECONDARY_FORMATS:
+        raise ValueError(f"Unsupported secondary format '{fmt}', expected one of {SECONDARY_FORMATS}")
+
+    directory = Path(directory)
+    primary = _dataset_path(directory, name, PRIMARY_FORMAT)
+    target = _dataset_path(directory, name, fmt)
+
+    if target.exists() and target.stat().st_mtime >= primary.stat().st_mtime:
+        return target
+
+    df = pd.read_parquet(primary, engine='pyarrow')
+    if fmt == 'json':
+        df.to_json(target, orient='records')
+    else:
+        df.to_csv(target, index=False)
+
+    manifest_file = _manifest_path(directory, name)
+    if manifest_file.exists():
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest['bytes_written'][fmt] = target.stat().st_size
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    logger.info(f"💾 {fmt.upper()} generated on demand: {target}")
+    return target
+
+
+def benchmark_formats(df: pd.DataFrame, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Compare the old triple JSON/CSV/Parquet write + JSON load with the Parquet store"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        start = time.perf_counter()
+        df.to_json(tmp / "legacy.json", orient='records', indent=2)
+        df.to_csv(tmp / "legacy.csv", index=False)
+        df.to_parquet(tmp / "legacy.parquet", index=False)
+        legacy_write = time.perf_counter() - start
+        legacy_bytes = sum((tmp / f"legacy.{fmt}").stat().st_size for fmt in ('json', 'csv', 'parquet'))
+
+        start = time.perf_counter()
+        with open(tmp / "legacy.json", 'r', encoding='utf-8') as f:
+            legacy_df = pd.DataFrame(json.load(f))
+        legacy_load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        manifest = write_dataset(df, tmp, "store")
+        store_write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store_df = read_dataset(tmp, "store", columns=columns)
+        store_load = time.perf_counter() - start
+
+    results = {
+        'rows': len(df),
+        'legacy': {'bytes_written': legacy_bytes, 'write_seconds': round(legacy_write, 3),
+                   'load_seconds': round(legacy_load, 3)},
+        'parquet_store': {'bytes_written': manifest['bytes_written'][PRIMARY_FORMAT],
+                          'write_seconds': round(store_write, 3),
+                          'load_seconds': round(store_load, 3),
+                          'columns_loaded': len(store_df.columns)},
+    }
+    logger.info(f"⏱️ Dataset store benchmark: {results}")
+    del legacy_df
+    return results
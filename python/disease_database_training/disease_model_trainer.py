@@ -6,21 +6,30 @@ Trains models for pediatric disease classification, symptom matching, and treatm
 
 import os
 import json
-import pandas as pd
 import numpy as np
 from pathlib import Path
 import logging
 from datetime import datetime
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
 from sklearn.pipeline import Pipeline
 import joblib
+from scipy import sparse
 import re
+import sys
+import time
 from typing import List, Dict, Tuple
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from dataset_store import read_dataset
+from feature_store import TfidfFeatureStore
+from compact_vectorizer import compact_vectorizer, dump_compact
+from similarity_index import SimilaritySearch, benchmark_search
+from treatment_retriever import NearestTreatmentRecommender, measure_query_latency
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -34,25 +43,30 @@ logger = logging.getLogger(__name__)
 
 class DiseaseDatabaseTrainer:
     def __init__(self):
-        self.data_path = Path("python/disease_database_training/processed/disease_database_pediatric.json")
+        self.processed_path = Path("python/disease_database_training/processed")
+        self.dataset_name = "disease_database_pediatric"
+        # Only these columns are used for training
+        self.data_columns = ['disease', 'common_symptom', 'treatment']
         self.models_path = Path("python/disease_database_training/models")
         self.models_path.mkdir(parents=True, exist_ok=True)
         
         self.df = None
+        # Symptom text is tokenized once and shared by every model
+        self.feature_store = TfidfFeatureStore(self.models_path / "feature_store", name="symptoms")
+        self.train_idx = None
+        self.test_idx = None
         self.disease_classifier = None
         self.symptom_matcher = None
         self.treatment_recommender = None
+        self.similarity_search = None
         
     def load_data(self):
         """Load the pediatric disease database"""
         try:
             logger.info("📊 Loading pediatric disease database...")
             
-            # Load JSON data
-            with open(self.data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            self.df = pd.DataFrame(data)
+            # Load Parquet store with column projection
+            self.df = read_dataset(self.processed_path, self.dataset_name, columns=self.data_columns)
             logger.info(f"✅ Loaded {len(self.df)} pediatric disease records")
             logger.info(f"📋 Columns: {list(self.df.columns)}")
             
@@ -89,6 +103,13 @@ class DiseaseDatabaseTrainer:
             # Create symptom categories
             self.df['symptom_category'] = self.df['symptoms_clean'].apply(self._categorize_symptoms)
             
+            # One held-out split shared by every model; only training rows are tokenized
+            self.train_idx, self.test_idx = train_test_split(
+                np.arange(len(self.df)), test_size=0.2, random_state=42, stratify=self.df['disease_category']
+            )
+            self.feature_store.fit(self.df['symptoms_key'].iloc[self.train_idx])
+            logger.info(f"🔤 Feature store: {self.feature_store.describe()}")
+            
             logger.info(f"✅ Preprocessing completed")
             logger.info(f"📊 Disease categories: {self.df['disease_category'].value_counts().to_dict()}")
             logger.info(f"📊 Symptom categories: {self.df['symptom_category'].value_counts().to_dict()}")
@@ -141,39 +162,36 @@ class DiseaseDatabaseTrainer:
         else:
             return 'other_symptoms'
     
+    def _split(self, max_features: int, label_column: str):
+        """Train/test features and labels; test rows are transformed with the train-fitted IDF"""
+        X_train = self.feature_store.features(max_features=max_features)
+        X_test = self.feature_store.transform(self.df['symptoms_key'].iloc[self.test_idx], max_features)
+        y = self.df[label_column].to_numpy()
+        return X_train, X_test, y[self.train_idx], y[self.test_idx]
+    
     def train_disease_classifier(self):
         """Train a disease classification model"""
         try:
             logger.info("🏥 Training disease classification model...")
             
-            # Prepare data
-            X = self.df['symptoms_key']
-            y = self.df['disease_category']
+            # Prepare data on the shared split
+            X_train, X_test, y_train, y_test = self._split(5000, 'disease_category')
             
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42, stratify=y
+            # Train model on the shared TF-IDF features
+            classifier = RandomForestClassifier(
+                n_estimators=100,
+                random_state=42,
+                n_jobs=-1
             )
+            classifier.fit(X_train, y_train)
             
-            # Create pipeline
             pipeline = Pipeline([
-                ('tfidf', TfidfVectorizer(
-                    max_features=5000,
-                    ngram_range=(1, 2),
-                    stop_words='english'
-                )),
-                ('classifier', RandomForestClassifier(
-                    n_estimators=100,
-                    random_state=42,
-                    n_jobs=-1
-                ))
+                ('tfidf', self.feature_store.projection(5000)),
+                ('classifier', classifier)
             ])
             
-            # Train model
-            pipeline.fit(X_train, y_train)
-            
             # Evaluate
-            y_pred = pipeline.predict(X_test)
+            y_pred = classifier.predict(X_test)
             accuracy = accuracy_score(y_test, y_pred)
             
             logger.info(f"✅ Disease classifier trained successfully!")
@@ -181,9 +199,9 @@ class DiseaseDatabaseTrainer:
             logger.info(f"📋 Classification Report:")
             logger.info(classification_report(y_test, y_pred))
             
-            # Save model
+            # Save model with its TF-IDF step in compact form
             model_path = self.models_path / "disease_classifier.pkl"
-            joblib.dump(pipeline, model_path)
+            dump_compact(pipeline, model_path, self.df['symptoms_key'].iloc[:200].tolist())
             logger.info(f"💾 Model saved: {model_path}")
             
             self.disease_classifier = pipeline
@@ -198,33 +216,23 @@ class DiseaseDatabaseTrainer:
         try:
             logger.info("🔍 Training symptom matching model...")
             
-            # Prepare data for symptom matching
-            X = self.df['symptoms_key']
-            y = self.df['symptom_category']
+            # Prepare data for symptom matching on the shared split
+            X_train, X_test, y_train, y_test = self._split(3000, 'symptom_category')
             
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42, stratify=y
+            # Train model on the shared TF-IDF features
+            classifier = LogisticRegression(
+                random_state=42,
+                max_iter=1000
             )
+            classifier.fit(X_train, y_train)
             
-            # Create pipeline
             pipeline = Pipeline([
-                ('tfidf', TfidfVectorizer(
-                    max_features=3000,
-                    ngram_range=(1, 2),
-                    stop_words='english'
-                )),
-                ('classifier', LogisticRegression(
-                    random_state=42,
-                    max_iter=1000
-                ))
+                ('tfidf', self.feature_store.projection(3000)),
+                ('classifier', classifier)
             ])
             
-            # Train model
-            pipeline.fit(X_train, y_train)
-            
             # Evaluate
-            y_pred = pipeline.predict(X_test)
+            y_pred = classifier.predict(X_test)
             accuracy = accuracy_score(y_test, y_pred)
             
             logger.info(f"✅ Symptom matcher trained successfully!")
@@ -232,9 +240,9 @@ class DiseaseDatabaseTrainer:
             logger.info(f"📋 Classification Report:")
             logger.info(classification_report(y_test, y_pred))
             
-            # Save model
+            # Save model with its TF-IDF step in compact form
             model_path = self.models_path / "symptom_matcher.pkl"
-            joblib.dump(pipeline, model_path)
+            dump_compact(pipeline, model_path, self.df['symptoms_key'].iloc[:200].tolist())
             logger.info(f"💾 Model saved: {model_path}")
             
             self.symptom_matcher = pipeline
@@ -244,53 +252,85 @@ class DiseaseDatabaseTrainer:
             logger.error(f"❌ Symptom matcher training failed: {e}")
             return False
     
-    def train_treatment_recommender(self):
-        """Train a treatment recommendation model"""
+    def train_treatment_recommender(self, compare_with_forest: bool = False):
+        """Train a treatment recommendation model
+
+        Uses nearest-neighbour retrieval in the shared symptom TF-IDF space.
+        With ``compare_with_forest`` the previous RandomForest pipeline is also
+        fitted and both are reported in treatment_recommender_benchmark.json.
+        """
         try:
             logger.info("💊 Training treatment recommendation model...")
             
             # Create treatment embeddings
             self.df['treatment_key'] = self.df['treatment_clean'].str[:300]
             
-            # Prepare data
-            X = self.df['symptoms_key']
-            y = self.df['treatment_key']
+            # Prepare data on the shared split
+            projection = self.feature_store.projection(4000)
+            X_train, X_test, y_train, y_test = self._split(4000, 'treatment_key')
+            diseases = self.df['disease'].to_numpy()
+            d_train, d_test = diseases[self.train_idx], diseases[self.test_idx]
             
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42
-            )
-            
-            # Create pipeline for treatment recommendation
-            pipeline = Pipeline([
-                ('tfidf', TfidfVectorizer(
-                    max_features=4000,
-                    ngram_range=(1, 2),
-                    stop_words='english'
-                )),
-                ('classifier', RandomForestClassifier(
-                    n_estimators=50,
-                    random_state=42,
-                    n_jobs=-1
-                ))
-            ])
+            # Evaluate retrieval on the held-out split
+            start = time.perf_counter()
+            recommender = NearestTreatmentRecommender(projection).fit(X_train, y_train, d_train)
+            fit_seconds = time.perf_counter() - start
             
-            # Train model
-            pipeline.fit(X_train, y_train)
-            
-            # Evaluate
-            y_pred = pipeline.predict(X_test)
+            recommendations = recommender.recommend_matrix(X_test, top_k=5)
+            y_pred = [recs[0]['treatment'] if recs else '' for recs in recommendations]
             accuracy = accuracy_score(y_test, y_pred)
+            top5_hit_rate = np.mean([
+                truth in {rec['treatment'] for rec in recs}
+                for truth, recs in zip(y_test, recommendations)
+            ])
             
             logger.info(f"✅ Treatment recommender trained successfully!")
-            logger.info(f"📊 Accuracy: {accuracy:.3f}")
+            logger.info(f"📊 Accuracy: {accuracy:.3f} (top-5 hit rate: {top5_hit_rate:.3f})")
             
-            # Save model
+            # Fit on all records for the saved model, which only needs a compact transform
+            recommender = NearestTreatmentRecommender(compact_vectorizer(projection)).fit(
+                sparse.vstack([X_train, X_test]).tocsr(),
+                np.concatenate([y_train, y_test]),
+                np.concatenate([d_train, d_test])
+            )
             model_path = self.models_path / "treatment_recommender.pkl"
-            joblib.dump(pipeline, model_path)
+            joblib.dump(recommender, model_path)
             logger.info(f"💾 Model saved: {model_path}")
             
-            self.treatment_recommender = pipeline
+            sample_queries = self.df['symptoms_key'].iloc[:200].tolist()
+            benchmark = {
+                'nearest_neighbour': {
+                    'fit_seconds': round(fit_seconds, 3),
+                    'model_bytes': model_path.stat().st_size,
+                    'accuracy': round(float(accuracy), 4),
+                    'top5_hit_rate': round(float(top5_hit_rate), 4),
+                    **measure_query_latency(lambda text: recommender.recommend(text), sample_queries)
+                }
+            }
+            
+            if compare_with_forest:
+                start = time.perf_counter()
+                forest = RandomForestClassifier(n_estimators=50, random_state=42, n_jobs=-1)
+                forest.fit(X_train, y_train)
+                forest_fit_seconds = time.perf_counter() - start
+                
+                pipeline = Pipeline([('tfidf', projection), ('classifier', forest)])
+                forest_path = self.models_path / "treatment_recommender_forest.pkl"
+                joblib.dump(pipeline, forest_path)
+                benchmark['random_forest'] = {
+                    'fit_seconds': round(forest_fit_seconds, 3),
+                    'model_bytes': forest_path.stat().st_size,
+                    'accuracy': round(float(accuracy_score(y_test, forest.predict(X_test))), 4),
+                    **measure_query_latency(lambda text: pipeline.predict([text]), sample_queries)
+                }
+                forest_path.unlink()
+            
+            benchmark_path = self.models_path / "treatment_recommender_benchmark.json"
+            with open(benchmark_path, 'w', encoding='utf-8') as f:
+                json.dump(benchmark, f, indent=2)
+            logger.info(f"⏱️ Treatment recommender benchmark: {benchmark}")
+            
+            self.treatment_recommender = recommender
             return True
             
         except Exception as e:
@@ -302,20 +342,18 @@ class DiseaseDatabaseTrainer:
         try:
             logger.info("🔤 Creating disease embeddings...")
             
-            # Create TF-IDF embeddings for diseases
-            vectorizer = TfidfVectorizer(
-                max_features=2000,
-                ngram_range=(1, 2),
-                stop_words='english'
-            )
-            
-            # Fit on disease names and symptoms
+            # Fit on disease names and symptoms (cached by text hash like the symptom features)
             disease_texts = self.df['disease_clean'] + ' ' + self.df['symptoms_key']
-            embeddings = vectorizer.fit_transform(disease_texts)
+            embedding_store = TfidfFeatureStore(self.models_path / "feature_store", name="disease_texts").fit(disease_texts)
+            projection = embedding_store.projection(2000)
+            embeddings = embedding_store.features(max_features=2000)
             
-            # Save vectorizer
+            # Save vectorizer as a sorted term table + float32 IDF
             vectorizer_path = self.models_path / "disease_vectorizer.pkl"
-            joblib.dump(vectorizer, vectorizer_path)
+            report = dump_compact(projection, vectorizer_path, disease_texts.iloc[:200].tolist())
+            with open(self.models_path / "vectorizer_serialization.json", 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            vectorizer = compact_vectorizer(projection)
             logger.info(f"💾 Disease vectorizer saved: {vectorizer_path}")
             
             # Save embeddings
@@ -323,12 +361,34 @@ class DiseaseDatabaseTrainer:
             joblib.dump(embeddings, embeddings_path)
             logger.info(f"💾 Disease embeddings saved: {embeddings_path}")
             
+            # Build exact and approximate (SVD + IVF) similarity indexes
+            self.similarity_search = SimilaritySearch(
+                vectorizer, embeddings, self.df['disease'].tolist(),
+                approximate=True, n_components=192
+            )
+            index_path = self.similarity_search.save(self.models_path / "disease_similarity_index")
+            
+            # Benchmark with a sample of the diseases themselves as queries
+            rng = np.random.default_rng(42)
+            sample = rng.choice(embeddings.shape[0], size=min(200, embeddings.shape[0]), replace=False)
+            benchmark = benchmark_search(self.similarity_search, embeddings[sample], top_k=10)
+            with open(index_path / "benchmark.json", 'w', encoding='utf-8') as f:
+                json.dump(benchmark, f, indent=2)
+            
             return True
             
         except Exception as e:
             logger.error(f"❌ Disease embeddings creation failed: {e}")
             return False
     
+    def find_similar_diseases(self, symptom_texts: List[str], top_k: int = 5,
+                              approximate: bool = False) -> List[List[Dict]]:
+        """Diseases closest to each symptom description"""
+        if self.similarity_search is None:
+            self.similarity_search = SimilaritySearch.load(self.models_path / "disease_similarity_index")
+        mode = 'approximate' if approximate else 'exact'
+        return self.similarity_search.query_batch(symptom_texts, top_k=top_k, mode=mode)
+    
     def create_flutter_integration(self):
         """Create Flutter integration for the trained models"""
         try:
@@ -420,7 +480,9 @@ class DiseaseDatabase {
                     'symptom_matcher.pkl', 
                     'treatment_recommender.pkl',
                     'disease_vectorizer.pkl',
-                    'disease_embeddings.pkl'
+                    'disease_embeddings.pkl',
+                    'disease_similarity_index/matrix.npz',
+                    'disease_similarity_index/ivf.npz'
                 ],
                 'model_sizes': {},
                 'training_metrics': {
@@ -454,7 +516,7 @@ class DiseaseDatabase {
             logger.error(f"❌ Training report generation failed: {e}")
             return False
     
-    def run_training(self):
+    def run_training(self, compare_with_forest: bool = False):
         """Run the complete training pipeline"""
         logger.info("🚀 Starting Disease Database Training Pipeline")
         logger.info("=" * 60)
@@ -476,7 +538,7 @@ class DiseaseDatabase {
         if not self.train_symptom_matcher():
             training_success = False
         
-        if not self.train_treatment_recommender():
+        if not self.train_treatment_recommender(compare_with_forest=compare_with_forest):
             training_success = False
         
         # Step 4: Create embeddings
@@ -500,6 +562,7 @@ class DiseaseDatabase {
             logger.info("- python/disease_database_training/models/treatment_recommender.pkl")
             logger.info("- python/disease_database_training/models/disease_vectorizer.pkl")
             logger.info("- python/disease_database_training/models/disease_embeddings.pkl")
+            logger.info("- python/disease_database_training/models/disease_similarity_index/")
             logger.info("- beforedoctor/lib/services/disease_prediction_service.dart")
             logger.info("- python/disease_database_training/models/training_report.json")
         else:
@@ -509,8 +572,14 @@ class DiseaseDatabase {
 
 def main():
     """Main training function"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Train BeforeDoctor disease database models")
+    parser.add_argument('--compare-forest', action='store_true',
+                        help="Also fit the RandomForest treatment model and benchmark it against retrieval")
+    args = parser.parse_args()
+    
     trainer = DiseaseDatabaseTrainer()
-    success = trainer.run_training()
+    success = trainer.run_training(compare_with_forest=args.compare_forest)
     
     if success:
         print("\n✅ Disease Database Training Completed!")
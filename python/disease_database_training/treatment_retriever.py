@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Nearest-neighbour treatment recommender for BeforeDoctor
+Returns the treatments of the diseases whose symptoms are most similar to a
+query, instead of classifying into one class per treatment string
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Sequence
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from similarity_index import SparseCosineIndex
+
+
+class NearestTreatmentRecommender:
+    """Top-k treatment retrieval in the symptom TF-IDF space
+
+    ``vectorizer`` maps symptom text into the same space as the matrix passed
+    to :meth:`fit` (e.g. a ``feature_store.TfidfProjection``).
+    """
+
+    def __init__(self, vectorizer, n_neighbors: int = 20):
+        self.vectorizer = vectorizer
+        self.n_neighbors = n_neighbors
+        self.index = None
+        self.treatments: List[str] = []
+        self.diseases: List[str] = []
+
+    def fit(self, symptom_matrix, treatments: Sequence[str], diseases: Sequence[str]):
+        self.index = SparseCosineIndex(symptom_matrix)
+        self.treatments = list(treatments)
+        self.diseases = list(diseases)
+        return self
+
+    def _rank(self, indices: np.ndarray, scores: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        recommendations = []
+        seen = set()
+        for i, score in zip(indices, scores):
+            treatment = self.treatments[i]
+            if score <= 0 or treatment in seen:
+                continue
+            seen.add(treatment)
+            recommendations.append({
+                'treatment': treatment,
+                'disease': self.diseases[i],
+                'score': round(float(score), 4)
+            })
+            if len(recommendations) == top_k:
+                break
+        return recommendations
+
+    def recommend_matrix(self, query_matrix, top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Recommendations for queries already in the symptom TF-IDF space"""
+        indices, scores = self.index.search(query_matrix, max(top_k, self.n_neighbors))
+        return [self._rank(row_indices, row_scores, top_k)
+                for row_indices, row_scores in zip(indices, scores)]
+
+    def recommend_batch(self, symptom_texts: Sequence[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Top-k treatments (distinct) for every symptom description"""
+        return self.recommend_matrix(self.vectorizer.transform(list(symptom_texts)), top_k)
+
+    def recommend(self, symptom_text: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        return self.recommend_batch([symptom_text], top_k)[0]
+
+    def predict(self, symptom_texts: Sequence[str]) -> List[str]:
+        """Best treatment per text, mirroring a classifier's ``predict``"""
+        return [recs[0]['treatment'] if recs else '' for recs in self.recommend_batch(symptom_texts, top_k=1)]
+
+
+def measure_query_latency(predict_one, queries: Sequence, repeats: int = 1) -> Dict[str, float]:
+    """p50/p99 single-query latency in milliseconds"""
+    latencies = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            predict_one(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3)
+    }
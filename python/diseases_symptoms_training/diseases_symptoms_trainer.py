@@ -16,16 +16,63 @@ from datasets import load_dataset
 from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier, LogisticRegression
+from sklearn.naive_bayes import ComplementNB
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
 import pickle
+import io
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from compact_vectorizer import dump_compact
+from training_scheduler import training_n_jobs
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Classifier engines selectable for the disease model; random_forest stays the
+# default until engine_benchmark.json (--benchmark) shows another is better
+CLASSIFIER_ENGINES = {
+    'sgd': lambda: SGDClassifier(loss='log_loss', alpha=1e-5, max_iter=1000, tol=1e-3, random_state=42, n_jobs=training_n_jobs(-1)),
+    'logreg': lambda: LogisticRegression(max_iter=1000, C=10.0, random_state=42),
+    'complement_nb': lambda: ComplementNB(alpha=0.3),
+    'random_forest': lambda: RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=training_n_jobs(-1)),
+}
+
+def _rows_without_nulls(batch, columns):
+    """Batched filter: keep rows where no column is missing"""
+    keep = [True] * len(batch[columns[0]])
+    for col in columns:
+        keep = [k and v is not None and v == v for k, v in zip(keep, batch[col])]
+    return keep
+
+def _row_hashes(batch, columns):
+    """Batched map: 64-bit hash of every row across all columns"""
+    frame = pd.DataFrame({col: batch[col] for col in columns}).astype(str)
+    return {'_row_hash': pd.util.hash_pandas_object(frame, index=False).to_numpy()}
+
+def _text_features(batch, text_columns, label_column):
+    """Batched map: concatenate text columns column-wise and attach the label"""
+    text = [str(value) for value in batch[text_columns[0]]]
+    for col in text_columns[1:]:
+        text = [f"{left} {right}" for left, right in zip(text, batch[col])]
+    if label_column:
+        labels = batch[label_column]
+    else:
+        # Create a generic label
+        labels = ['medical_condition'] * len(text)
+    return {'text_features': text, 'label': labels}
+
 class DiseasesSymptomsTrainer:
-    def __init__(self):
+    def __init__(self, engine='random_forest', num_proc=None):
+        if engine not in CLASSIFIER_ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {list(CLASSIFIER_ENGINES)}")
+        self.engine = engine
+        # Worker processes for batched dataset cleaning
+        self.num_proc = num_proc or training_n_jobs(min(4, os.cpu_count() or 1))
+        
         self.base_dir = Path(__file__).parent
         self.data_dir = self.base_dir / "data"
         self.processed_dir = self.base_dir / "processed"
@@ -77,22 +124,22 @@ class DiseasesSymptomsTrainer:
         try:
             logger.info("🔄 Processing Diseases_Symptoms dataset...")
             
-            # Convert to pandas DataFrame for easier processing
+            # Work on the memory-mapped Arrow split instead of a pandas copy
             if 'train' in self.dataset:
-                df = self.dataset['train'].to_pandas()
+                split = self.dataset['train']
             else:
                 # If no train split, use the first available split
-                df = list(self.dataset.values())[0].to_pandas()
+                split = list(self.dataset.values())[0]
             
-            logger.info(f"📊 Original dataset shape: {df.shape}")
-            logger.info(f"📋 Columns: {list(df.columns)}")
+            logger.info(f"📊 Original dataset shape: {(split.num_rows, len(split.column_names))}")
+            logger.info(f"📋 Columns: {split.column_names}")
             
             # Display sample data
             logger.info("📄 Sample data:")
-            logger.info(df.head())
+            logger.info(split[:5])
             
             # Clean and prepare data
-            df_processed = self._clean_data(df)
+            df_processed = self._clean_data(split)
             
             # Split into train/test
             self.train_data, self.test_data = train_test_split(
@@ -113,54 +160,73 @@ class DiseasesSymptomsTrainer:
             logger.error(f"❌ Failed to process dataset: {e}")
             return False
     
-    def _clean_data(self, df):
-        """Clean and prepare the dataset"""
+    def _clean_data(self, dataset):
+        """Clean and prepare the dataset
+
+        Runs as batched Arrow ``filter``/``map`` steps, which the datasets
+        library caches by fingerprint, so re-runs reuse the cleaned cache files.
+        Only the final training columns are converted to pandas.
+        """
         logger.info("🧹 Cleaning dataset...")
         
-        # Remove duplicates
-        df_clean = df.drop_duplicates()
-        logger.info(f"📊 After removing duplicates: {df_clean.shape}")
+        columns = dataset.column_names
+        num_proc = self.num_proc if dataset.num_rows >= 10_000 else None
         
         # Handle missing values
-        df_clean = df_clean.dropna()
-        logger.info(f"📊 After removing missing values: {df_clean.shape}")
+        dataset = dataset.filter(
+            _rows_without_nulls, batched=True, fn_kwargs={'columns': columns},
+            num_proc=num_proc, desc="Dropping rows with missing values"
+        )
+        logger.info(f"📊 After removing missing values: {(dataset.num_rows, len(columns))}")
+        
+        # Remove duplicates: hash rows in batches, keep the first occurrence of each hash
+        hashed = dataset.map(
+            _row_hashes, batched=True, fn_kwargs={'columns': columns},
+            num_proc=num_proc, desc="Hashing rows"
+        )
+        hashes = hashed.with_format('numpy')['_row_hash']
+        _, first_rows = np.unique(hashes, return_index=True)
+        dataset = dataset.select(np.sort(first_rows))
+        logger.info(f"📊 After removing duplicates: {(dataset.num_rows, len(columns))}")
         
         # Create text features for classification
-        if 'symptoms' in df_clean.columns and 'diseases' in df_clean.columns:
+        if 'symptoms' in columns and 'diseases' in columns:
             # Combine symptoms and diseases for better classification
-            df_clean['text_features'] = df_clean['symptoms'].astype(str) + " " + df_clean['diseases'].astype(str)
-        elif 'symptoms' in df_clean.columns:
-            df_clean['text_features'] = df_clean['symptoms'].astype(str)
-        elif 'diseases' in df_clean.columns:
-            df_clean['text_features'] = df_clean['diseases'].astype(str)
+            text_columns = ['symptoms', 'diseases']
+        elif 'symptoms' in columns:
+            text_columns = ['symptoms']
+        elif 'diseases' in columns:
+            text_columns = ['diseases']
         else:
             # Use all text columns
-            text_columns = [col for col in df_clean.columns if df_clean[col].dtype == 'object']
-            if text_columns:
-                df_clean['text_features'] = df_clean[text_columns].astype(str).agg(' '.join, axis=1)
-            else:
+            text_columns = [col for col, feature in dataset.features.items()
+                            if getattr(feature, 'dtype', None) in ('string', 'large_string')]
+            if not text_columns:
                 logger.error("❌ No suitable text columns found for classification")
-                return df_clean
+                return dataset.to_pandas()
         
         # Create labels for classification (use diseases as labels if available)
-        if 'diseases' in df_clean.columns:
-            df_clean['label'] = df_clean['diseases']
-        elif 'disease' in df_clean.columns:
-            df_clean['label'] = df_clean['disease']
+        if 'diseases' in columns:
+            label_column = 'diseases'
+        elif 'disease' in columns:
+            label_column = 'disease'
         else:
-            # Create a generic label
-            df_clean['label'] = 'medical_condition'
+            label_column = None
+        
+        dataset = dataset.map(
+            _text_features, batched=True,
+            fn_kwargs={'text_columns': text_columns, 'label_column': label_column},
+            num_proc=num_proc, desc="Building text features"
+        )
         
         # Keep only necessary columns
         columns_to_keep = ['text_features', 'label']
-        if 'symptoms' in df_clean.columns:
-            columns_to_keep.append('symptoms')
-        if 'diseases' in df_clean.columns:
-            columns_to_keep.append('diseases')
-        if 'treatments' in df_clean.columns:
-            columns_to_keep.append('treatments')
+        for col in ['symptoms', 'diseases', 'treatments']:
+            if col in columns:
+                columns_to_keep.append(col)
         
-        df_clean = df_clean[columns_to_keep]
+        dataset = dataset.select_columns(columns_to_keep)
+        df_clean = dataset.to_pandas()
         
         logger.info(f"📊 Final processed dataset shape: {df_clean.shape}")
         logger.info(f"📋 Final columns: {list(df_clean.columns)}")
@@ -192,12 +258,9 @@ class DiseasesSymptomsTrainer:
             
             logger.info(f"📊 Feature matrix shape: {X_train_vectors.shape}")
             
-            # Train Random Forest classifier
-            self.classifier = RandomForestClassifier(
-                n_estimators=100,
-                random_state=42,
-                n_jobs=-1
-            )
+            # Train the selected classifier engine
+            logger.info(f"🔧 Classifier engine: {self.engine}")
+            self.classifier = CLASSIFIER_ENGINES[self.engine]()
             
             self.classifier.fit(X_train_vectors, y_train)
             
@@ -212,7 +275,8 @@ class DiseasesSymptomsTrainer:
             
             # Save results
             results = {
-                "model_type": "RandomForest",
+                "model_type": type(self.classifier).__name__,
+                "engine": self.engine,
                 "accuracy": accuracy,
                 "classification_report": report,
                 "training_timestamp": datetime.now().isoformat(),
@@ -221,13 +285,15 @@ class DiseasesSymptomsTrainer:
                 "test_samples": len(X_test)
             }
             
+            # Save models; the vectorizer as a compact term table + float32 IDF
+            results["vectorizer_serialization"] = dump_compact(
+                self.vectorizer, self.models_dir / "diseases_symptoms_vectorizer.pkl", list(X_test[:200])
+            )
+            joblib.dump(self.classifier, self.models_dir / "diseases_symptoms_classifier.pkl")
+            
             with open(self.outputs_dir / "training_results.json", "w") as f:
                 json.dump(results, f, indent=2)
             
-            # Save models
-            joblib.dump(self.vectorizer, self.models_dir / "diseases_symptoms_vectorizer.pkl")
-            joblib.dump(self.classifier, self.models_dir / "diseases_symptoms_classifier.pkl")
-            
             logger.info(f"✅ Training completed!")
             logger.info(f"📊 Accuracy: {accuracy:.4f}")
             logger.info(f"📄 Results saved to: {self.outputs_dir / 'training_results.json'}")
@@ -239,6 +305,92 @@ class DiseasesSymptomsTrainer:
             logger.error(f"❌ Failed to train models: {e}")
             return False
     
+    def benchmark_engines(self, engines=None, latency_samples=200):
+        """Compare classifier engines on fit time, model size, latency and accuracy"""
+        try:
+            engines = engines or list(CLASSIFIER_ENGINES)
+            logger.info(f"⏱️ Benchmarking engines: {engines}")
+            
+            vectorizer = TfidfVectorizer(
+                max_features=5000,
+                ngram_range=(1, 2),
+                stop_words='english',
+                min_df=2
+            )
+            X_train_vectors = vectorizer.fit_transform(self.train_data['text_features'])
+            X_test_vectors = vectorizer.transform(self.test_data['text_features'])
+            y_train = self.train_data['label']
+            y_test = self.test_data['label']
+            queries = self.test_data['text_features'].iloc[:latency_samples].tolist()
+            
+            table = []
+            for engine in engines:
+                classifier = CLASSIFIER_ENGINES[engine]()
+                
+                start = time.perf_counter()
+                classifier.fit(X_train_vectors, y_train)
+                fit_seconds = time.perf_counter() - start
+                
+                buffer = io.BytesIO()
+                joblib.dump(classifier, buffer)
+                
+                latencies = []
+                for text in queries:
+                    start = time.perf_counter()
+                    classifier.predict(vectorizer.transform([text]))
+                    latencies.append((time.perf_counter() - start) * 1000)
+                
+                table.append({
+                    "engine": engine,
+                    "fit_seconds": round(fit_seconds, 3),
+                    "model_bytes": buffer.tell(),
+                    "p50_latency_ms": round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+                    "p99_latency_ms": round(float(np.percentile(latencies, 99)), 3) if latencies else None,
+                    "accuracy": round(float(accuracy_score(y_test, classifier.predict(X_test_vectors))), 4)
+                })
+            
+            with open(self.outputs_dir / "engine_benchmark.json", "w") as f:
+                json.dump({"benchmark_timestamp": datetime.now().isoformat(), "engines": table}, f, indent=2)
+            
+            logger.info(f"{'engine':<15}{'fit_s':>10}{'bytes':>14}{'p99_ms':>10}{'accuracy':>10}")
+            for row in table:
+                logger.info(f"{row['engine']:<15}{row['fit_seconds']:>10}{row['model_bytes']:>14}"
+                            f"{row['p99_latency_ms']!s:>10}{row['accuracy']:>10}")
+            logger.info(f"📄 Benchmark saved to: {self.outputs_dir / 'engine_benchmark.json'}")
+            return table
+            
+        except Exception as e:
+            logger.error(f"❌ Engine benchmark failed: {e}")
+            return None
+    
+    def _load_inference_models(self):
+        """Load the saved vectorizer and classifier once"""
+        if self.vectorizer is None:
+            self.vectorizer = joblib.load(self.models_dir / "diseases_symptoms_vectorizer.pkl")
+        if self.classifier is None:
+            self.classifier = joblib.load(self.models_dir / "diseases_symptoms_classifier.pkl")
+    
+    def predict_batch(self, texts, top_k=3):
+        """Score many symptom descriptions with a single transform/predict call"""
+        self._load_inference_models()
+        
+        vectors = self.vectorizer.transform(list(texts))
+        if not hasattr(self.classifier, "predict_proba"):
+            return [{"label": label, "confidence": None, "top": []}
+                    for label in self.classifier.predict(vectors)]
+        
+        probabilities = self.classifier.predict_proba(vectors)
+        classes = self.classifier.classes_
+        k = min(top_k, len(classes))
+        top_indices = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+        
+        predictions = []
+        for row, indices in zip(probabilities, top_indices):
+            indices = indices[np.argsort(-row[indices])]
+            top = [{"label": str(classes[i]), "confidence": round(float(row[i]), 4)} for i in indices]
+            predictions.append({"label": top[0]["label"], "confidence": top[0]["confidence"], "top": top})
+        return predictions
+    
     def create_flutter_integration(self):
         """Create Flutter integration code"""
         try:
@@ -316,6 +468,30 @@ class DiseasesSymptomsModel {
             logger.error(f"❌ Failed to create Flutter integration: {e}")
             return False
     
+    def _load_processed_splits(self):
+        """Reload the train/test splits written by process_dataset"""
+        if self.train_data is None:
+            self.train_data = pd.read_csv(self.processed_dir / "train_data.csv").fillna('')
+            self.test_data = pd.read_csv(self.processed_dir / "test_data.csv").fillna('')
+            logger.info(f"📂 Loaded processed splits: {len(self.train_data)} train, {len(self.test_data)} test")
+        return True
+    
+    def run_stage(self, stage):
+        """Run one pipeline stage on its own, reusing earlier stages' outputs on disk"""
+        stages = {
+            "download": [self.download_dataset],
+            # The Hugging Face cache makes the reload cheap after the download stage
+            "process": [self.download_dataset, self.process_dataset],
+            "train": [self._load_processed_splits, self.train_models],
+            "flutter": [self.create_flutter_integration]
+        }
+        logger.info(f"🔄 Stage: {stage}")
+        for step in stages[stage]:
+            if not step():
+                logger.error(f"❌ Stage failed: {stage}")
+                return False
+        return True
+    
     def run_complete_pipeline(self):
         """Run the complete training pipeline"""
         logger.info("🚀 Starting Diseases_Symptoms training pipeline...")
@@ -368,8 +544,24 @@ class DiseasesSymptomsModel {
 
 def main():
     """Main function"""
-    trainer = DiseasesSymptomsTrainer()
-    success = trainer.run_complete_pipeline()
+    import argparse
+    parser = argparse.ArgumentParser(description="Train the Diseases_Symptoms model")
+    parser.add_argument('--engine', default='random_forest', choices=list(CLASSIFIER_ENGINES),
+                        help="Classifier engine to train")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Benchmark every engine after training")
+    parser.add_argument('--stage', default='all', choices=['all', 'download', 'process', 'train', 'flutter'],
+                        help="Run a single pipeline stage (used by the training scheduler)")
+    args = parser.parse_args()
+    
+    trainer = DiseasesSymptomsTrainer(engine=args.engine)
+    if args.stage == 'all':
+        success = trainer.run_complete_pipeline()
+    else:
+        success = trainer.run_stage(args.stage)
+    
+    if success and args.benchmark and args.stage in ('all', 'train'):
+        trainer.benchmark_engines()
     
     if success:
         logger.info("\n🎉 Diseases_Symptoms training pipeline completed successfully!")
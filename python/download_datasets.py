@@ -7,11 +7,13 @@ Downloads both CDC pediatric data and Medical Q&A dataset
 import kagglehub
 import os
 import zipfile
-import shutil
 import json
 from pathlib import Path
 import sys
 
+sys.path.insert(0, str(Path(__file__).parent))
+from dataset_ingest import link_or_copy
+
 def create_directories():
     """Create necessary directories"""
     directories = [
@@ -47,8 +49,8 @@ def download_cdc_dataset():
         for file_path in Path(path).glob("*"):
             if file_path.is_file():
                 dest_path = data_dir / file_path.name
-                shutil.copy2(file_path, dest_path)
-                print(f"📄 Copied: {file_path.name}")
+                method = link_or_copy(file_path, dest_path)
+                print(f"📄 Linked ({method}): {file_path.name}")
                 files_copied += 1
         
         print(f"🎉 CDC dataset ready! {files_copied} files copied to {data_dir}")
@@ -76,8 +78,8 @@ def download_medical_qa_dataset():
         for file_path in Path(path).glob("*"):
             if file_path.is_file():
                 dest_path = data_dir / file_path.name
-                shutil.copy2(file_path, dest_path)
-                print(f"📄 Copied: {file_path.name}")
+                method = link_or_copy(file_path, dest_path)
+                print(f"📄 Linked ({method}): {file_path.name}")
                 files_copied += 1
         
         print(f"🎉 Medical Q&A dataset ready! {files_copied} files copied to {data_dir}")
@@ -5,10 +5,14 @@ Downloads and filters the FreedomIntelligence/Disease_Database dataset for pedia
 """
 
 import os
+import re
 import json
-import pandas as pd
+import time
+import argparse
 from pathlib import Path
 from datasets import load_dataset
+
+from dataset_store import write_dataset, benchmark_formats
 import logging
 from datetime import datetime
 
@@ -47,96 +51,188 @@ def download_disease_database():
         logger.info(f"✅ Dataset loaded successfully!")
         logger.info(f"Dataset structure: {dataset}")
         
-        # Convert to pandas DataFrame for easier processing
-        df = dataset['train'].to_pandas()
-        logger.info(f"📊 Original dataset shape: {df.shape}")
-        logger.info(f"📋 Columns: {list(df.columns)}")
+        # Keep the memory-mapped Arrow split instead of a pandas copy
+        split = dataset['train']
+        logger.info(f"📊 Original dataset shape: {(split.num_rows, len(split.column_names))}")
+        logger.info(f"📋 Columns: {split.column_names}")
         
-        # Save original dataset
+        # Save original dataset (JSON lines, written batch by batch)
         data_dir = Path("python/disease_database_training/data")
         data_dir.mkdir(parents=True, exist_ok=True)
         
-        original_file = data_dir / "disease_database_original.json"
-        df.to_json(original_file, orient='records', indent=2)
+        original_file = data_dir / "disease_database_original.jsonl"
+        split.to_json(original_file)
         logger.info(f"💾 Original dataset saved to: {original_file}")
         
-        return df
+        return split
         
     except Exception as e:
         logger.error(f"❌ Disease Database download failed: {e}")
         return None
 
-def filter_pediatric_records(df):
-    """Filter dataset for pediatric-relevant records"""
+# Keywords that make a record pediatric-relevant
+PEDIATRIC_KEYWORDS = [
+    'child', 'children', 'pediatric', 'infant', 'baby', 'toddler',
+    'adolescent', 'teen', 'teenager', 'youth', 'young', 'juvenile',
+    'school-age', 'preschool', 'neonatal', 'newborn', 'toddler',
+    'fever', 'cough', 'cold', 'flu', 'vaccination', 'immunization',
+    'growth', 'development', 'milestone', 'behavior', 'learning',
+    'asthma', 'allergy', 'eczema', 'diarrhea', 'vomiting', 'rash',
+    'ear infection', 'strep throat', 'pink eye', 'chickenpox',
+    'measles', 'mumps', 'rubella', 'whooping cough', 'rotavirus'
+]
+
+# Subset used to keep only records with explicitly pediatric content
+SPECIFIC_PEDIATRIC_KEYWORDS = [
+    'pediatric', 'child', 'children', 'infant', 'baby', 'toddler',
+    'adolescent', 'teen', 'teenager', 'school-age', 'preschool'
+]
+
+# Separator between concatenated column values; no keyword contains it, so
+# matches can never span two columns
+FIELD_SEPARATOR = '\x1f'
+
+def _keyword_alternation(keywords):
+    unique = sorted(set(keyword.lower() for keyword in keywords), key=len, reverse=True)
+    return '|'.join(re.escape(keyword) for keyword in unique)
+
+# Zero-width lookahead so every position is tested for both groups without
+# consuming text; specific keywords are tried first at each position
+PEDIATRIC_PATTERN = re.compile(
+    '(?=(?P<specific>{})|(?P<broad>{}))'.format(
+        _keyword_alternation(SPECIFIC_PEDIATRIC_KEYWORDS),
+        _keyword_alternation(set(PEDIATRIC_KEYWORDS) - set(SPECIFIC_PEDIATRIC_KEYWORDS))
+    )
+)
+
+def _classify_text(text):
+    """0 = no keyword, 1 = broad pediatric keyword only, 2 = specific pediatric keyword"""
+    level = 0
+    for match in PEDIATRIC_PATTERN.finditer(text):
+        if match.lastgroup == 'specific':
+            return 2
+        level = 1
+    return level
+
+def _classify_chunk(texts):
+    return [_classify_text(text) for text in texts]
+
+def _pediatric_level_batch(batch):
+    """Batched map: pediatric level per row, text concatenated column by column"""
+    columns = list(batch.keys())
+    text = [str(value) for value in batch[columns[0]]]
+    for col in columns[1:]:
+        text = [f"{left}{FIELD_SEPARATOR}{right}" for left, right in zip(text, batch[col])]
+    return {'pediatric_level': _classify_chunk([value.lower() for value in text])}
+
+def _level_at_least(batch, minimum):
+    return [level >= minimum for level in batch['pediatric_level']]
+
+def filter_pediatric_dataset(dataset, num_proc=None, load_from_cache_file=True):
+    """Arrow-native pediatric filter for a Hugging Face Dataset
+
+    Classifies every record once in batched ``map`` calls (cached by the
+    datasets library under the dataset fingerprint, so re-runs skip the scan)
+    and returns the high-quality pediatric subset. ``load_from_cache_file=False``
+    forces a fresh scan.
+    """
     try:
         logger.info("🔍 Filtering for pediatric records...")
         
-        # Create a copy for filtering
-        pediatric_df = df.copy()
-        
-        # Define pediatric keywords for filtering
-        pediatric_keywords = [
-            'child', 'children', 'pediatric', 'infant', 'baby', 'toddler',
-            'adolescent', 'teen', 'teenager', 'youth', 'young', 'juvenile',
-            'school-age', 'preschool', 'neonatal', 'newborn', 'toddler',
-            'fever', 'cough', 'cold', 'flu', 'vaccination', 'immunization',
-            'growth', 'development', 'milestone', 'behavior', 'learning',
-            'asthma', 'allergy', 'eczema', 'diarrhea', 'vomiting', 'rash',
-            'ear infection', 'strep throat', 'pink eye', 'chickenpox',
-            'measles', 'mumps', 'rubella', 'whooping cough', 'rotavirus'
-        ]
-        
-        # Create a mask for pediatric-relevant records
-        pediatric_mask = pediatric_df.apply(
-            lambda row: any(
-                keyword.lower() in str(value).lower() 
-                for value in row.values 
-                for keyword in pediatric_keywords
-            ), axis=1
-        )
-        
-        # Apply the filter
-        pediatric_df = pediatric_df[pediatric_mask]
+        num_proc = num_proc if num_proc and num_proc > 1 else None
+        columns = dataset.column_names
+        levels = dataset.map(_pediatric_level_batch, batched=True, num_proc=num_proc,
+                             load_from_cache_file=load_from_cache_file,
+                             desc="Classifying pediatric records")
         
-        logger.info(f"📊 Pediatric records found: {len(pediatric_df)} out of {len(df)} total records")
-        logger.info(f"📈 Filtering ratio: {len(pediatric_df)/len(df)*100:.1f}%")
+        pediatric = levels.filter(_level_at_least, batched=True, fn_kwargs={'minimum': 1},
+                                  num_proc=num_proc, load_from_cache_file=load_from_cache_file)
+        logger.info(f"📊 Pediatric records found: {len(pediatric)} out of {len(dataset)} total records")
+        logger.info(f"📈 Filtering ratio: {len(pediatric)/len(dataset)*100:.1f}%")
         
-        # Additional filtering for high-quality pediatric records
-        # Look for records with more specific pediatric content
-        specific_pediatric_keywords = [
-            'pediatric', 'child', 'children', 'infant', 'baby', 'toddler',
-            'adolescent', 'teen', 'teenager', 'school-age', 'preschool'
-        ]
+        # High-quality records mention explicitly pediatric content
+        high_quality = pediatric.filter(_level_at_least, batched=True, fn_kwargs={'minimum': 2},
+                                        num_proc=num_proc, load_from_cache_file=load_from_cache_file)
+        logger.info(f"🎯 High-quality pediatric records: {len(high_quality)}")
         
-        high_quality_mask = pediatric_df.apply(
-            lambda row: any(
-                keyword.lower() in str(value).lower() 
-                for value in row.values 
-                for keyword in specific_pediatric_keywords
-            ), axis=1
-        )
-        
-        high_quality_df = pediatric_df[high_quality_mask]
-        logger.info(f"🎯 High-quality pediatric records: {len(high_quality_df)}")
-        
-        return high_quality_df
+        return high_quality.select_columns(columns)
         
     except Exception as e:
         logger.error(f"❌ Pediatric filtering failed: {e}")
-        return df
+        return dataset
+
+def _legacy_pediatric_masks(df):
+    """Original row-wise filter, kept for benchmarking the Arrow-native one"""
+    def row_matches(row, keywords):
+        return any(
+            keyword.lower() in str(value).lower()
+            for value in row.values
+            for keyword in keywords
+        )
+    
+    pediatric_mask = df.apply(lambda row: row_matches(row, PEDIATRIC_KEYWORDS), axis=1)
+    pediatric_df = df[pediatric_mask]
+    high_quality_mask = pediatric_df.apply(
+        lambda row: row_matches(row, SPECIFIC_PEDIATRIC_KEYWORDS), axis=1
+    ).reindex(df.index, fill_value=False)
+    return pediatric_mask, high_quality_mask
+
+def benchmark_pediatric_filter(dataset, num_proc=None):
+    """Time the legacy pandas filter against filter_pediatric_dataset and check they agree
+
+    The legacy timing includes the ``to_pandas`` conversion it needed; the
+    Arrow filter runs with ``load_from_cache_file=False`` so it does a full
+    first scan instead of reusing cached results.
+    """
+    start = time.perf_counter()
+    df = dataset.to_pandas()
+    _, legacy_high = _legacy_pediatric_masks(df)
+    legacy_rows = df[legacy_high.astype(bool)].to_dict('records')
+    legacy_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    arrow_rows = filter_pediatric_dataset(dataset, num_proc=num_proc, load_from_cache_file=False).to_list()
+    arrow_seconds = time.perf_counter() - start
+    
+    results = {
+        'records': len(dataset),
+        'legacy_seconds': round(legacy_seconds, 3),
+        'arrow_seconds': round(arrow_seconds, 3),
+        'speedup': round(legacy_seconds / arrow_seconds, 1) if arrow_seconds else None,
+        'num_proc': num_proc,
+        'legacy_rows': len(legacy_rows),
+        'arrow_rows': len(arrow_rows),
+        'rows_match': legacy_rows == arrow_rows
+    }
+    logger.info(f"⏱️ Pediatric filter benchmark: {results}")
+    return results
 
 def analyze_dataset(df, filename_prefix):
     """Analyze the dataset and generate insights"""
     try:
         logger.info(f"📊 Analyzing {filename_prefix} dataset...")
         
-        analysis = {
-            'total_records': len(df),
-            'columns': list(df.columns),
-            'column_types': df.dtypes.to_dict(),
-            'missing_values': df.isnull().sum().to_dict(),
-            'sample_records': df.head(3).to_dict('records')
-        }
+        if hasattr(df, 'column_names'):
+            # Hugging Face Dataset: read null counts from Arrow batches
+            missing_values = {col: 0 for col in df.column_names}
+            for batch in df.with_format('arrow').iter(batch_size=50_000):
+                for col in df.column_names:
+                    missing_values[col] += batch.column(col).null_count
+            analysis = {
+                'total_records': len(df),
+                'columns': df.column_names,
+                'column_types': {col: str(feature) for col, feature in df.features.items()},
+                'missing_values': missing_values,
+                'sample_records': df.select(range(min(3, len(df)))).to_list()
+            }
+        else:
+            analysis = {
+                'total_records': len(df),
+                'columns': list(df.columns),
+                'column_types': df.dtypes.to_dict(),
+                'missing_values': df.isnull().sum().to_dict(),
+                'sample_records': df.head(3).to_dict('records')
+            }
         
         # Save analysis
         analysis_file = Path(f"python/disease_database_training/processed/{filename_prefix}_analysis.json")
@@ -144,7 +240,7 @@ def analyze_dataset(df, filename_prefix):
             json.dump(analysis, f, indent=2, default=str)
         
         logger.info(f"📈 Analysis saved to: {analysis_file}")
-        logger.info(f"📊 Dataset summary: {len(df)} records, {len(df.columns)} columns")
+        logger.info(f"📊 Dataset summary: {len(df)} records, {len(analysis['columns'])} columns")
         
         return analysis
         
@@ -152,26 +248,17 @@ def analyze_dataset(df, filename_prefix):
         logger.error(f"❌ Dataset analysis failed: {e}")
         return None
 
-def save_processed_dataset(df, filename):
-    """Save processed dataset in multiple formats"""
+def save_processed_dataset(df, filename, secondary_formats=()):
+    """Save processed dataset to the Parquet store
+
+    JSON/CSV copies are generated lazily with ``dataset_store.ensure_format``
+    unless requested here via ``secondary_formats``.
+    """
     try:
         processed_dir = Path("python/disease_database_training/processed")
-        processed_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Save as JSON
-        json_file = processed_dir / f"{filename}.json"
-        df.to_json(json_file, orient='records', indent=2)
-        logger.info(f"💾 JSON saved: {json_file}")
         
-        # Save as CSV
-        csv_file = processed_dir / f"{filename}.csv"
-        df.to_csv(csv_file, index=False)
-        logger.info(f"💾 CSV saved: {csv_file}")
-        
-        # Save as Parquet
-        parquet_file = processed_dir / f"{filename}.parquet"
-        df.to_parquet(parquet_file, index=False)
-        logger.info(f"💾 Parquet saved: {parquet_file}")
+        manifest = write_dataset(df, processed_dir, filename, secondary_formats=secondary_formats)
+        logger.info(f"📦 Bytes written for {filename}: {manifest['bytes_written']}")
         
         return True
         
@@ -324,6 +411,13 @@ class PediatricDiseaseService {
 
 def main():
     """Main download and processing function"""
+    parser = argparse.ArgumentParser(description="Download and filter the Disease Database")
+    parser.add_argument('--jobs', type=int, default=1, help="Worker processes (datasets num_proc) for pediatric filtering")
+    parser.add_argument('--benchmark', action='store_true', help="Benchmark the pediatric filter and dataset formats against the previous versions")
+    parser.add_argument('--formats', nargs='*', default=[], choices=['json', 'csv'],
+                        help="Secondary formats to write eagerly next to the Parquet store")
+    args = parser.parse_args()
+    
     logger.info("🚀 BeforeDoctor Disease Database Download Script")
     logger.info("=" * 60)
     
@@ -336,16 +430,22 @@ def main():
         logger.error("❌ Failed to download dataset. Exiting.")
         return
     
+    if args.benchmark:
+        benchmark_pediatric_filter(df, num_proc=args.jobs)
+    
     # Filter for pediatric records
-    pediatric_df = filter_pediatric_records(df)
+    pediatric_df = filter_pediatric_dataset(df, num_proc=args.jobs)
     
     # Analyze datasets
     analyze_dataset(df, "disease_database_original")
     analyze_dataset(pediatric_df, "disease_database_pediatric")
     
     # Save processed datasets
-    save_processed_dataset(df, "disease_database_original")
-    save_processed_dataset(pediatric_df, "disease_database_pediatric")
+    save_processed_dataset(df, "disease_database_original", args.formats)
+    save_processed_dataset(pediatric_df, "disease_database_pediatric", args.formats)
+    
+    if args.benchmark:
+        benchmark_formats(pediatric_df.to_pandas(), columns=['disease', 'common_symptom', 'treatment'])
     
     # Create Flutter integration
     create_flutter_integration()
@@ -358,10 +458,9 @@ def main():
     
     logger.info("\n🎉 Disease Database processing completed!")
     logger.info("\n📁 Files created:")
-    logger.info("- python/disease_database_training/data/disease_database_original.json")
-    logger.info("- python/disease_database_training/processed/disease_database_pediatric.json")
-    logger.info("- python/disease_database_training/processed/disease_database_pediatric.csv")
+    logger.info("- python/disease_database_training/data/disease_database_original.jsonl")
     logger.info("- python/disease_database_training/processed/disease_database_pediatric.parquet")
+    logger.info("- python/disease_database_training/processed/disease_database_pediatric.manifest.json")
     logger.info("- beforedoctor/lib/services/pediatric_disease_service.dart")
     
     logger.info("\n📋 Next Steps:")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Shared TF-IDF Feature Store for BeforeDoctor trainers
+Tokenizes a text corpus once, caches the term-count matrix on disk and derives
+TF-IDF feature spaces of different sizes from it
+"""
+
+import json
+import shutil
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, Sequence
+
+import numpy as np
+import joblib
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+
+
+class TfidfProjection(BaseEstimator, TransformerMixin):
+    """Transform-capable TF-IDF view over a shared count matrix
+
+    Equivalent to a ``TfidfVectorizer(max_features=k)`` fitted on the same
+    corpus: the k most frequent terms of the shared vocabulary are kept and
+    IDF weights are computed on those columns. ``vectorizer`` only knows the
+    k kept terms, so a pickled projection stays small. Usable as the first
+    step of a sklearn ``Pipeline``.
+    """
+
+    def __init__(self, vectorizer: CountVectorizer, columns: np.ndarray,
+                 tfidf: TfidfTransformer):
+        self.vectorizer = vectorizer
+        self.columns = columns
+        self.tfidf = tfidf
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return self.tfidf.transform(self.vectorizer.transform(X))
+
+    def transform_counts(self, counts):
+        """Transform rows of the shared count matrix without re-tokenizing"""
+        return self.tfidf.transform(counts[:, self.columns])
+
+    def get_feature_names_out(self, input_features=None):
+        return self.vectorizer.get_feature_names_out()
+
+
+class TfidfFeatureStore:
+    """Count matrix cache keyed by data hash plus vectorizer parameters
+
+    The CSR arrays are stored as separate ``.npy`` files so they can be
+    memory-mapped on load; each model then receives TF-IDF slices derived
+    from that single tokenization. Fit it on training rows only and use
+    :meth:`transform` for held-out rows. Entries are named ``<name>-<hash>``
+    and a new entry replaces the older ones of the same ``name``.
+    """
+
+    def __init__(self, cache_dir, name='corpus', ngram_range=(1, 2), stop_words='english', lowercase=True):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.params = {
+            'ngram_range': list(ngram_range),
+            'stop_words': stop_words,
+            'lowercase': lowercase,
+        }
+        self.key = None
+        self.counts: Optional[sparse.csr_matrix] = None
+        self.count_vectorizer: Optional[CountVectorizer] = None
+        self._term_frequencies = None
+        self._projections: Dict[int, TfidfProjection] = {}
+
+    def _cache_key(self, texts: Sequence[str]) -> str:
+        digest = hashlib.sha256()
+        digest.update(json.dumps({'version': STORE_VERSION, **self.params}, sort_keys=True).encode('utf-8'))
+        for text in texts:
+            digest.update(str(text).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()[:24]
+
+    def fit(self, texts: Sequence[str]) -> 'TfidfFeatureStore':
+        """Tokenize ``texts`` once, or reuse the cached count matrix for them"""
+        texts = list(texts)
+        self.key = f"{self.name}-{self._cache_key(texts)}"
+        entry = self.cache_dir / self.key
+
+        if (entry / "meta.json").exists():
+            logger.info(f"📦 Feature store hit: {entry}")
+        else:
+            logger.info(f"🔤 Tokenizing {len(texts)} documents for feature store {self.key}")
+            vectorizer = CountVectorizer(
+                ngram_range=tuple(self.params['ngram_range']),
+                stop_words=self.params['stop_words'],
+                lowercase=self.params['lowercase']
+            )
+            counts = vectorizer.fit_transform(texts).tocsr()
+
+            entry.mkdir(parents=True, exist_ok=True)
+            np.save(entry / "data.npy", counts.data)
+            np.save(entry / "indices.npy", counts.indices)
+            np.save(entry / "indptr.npy", counts.indptr)
+            joblib.dump(vectorizer, entry / "vectorizer.pkl")
+            with open(entry / "meta.json", 'w', encoding='utf-8') as f:
+                json.dump({'shape': list(counts.shape), 'params': self.params,
+                           'documents': len(texts)}, f, indent=2)
+            self._remove_stale_entries()
+
+        self._load(entry)
+        return self
+
+    def _remove_stale_entries(self):
+        """Drop entries of this store's ``name`` left behind by earlier data"""
+        for stale in self.cache_dir.glob(f"{self.name}-*"):
+            if stale.is_dir() and stale.name != self.key:
+                shutil.rmtree(stale, ignore_errors=True)
+                logger.info(f"🧹 Removed stale feature store entry: {stale}")
+
+    def _load(self, entry: Path):
+        with open(entry / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        data = np.load(entry / "data.npy", mmap_mode='r')
+        indices = np.load(entry / "indices.npy", mmap_mode='r')
+        indptr = np.load(entry / "indptr.npy", mmap_mode='r')
+        self.counts = sparse.csr_matrix((data, indices, indptr), shape=tuple(meta['shape']), copy=False)
+        self.count_vectorizer = joblib.load(entry / "vectorizer.pkl")
+        self._term_frequencies = np.asarray(self.counts.sum(axis=0)).ravel()
+        self._projections = {}
+
+    def projection(self, max_features: int) -> TfidfProjection:
+        """TF-IDF space limited to the ``max_features`` most frequent terms"""
+        if self.counts is None:
+            raise RuntimeError("Feature store has not been fitted")
+        if max_features not in self._projections:
+            limit = min(max_features, len(self._term_frequencies))
+            # Same selection rule as CountVectorizer(max_features=...)
+            columns = np.sort(np.argsort(-self._term_frequencies, kind='stable')[:limit])
+            tfidf = TfidfTransformer().fit(self.counts[:, columns])
+            terms = self.count_vectorizer.get_feature_names_out()[columns]
+            vectorizer = CountVectorizer(
+                ngram_range=tuple(self.params['ngram_range']),
+                stop_words=self.params['stop_words'],
+                lowercase=self.params['lowercase'],
+                vocabulary={term: i for i, term in enumerate(terms)}
+            )
+            self._projections[max_features] = TfidfProjection(vectorizer, columns, tfidf)
+        return self._projections[max_features]
+
+    def features(self, max_features: int, rows=None) -> sparse.csr_matrix:
+        """TF-IDF matrix for ``rows`` (all rows by default) of the stored corpus"""
+        counts = self.counts if rows is None else self.counts[rows]
+        return self.projection(max_features).transform_counts(counts)
+
+    def transform(self, texts: Sequence[str], max_features: int) -> sparse.csr_matrix:
+        """TF-IDF matrix for texts outside the stored corpus, e.g. a test split"""
+        return self.projection(max_features).transform(list(texts))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'key': self.key,
+            'documents': self.counts.shape[0] if self.counts is not None else 0,
+            'vocabulary_size': self.counts.shape[1] if self.counts is not None else 0,
+            'projections': sorted(self._projections),
+            'params': self.params,
+        }
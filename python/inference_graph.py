@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Text Inference Graph for BeforeDoctor
+One vectorizer feeding several classifier heads, saved as a single artifact,
+so a request is tokenized once no matter how many heads score it
+"""
+
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import joblib
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceGraph:
+    """Shared featurization + multiple heads (e.g. symptom, risk, severity)
+
+    Every head must have been trained on the output of ``vectorizer``.
+    """
+
+    def __init__(self, vectorizer, heads: Optional[Dict[str, Any]] = None):
+        self.vectorizer = vectorizer
+        self.heads: Dict[str, Any] = dict(heads or {})
+
+    def add_head(self, name: str, model) -> 'InferenceGraph':
+        self.heads[name] = model
+        return self
+
+    def predict_batch(self, texts: Sequence[str], heads: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Transform the batch once and fan the sparse matrix out to every head"""
+        features = self.vectorizer.transform(list(texts))
+        results = [{} for _ in range(features.shape[0])]
+        for name in heads or self.heads:
+            model = self.heads[name]
+            if hasattr(model, 'predict_proba'):
+                probabilities = model.predict_proba(features)
+                best = probabilities.argmax(axis=1)
+                for row, (index, proba) in enumerate(zip(best, probabilities)):
+                    results[row][name] = str(model.classes_[index])
+                    results[row][f'{name}_confidence'] = round(float(proba[index]), 4)
+            else:
+                for row, label in enumerate(model.predict(features)):
+                    results[row][name] = str(label)
+        return results
+
+    def predict(self, text: str, heads: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        return self.predict_batch([text], heads)[0]
+
+    def save(self, path) -> Path:
+        path = Path(path)
+        joblib.dump({'vectorizer': self.vectorizer, 'heads': self.heads}, path)
+        logger.info(f"💾 Inference graph saved: {path} (heads: {', '.join(self.heads)})")
+        return path
+
+    @classmethod
+    def load(cls, path) -> 'InferenceGraph':
+        artifact = joblib.load(path)
+        return cls(artifact['vectorizer'], artifact['heads'])
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    return {
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3)
+    }
+
+
+def benchmark_against_independent(graph_path, independent: Dict[str, Tuple[Path, Path]],
+                                   texts: Sequence[str]) -> Dict[str, Any]:
+    """Per-request latency of the graph vs each (vectorizer, model) pickle pair on its own
+
+    ``independent`` maps head name to ``(vectorizer_path, model_path)``.
+    Cold-load time of the single artifact vs all pickles is reported too.
+    """
+    start = time.perf_counter()
+    graph = InferenceGraph.load(graph_path)
+    graph_load_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    pipelines = {name: (joblib.load(vec_path), joblib.load(model_path))
+                 for name, (vec_path, model_path) in independent.items()}
+    independent_load_ms = (time.perf_counter() - start) * 1000
+
+    shared, separate = [], []
+    for text in texts:
+        start = time.perf_counter()
+        graph.predict(text, heads=list(pipelines))
+        shared.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        for vectorizer, model in pipelines.values():
+            model.predict_proba(vectorizer.transform([text]))
+        separate.append((time.perf_counter() - start) * 1000)
+
+    results = {
+        'requests': len(texts),
+        'heads': list(pipelines),
+        'graph': dict(_percentiles(shared), cold_load_ms=round(graph_load_ms, 3)),
+        'independent': dict(_percentiles(separate), cold_load_ms=round(independent_load_ms, 3)),
+    }
+    results['saved_ms_per_request'] = round(float(np.mean(separate) - np.mean(shared)), 3)
+    logger.info(f"⏱️ Inference graph benchmark: {results}")
+    return results
@@ -12,12 +12,16 @@ import subprocess
 from datetime import datetime
 from pathlib import Path
 
+from artifact_cache import ArtifactCache, TRAINING_MODULE_ARTIFACTS, DEFAULT_MAX_GB, DEFAULT_MAX_AGE_DAYS
+from training_scheduler import DagScheduler, TrainingTask
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class MasterTrainingOrchestrator:
-    def __init__(self):
+    def __init__(self, cpu_slots=None, force=False, cache_max_gb=DEFAULT_MAX_GB,
+                 cache_max_age_days=DEFAULT_MAX_AGE_DAYS):
         self.base_dir = Path(__file__).parent
         self.training_modules = {
             "cdc": "cdc_training/cdc_model_trainer.py",
@@ -27,6 +31,36 @@ class MasterTrainingOrchestrator:
             "risk": "risk_training/risk_model_trainer.py",
             "diseases_symptoms": "diseases_symptoms_training/diseases_symptoms_trainer.py"
         }
+        # Pipeline stages per module in dependency order: (stage, script, args, max CPU slots)
+        diseases_symptoms = self.training_modules["diseases_symptoms"]
+        self.module_stages = {
+            "cdc": [("train", self.training_modules["cdc"], [], 4)],
+            "voice": [("train", self.training_modules["voice"], [], 4)],
+            "treatment": [
+                ("process", "treatment_store.py", ["--compile-only"], 1),
+                ("train", self.training_modules["treatment"], [], 4)
+            ],
+            "conversation": [("train", self.training_modules["conversation"], [], 2)],
+            "risk": [("train", self.training_modules["risk"], [], 2)],
+            "diseases_symptoms": [
+                ("download", diseases_symptoms, ["--stage", "download"], 1),
+                ("process", diseases_symptoms, ["--stage", "process"], 4),
+                ("train", diseases_symptoms, ["--stage", "train"], 8),
+                ("flutter", diseases_symptoms, ["--stage", "flutter"], 1)
+            ]
+        }
+        self.cpu_slots = cpu_slots or os.cpu_count() or 1
+        self.schedule_path = self.base_dir / "outputs" / "training_schedule.json"
+        self.schedule_report = None
+        # Unchanged modules are restored from the artifact cache unless forced
+        self.cache = ArtifactCache(self.base_dir / "processed" / "artifact_cache", root=self.base_dir)
+        self.force = force
+        self.cache_max_bytes = int(cache_max_gb * 1024 ** 3)
+        self.cache_max_age_days = cache_max_age_days
+        self.cache_keys = {}
+        # results holds one entry per module; per-stage outcomes go to the schedule report
+        self.module_stage_names = {}
+        self.stage_results = {}
         self.results = {}
         
     def setup_environment(self):
@@ -40,7 +74,7 @@ class MasterTrainingOrchestrator:
         
         # Create training module directories
         for module_name in self.training_modules.keys():
-            module_dir = self.base_dir / module_name + "_training"
+            module_dir = self.base_dir / f"{module_name}_training"
             os.makedirs(module_dir, exist_ok=True)
             os.makedirs(module_dir / "models", exist_ok=True)
             os.makedirs(module_dir / "processed", exist_ok=True)
@@ -90,45 +124,148 @@ class MasterTrainingOrchestrator:
             }
             return False
     
-    def run_all_training_modules(self):
-        """Run all training modules in sequence"""
-        logger.info("Starting complete training pipeline...")
+    def build_training_graph(self, module_names):
+        """Stage tasks for the given modules plus the final Flutter export"""
+        tasks, last_stages = [], []
+        for module_name in module_names:
+            stages = self.module_stages[module_name]
+            missing = [script for _, script, _, _ in stages if not (self.base_dir / script).exists()]
+            if missing:
+                logger.error(f"Training module not found: {self.base_dir / missing[0]}")
+                self.results[module_name] = {
+                    "status": "error",
+                    "timestamp": datetime.now().isoformat(),
+                    "error": f"Training module not found: {missing[0]}"
+                }
+                continue
+            
+            if module_name in TRAINING_MODULE_ARTIFACTS:
+                key = self.cache.module_key(module_name)
+                manifest = None if self.force or key is None else self.cache.restore(key)
+                if manifest:
+                    self.results[module_name] = {
+                        "status": "cached",
+                        "timestamp": datetime.now().isoformat(),
+                        "cache_key": key,
+                        "artifacts": [f["path"] for f in manifest["files"]]
+                    }
+                    continue
+                if key is not None:
+                    self.cache_keys[module_name] = key
+            
+            previous = None
+            self.module_stage_names[module_name] = []
+            for stage, script, args, slots in stages:
+                name = f"{module_name}:{stage}"
+                self.module_stage_names[module_name].append(name)
+                tasks.append(TrainingTask(
+                    name,
+                    command=[sys.executable, str(self.base_dir / script), *args],
+                    depends_on=[previous] if previous else [],
+                    slots=slots,
+                    cwd=self.base_dir
+                ))
+                previous = name
+            last_stages.append(previous)
         
-        # Setup environment
+        # The master integration is a template, so it is written whatever the outcome
+        tasks.append(TrainingTask("flutter_export", action=self.create_flutter_integration,
+                                  depends_on=last_stages, requires_success=False))
+        return tasks
+    
+    def _record_task(self, task):
+        """Record a finished stage; a module's result is set when its last stage ends"""
+        stage_result = {"status": task.status, "duration_seconds": round(task.duration, 3)}
+        if task.status == "skipped":
+            stage_result["error"] = "A dependency did not succeed"
+        elif task.status != "success":
+            stage_result["error"] = task.error or f"Exit code {task.returncode}"
+        self.stage_results[task.name] = stage_result
+        
+        module_name = next((m for m, names in self.module_stage_names.items() if names[-1] == task.name), None)
+        if module_name is None:
+            return
+        
+        stage_names = self.module_stage_names[module_name]
+        result = {
+            "status": task.status,
+            "timestamp": datetime.now().isoformat(),
+            "duration_seconds": round(sum(self.stage_results[n]["duration_seconds"] for n in stage_names
+                                          if n in self.stage_results), 3)
+        }
+        if task.status == "success":
+            result["output"] = task.output
+        else:
+            # Report the stage that actually failed rather than the skipped ones after it
+            failed = next((n for n in stage_names if self.stage_results.get(n, {}).get("status") in ("failed", "error")),
+                          task.name)
+            result["status"] = self.stage_results[failed]["status"]
+            result["failed_stage"] = failed
+            result["error"] = self.stage_results[failed]["error"]
+        self.results[module_name] = result
+        
+        # A module's outputs are cached once its last stage succeeds
+        if task.status == "success" and module_name in self.cache_keys:
+            self.cache.store(self.cache_keys[module_name], module_name,
+                             TRAINING_MODULE_ARTIFACTS[module_name]["outputs"])
+    
+    def _load_schedule_history(self):
+        """Stage durations of the previous run, used to prioritize the critical path"""
+        try:
+            with open(self.schedule_path, "r") as f:
+                return json.load(f).get("durations", {})
+        except (OSError, ValueError):
+            return {}
+    
+    def run_training_graph(self, module_names):
+        """Run the stages of ``module_names`` as a DAG under the CPU-slot budget"""
         self.setup_environment()
         
-        # Run each training module
-        for module_name in self.training_modules.keys():
-            success = self.run_training_module(module_name)
-            if not success:
-                logger.warning(f"⚠️ {module_name} training failed, continuing with next module")
+        scheduler = DagScheduler(self.build_training_graph(module_names), cpu_slots=self.cpu_slots,
+                                 history=self._load_schedule_history())
+        logger.info(f"🗓️ Scheduling {len(scheduler.tasks)} stages on {scheduler.cpu_slots} CPU slots")
+        scheduler.run(on_finish=self._record_task)
+        
+        self.schedule_report = scheduler.critical_path_report()
+        self.schedule_report["durations"] = scheduler.durations()
+        for name, stage_result in self.stage_results.items():
+            if "error" in stage_result:
+                self.schedule_report["tasks"][name]["error"] = stage_result["error"]
+        with open(self.schedule_path, "w") as f:
+            json.dump(self.schedule_report, f, indent=2)
+        
+        logger.info(f"⏱️ Wall time {self.schedule_report['wall_seconds']:.1f}s vs "
+                    f"{self.schedule_report['serial_seconds']:.1f}s serial "
+                    f"(speedup {self.schedule_report['speedup']}x, "
+                    f"slot utilization {self.schedule_report['slot_utilization']})")
+        logger.info(f"🧭 Critical path ({self.schedule_report['critical_path_seconds']:.1f}s): "
+                    f"{' -> '.join(self.schedule_report['critical_path'])}")
+        
+        self.cache.evict(max_bytes=self.cache_max_bytes, max_age_days=self.cache_max_age_days)
         
         # Generate summary report
         self.generate_training_summary()
-        
-        logger.info("Complete training pipeline finished")
         return self.results
     
+    def run_all_training_modules(self):
+        """Run all training modules, independent stages in parallel"""
+        logger.info("Starting complete training pipeline...")
+        results = self.run_training_graph(list(self.training_modules))
+        logger.info("Complete training pipeline finished")
+        return results
+    
     def run_specific_modules(self, module_names):
         """Run specific training modules"""
         logger.info(f"Running specific modules: {module_names}")
         
-        # Setup environment
-        self.setup_environment()
-        
-        # Run specified modules
+        known = []
         for module_name in module_names:
             if module_name in self.training_modules:
-                success = self.run_training_module(module_name)
-                if not success:
-                    logger.warning(f"⚠️ {module_name} training failed")
+                known.append(module_name)
             else:
                 logger.error(f"❌ Unknown training module: {module_name}")
         
-        # Generate summary report
-        self.generate_training_summary()
-        
-        return self.results
+        return self.run_training_graph(known)
     
     def generate_training_summary(self):
         """Generate training summary report"""
@@ -140,7 +277,10 @@ class MasterTrainingOrchestrator:
             "successful_modules": sum(1 for r in self.results.values() if r["status"] == "success"),
             "failed_modules": sum(1 for r in self.results.values() if r["status"] == "failed"),
             "error_modules": sum(1 for r in self.results.values() if r["status"] == "error"),
+            "skipped_modules": sum(1 for r in self.results.values() if r["status"] == "skipped"),
+            "cached_modules": sum(1 for r in self.results.values() if r["status"] == "cached"),
             "module_results": self.results,
+            "schedule": self.schedule_report,
             "training_datasets": {
                 "voice": "pediatric_symptom_dataset_comprehensive.json (5,064 records)",
                 "treatment": "pediatric_symptom_treatment_large.json (26,794 records)",
@@ -161,9 +301,11 @@ class MasterTrainingOrchestrator:
         logger.info(f"Successful: {summary['successful_modules']}")
         logger.info(f"Failed: {summary['failed_modules']}")
         logger.info(f"Errors: {summary['error_modules']}")
+        logger.info(f"Skipped: {summary['skipped_modules']}")
+        logger.info(f"Restored from cache: {summary['cached_modules']}")
         
         for module_name, result in self.results.items():
-            status_emoji = "✅" if result["status"] == "success" else "❌"
+            status_emoji = {"success": "✅", "cached": "♻️"}.get(result["status"], "❌")
             logger.info(f"{status_emoji} {module_name}: {result['status']}")
         
         logger.info(f"Summary saved to: {summary_path}")
@@ -309,20 +451,30 @@ class MasterAIModelService {
 
 def main():
     """Main function to run training orchestrator"""
-    orchestrator = MasterTrainingOrchestrator()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Run BeforeDoctor training modules as a parallel DAG")
+    parser.add_argument('modules', nargs='*', help="Modules to run (default: all)")
+    parser.add_argument('--cpu-slots', type=int, default=None,
+                        help="Global CPU budget shared by concurrent stages (default: all cores)")
+    parser.add_argument('--force', action='store_true',
+                        help="Retrain every module even when its cached artifacts are up to date")
+    parser.add_argument('--cache-max-gb', type=float, default=DEFAULT_MAX_GB,
+                        help="Evict least recently used cache entries beyond this size")
+    parser.add_argument('--cache-max-age-days', type=float, default=DEFAULT_MAX_AGE_DAYS,
+                        help="Evict cache entries unused for this many days")
+    args = parser.parse_args()
     
-    # Check command line arguments
-    if len(sys.argv) > 1:
-        # Run specific modules
-        module_names = sys.argv[1:]
-        results = orchestrator.run_specific_modules(module_names)
+    orchestrator = MasterTrainingOrchestrator(cpu_slots=args.cpu_slots, force=args.force,
+                                              cache_max_gb=args.cache_max_gb,
+                                              cache_max_age_days=args.cache_max_age_days)
+    
+    # The Flutter integration is the final stage of the graph
+    if args.modules:
+        results = orchestrator.run_specific_modules(args.modules)
     else:
-        # Run all modules
         results = orchestrator.run_all_training_modules()
     
-    # Create Flutter integration
-    orchestrator.create_flutter_integration()
-    
     print("🎯 Training orchestration completed!")
     return results
 
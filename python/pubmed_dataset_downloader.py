@@ -12,6 +12,14 @@ from datetime import datetime
 from typing import List, Dict, Any
 import logging
 
+from pubmed_statistics import (
+    StudyStatisticsAggregator,
+    StudyStreamWriter,
+    iter_jsonl,
+    write_json_document,
+)
+from pubmed_evidence_index import EvidenceIndex
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -89,6 +97,8 @@ class PubMedDatasetDownloader:
         }
         
         self.studies = []
+        self.stats = StudyStatisticsAggregator()
+        self.stream_path = None
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'BeforeDoctor/1.0 (https://github.com/beforedoctor)'
@@ -296,125 +306,160 @@ class PubMedDatasetDownloader:
         
         return min(score, 1.0)
 
-    def download_all_studies(self) -> List[Dict[str, Any]]:
-        """Download all studies from PubMed"""
-        all_studies = []
-        
-        for query in self.search_queries:
-            logger.info(f"Processing query: {query}")
-            
-            # Search for studies
-            pmid_list = self.search_pubmed(query)
-            
-            # Fetch details for each study
-            for pmid in pmid_list:
-                study = self.fetch_study_details(pmid)
-                if study:
-                    all_studies.append(study)
-                
-                # Rate limiting to respect PubMed API guidelines (3 requests per second)
-                time.sleep(0.4)
-            
-            # Rate limiting between queries
-            time.sleep(2)
-        
-        # Remove duplicates based on PMID
+    def download_all_studies(self, stream_dir: str = None, keep_in_memory: bool = True,
+                             parquet: bool = False) -> List[Dict[str, Any]]:
+        """Download all studies from PubMed
+
+        Statistics are aggregated as studies arrive. When ``stream_dir`` is
+        given each unique study is also appended to a JSONL (and optionally
+        Parquet) file there; combine with ``keep_in_memory=False`` to keep
+        memory flat for large harvests.
+        """
+        self.stats = StudyStatisticsAggregator()
         unique_studies = {}
-        for study in all_studies:
-            unique_studies[study['pmid']] = study
+        seen_pmids = set()
+        writer = None
+
+        if stream_dir:
+            os.makedirs(stream_dir, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.stream_path = os.path.join(stream_dir, f"pubmed_pediatric_studies_{timestamp}.jsonl")
+            parquet_path = self.stream_path[:-len('.jsonl')] + '.parquet' if parquet else None
+            writer = StudyStreamWriter(self.stream_path, parquet_path)
+
+        try:
+            for query in self.search_queries:
+                logger.info(f"Processing query: {query}")
+                
+                # Search for studies
+                pmid_list = self.search_pubmed(query)
+                
+                # Fetch details for each study
+                for pmid in pmid_list:
+                    if pmid in seen_pmids:
+                        continue
+                    study = self.fetch_study_details(pmid)
+                    if study:
+                        seen_pmids.add(pmid)
+                        self.stats.update(study)
+                        if writer:
+                            writer.write(study)
+                        if keep_in_memory:
+                            unique_studies[pmid] = study
+                    
+                    # Rate limiting to respect PubMed API guidelines (3 requests per second)
+                    time.sleep(0.4)
+                
+                # Rate limiting between queries
+                time.sleep(2)
+        finally:
+            if writer:
+                writer.close()
         
         self.studies = list(unique_studies.values())
-        logger.info(f"Downloaded {len(self.studies)} unique studies")
+        logger.info(f"Downloaded {self.stats.total_studies} unique studies")
         
         return self.studies
 
-    def save_to_json(self, filename: str = None) -> str:
+    def iter_studies(self):
+        """Iterate over harvested studies, from memory or the JSONL stream"""
+        if self.studies or not self.stream_path:
+            return iter(self.studies)
+        return iter_jsonl(self.stream_path)
+
+    def save_to_json(self, filename: str = None, compress: bool = False) -> str:
         """Save studies to JSON file"""
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"pubmed_pediatric_studies_{timestamp}.json"
+            if compress:
+                filename += '.gz'
         
-        data = {
+        statistics = self.generate_statistics()
+        header = {
             'metadata': {
-                'total_studies': len(self.studies),
+                'total_studies': statistics['total_studies'],
                 'download_date': datetime.now().isoformat(),
                 'search_queries': self.search_queries,
                 'version': '1.0'
-            },
-            'studies': self.studies,
-            'statistics': self.generate_statistics()
+            }
         }
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        count = write_json_document(filename, header, self.iter_studies(),
+                                    trailer={'statistics': statistics},
+                                    compress=compress, indent=None if compress else 2)
         
-        logger.info(f"Saved {len(self.studies)} studies to {filename}")
+        logger.info(f"Saved {count} studies to {filename}")
         return filename
 
     def generate_statistics(self) -> Dict[str, Any]:
-        """Generate statistics from downloaded studies"""
-        stats = {
-            'total_studies': len(self.studies),
-            'study_types': {},
-            'age_groups': {},
-            'symptoms_covered': {},
-            'treatments_mentioned': {},
-            'publication_years': {},
-            'sample_sizes': []
-        }
-        
-        for study in self.studies:
-            # Study types
-            study_type = study.get('study_type', 'Unknown')
-            stats['study_types'][study_type] = stats['study_types'].get(study_type, 0) + 1
-            
-            # Age groups
-            age_group = study.get('age_group', 'Not specified')
-            stats['age_groups'][age_group] = stats['age_groups'].get(age_group, 0) + 1
-            
-            # Symptoms
-            for symptom in study.get('symptom_focus', []):
-                stats['symptoms_covered'][symptom] = stats['symptoms_covered'].get(symptom, 0) + 1
-            
-            # Treatments
-            for treatment in study.get('treatment_mentioned', []):
-                stats['treatments_mentioned'][treatment] = stats['treatments_mentioned'].get(treatment, 0) + 1
-            
-            # Publication years
-            pubdate = study.get('pubdate', '')
-            if pubdate:
-                import re
-                year_match = re.search(r'(\d{4})', pubdate)
-                if year_match:
-                    year = year_match.group(1)
-                    stats['publication_years'][year] = stats['publication_years'].get(year, 0) + 1
-            
-            # Sample sizes
-            sample_size = study.get('sample_size', 0)
-            if sample_size > 0:
-                stats['sample_sizes'].append(sample_size)
-        
-        return stats
+        """Generate statistics from downloaded studies
+
+        Returns the running aggregate maintained during download. If
+        ``self.studies`` was replaced from outside, the aggregate is rebuilt
+        once from it.
+        """
+        if self.studies and self.stats.total_studies != len(self.studies):
+            self.stats = StudyStatisticsAggregator()
+            self.stats.update_many(self.studies)
+        
+        return self.stats.to_dict()
 
-    def export_for_flutter(self, output_dir: str = "assets/data") -> str:
-        """Export data in format suitable for Flutter app"""
+    def export_for_flutter(self, output_dir: str = "assets/data", compress: bool = False) -> str:
+        """Export data in format suitable for Flutter app
+
+        Written as compact JSON; with ``compress`` the artifact is gzipped
+        (``pubmed_pediatric_studies.json.gz``).
+        """
         os.makedirs(output_dir, exist_ok=True)
         
         # Create Flutter-compatible JSON
-        flutter_data = {
-            'studies': self.studies,
+        header = {
             'statistics': self.generate_statistics(),
             'last_updated': datetime.now().isoformat(),
             'version': '1.0'
         }
         
-        output_file = os.path.join(output_dir, "pubmed_pediatric_studies.json")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(flutter_data, f, indent=2, ensure_ascii=False)
+        filename = "pubmed_pediatric_studies.json.gz" if compress else "pubmed_pediatric_studies.json"
+        output_file = os.path.join(output_dir, filename)
+        write_json_document(output_file, header, self.iter_studies(), compress=compress)
         
         logger.info(f"Exported Flutter-compatible data to {output_file}")
         return output_file
 
+    def export_evidence_index(self, output_dir: str = "assets/data", top_k: int = 10) -> str:
+        """Build the evidence index and export per-symptom top studies for Flutter"""
+        os.makedirs(output_dir, exist_ok=True)
+        
+        index = EvidenceIndex.build(self.iter_studies())
+        index_file = index.save(os.path.join(output_dir, "pubmed_evidence_index.json.gz"))
+        
+        symptoms = sorted(index.facet_values('symptom'))
+        age_groups = sorted(index.facet_values('age'))
+        queries = [{'symptom': symptom} for symptom in symptoms]
+        queries += [{'symptom': symptom, 'age': age} for symptom in symptoms for age in age_groups]
+        results = index.query_batch(queries, top_k=top_k)
+        
+        evidence = {'by_symptom': {}, 'by_symptom_age': {}}
+        for query, docs in zip(queries, results):
+            pmids = [doc['pmid'] for doc in docs]
+            if 'age' in query:
+                if pmids:
+                    evidence['by_symptom_age'].setdefault(query['symptom'], {})[query['age']] = pmids
+            else:
+                evidence['by_symptom'][query['symptom']] = pmids
+        
+        evidence_file = os.path.join(output_dir, "pubmed_symptom_evidence.json")
+        with open(evidence_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'evidence': evidence,
+                'last_updated': datetime.now().isoformat(),
+                'version': '1.0'
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        
+        logger.info(f"Exported evidence index to {index_file} and {evidence_file}")
+        return index_file
+
 def main():
     """Main function to download PubMed datasets"""
     logger.info("Starting PubMed dataset download for BeforeDoctor")
@@ -422,8 +467,9 @@ def main():
     downloader = PubMedDatasetDownloader()
     
     try:
-        # Download all studies
-        studies = downloader.download_all_studies()
+        # Download all studies, streamed to disk so memory stays flat
+        downloader.download_all_studies(stream_dir=os.path.join("processed", "pubmed"),
+                                        keep_in_memory=False)
         
         # Save to JSON
         json_file = downloader.save_to_json()
@@ -431,6 +477,9 @@ def main():
         # Export for Flutter
         flutter_file = downloader.export_for_flutter()
         
+        # Export evidence index for symptom/treatment lookups
+        downloader.export_evidence_index()
+        
         # Print statistics
         stats = downloader.generate_statistics()
         logger.info(f"Download completed successfully!")
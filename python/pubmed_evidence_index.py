@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Evidence Index for BeforeDoctor PubMed studies
+Inverted index over harvested studies by symptom, treatment, MeSH term and age group
+"""
+
+import base64
+import gzip
+import json
+import logging
+from typing import List, Dict, Any, Iterable, Union
+
+logger = logging.getLogger(__name__)
+
+# Facet name -> study field it is built from
+FACET_FIELDS = {
+    'symptom': 'symptom_focus',
+    'treatment': 'treatment_mentioned',
+    'mesh': 'mesh_terms',
+    'age': 'age_group',
+}
+
+# Study fields kept in the document table returned by queries
+DOC_FIELDS = ['pmid', 'title', 'journal', 'pubdate', 'study_type', 'age_group',
+              'sample_size', 'relevance_score']
+
+INDEX_VERSION = 1
+
+
+def normalize_facet_value(facet: str, value: str) -> str:
+    """Normalize a facet value so queries match regardless of case/labels
+
+    Age groups are stored as e.g. ``"Infant (1-12 months)"`` and are indexed
+    under their short name (``"infant"``).
+    """
+    value = str(value).strip().lower()
+    if facet == 'age' and '(' in value:
+        value = value.split('(', 1)[0].strip()
+    return value
+
+
+class EvidenceIndex:
+    """Bitmap inverted index with relevance-ordered document ids
+
+    Documents are numbered in descending ``relevance_score`` order, so every
+    posting list is already relevance sorted: the top-k answer of a
+    conjunctive query is simply the k lowest set bits of the AND of its
+    posting bitmaps. Bitmaps are Python integers, which keeps intersections
+    in C and makes queries over a few thousand studies take microseconds.
+    """
+
+    def __init__(self):
+        self.docs: List[Dict[str, Any]] = []
+        self.postings: Dict[str, Dict[str, int]] = {facet: {} for facet in FACET_FIELDS}
+        self.all_docs = 0
+
+    @classmethod
+    def build(cls, studies: Iterable[Dict[str, Any]]) -> 'EvidenceIndex':
+        """Build an index from an iterable of study dicts"""
+        index = cls()
+
+        docs = []
+        seen = set()
+        for study in studies:
+            pmid = study.get('pmid')
+            if pmid in seen:
+                continue
+            seen.add(pmid)
+            doc = {field: study.get(field) for field in DOC_FIELDS}
+            doc['_facets'] = {facet: study.get(field) for facet, field in FACET_FIELDS.items()}
+            docs.append(doc)
+
+        docs.sort(key=lambda d: (-(d.get('relevance_score') or 0.0), str(d.get('pmid'))))
+
+        for doc_id, doc in enumerate(docs):
+            bit = 1 << doc_id
+            for facet, values in doc.pop('_facets').items():
+                if not values:
+                    continue
+                if isinstance(values, str):
+                    values = [values]
+                postings = index.postings[facet]
+                for value in set(normalize_facet_value(facet, v) for v in values):
+                    postings[value] = postings.get(value, 0) | bit
+
+        index.docs = docs
+        index.all_docs = (1 << len(docs)) - 1
+        logger.info(f"Built evidence index over {len(docs)} studies")
+        return index
+
+    def facet_values(self, facet: str) -> Dict[str, int]:
+        """Document frequency of every value of a facet"""
+        return {value: bin(bits).count('1') for value, bits in self.postings[facet].items()}
+
+    def _match(self, terms: Dict[str, Union[str, List[str]]]) -> int:
+        bits = self.all_docs
+        for facet, values in terms.items():
+            if facet not in self.postings:
+                raise ValueError(f"Unknown facet '{facet}', expected one of {list(FACET_FIELDS)}")
+            if values is None:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            postings = self.postings[facet]
+            for value in values:
+                bits &= postings.get(normalize_facet_value(facet, value), 0)
+                if not bits:
+                    return 0
+        return bits
+
+    def query(self, top_k: int = 10, **terms) -> List[Dict[str, Any]]:
+        """Return the top-k most relevant studies matching every term
+
+        Example: ``index.query(symptom='fever', treatment='antipyretics', age='infant')``.
+        A list of values for one facet requires all of them to match.
+        """
+        bits = self._match(terms)
+        results = []
+        while bits and len(results) < top_k:
+            low = bits & -bits
+            results.append(self.docs[low.bit_length() - 1])
+            bits ^= low
+        return results
+
+    def count(self, **terms) -> int:
+        """Number of studies matching every term"""
+        return bin(self._match(terms)).count('1')
+
+    def query_batch(self, queries: List[Dict[str, Any]], top_k: int = 10) -> List[List[Dict[str, Any]]]:
+        """Run several queries; each query is a dict of facet -> value(s)"""
+        return [self.query(top_k=top_k, **query) for query in queries]
+
+    def save(self, path: str) -> str:
+        """Persist the index as gzipped JSON with base64 bitmaps"""
+        data = {
+            'version': INDEX_VERSION,
+            'total_studies': len(self.docs),
+            'docs': self.docs,
+            'postings': {
+                facet: {
+                    value: base64.b64encode(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')).decode('ascii')
+                    for value, bits in postings.items()
+                }
+                for facet, postings in self.postings.items()
+            }
+        }
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+        logger.info(f"Saved evidence index ({len(self.docs)} studies) to {path}")
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'EvidenceIndex':
+        """Load an index written by :meth:`save`"""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if data.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported evidence index version: {data.get('version')}")
+
+        index = cls()
+        index.docs = data['docs']
+        index.all_docs = (1 << len(index.docs)) - 1
+        for facet, postings in data['postings'].items():
+            index.postings[facet] = {
+                value: int.from_bytes(base64.b64decode(encoded), 'little')
+                for value, encoded in postings.items()
+            }
+        return index
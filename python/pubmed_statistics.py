@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Streaming statistics and writers for PubMed harvests
+Keeps running aggregates and writes studies to disk as they arrive so that
+memory stays flat regardless of how many studies are downloaded
+"""
+
+import gzip
+import json
+import math
+import os
+import random
+import re
+import logging
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+YEAR_PATTERN = re.compile(r'(\d{4})')
+
+
+class SampleSizeSketch:
+    """Log-bucketed quantile sketch for sample sizes
+
+    Values are mapped to buckets whose width grows geometrically, so any
+    quantile is answered within ``relative_accuracy`` of the true value while
+    the number of buckets only depends on the value range, not the count.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value: int):
+        """Add a positive value to the sketch"""
+        if value <= 0:
+            return
+        index = int(math.ceil(math.log(value) / self._log_gamma))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-th quantile (0 <= q <= 1)"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                estimate = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return float(self.max)
+
+    def merge(self, other: 'SampleSizeSketch'):
+        """Merge another sketch built with the same accuracy into this one"""
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarize the sketch for JSON output"""
+        if self.count == 0:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'mean': round(self.total / self.count, 2),
+            'p25': round(self.quantile(0.25), 1),
+            'p50': round(self.quantile(0.50), 1),
+            'p75': round(self.quantile(0.75), 1),
+            'p90': round(self.quantile(0.90), 1),
+            'p99': round(self.quantile(0.99), 1),
+            'relative_accuracy': self.relative_accuracy
+        }
+
+
+class StudyStatisticsAggregator:
+    """Running counters over harvested studies
+
+    Produces the same shape as ``PubMedDatasetDownloader.generate_statistics``,
+    plus a ``sample_size_quantiles`` summary. ``sample_sizes`` keeps the list
+    schema but is a uniform reservoir sample of at most ``sample_size_reservoir``
+    values, so memory does not grow with the harvest; count, min, max and
+    quantiles come from the sketch and cover every study.
+    """
+
+    def __init__(self, sample_size_reservoir: int = 1000, seed: int = 42):
+        self.total_studies = 0
+        self.study_types: Dict[str, int] = {}
+        self.age_groups: Dict[str, int] = {}
+        self.symptoms_covered: Dict[str, int] = {}
+        self.treatments_mentioned: Dict[str, int] = {}
+        self.publication_years: Dict[str, int] = {}
+        self.sample_size_reservoir = sample_size_reservoir
+        self.sample_sizes: List[int] = []
+        self.sample_size_sketch = SampleSizeSketch()
+        self._rng = random.Random(seed)
+
+    def update(self, study: Dict[str, Any]):
+        """Fold a single study into the running statistics"""
+        self.total_studies += 1
+
+        study_type = study.get('study_type', 'Unknown')
+        self.study_types[study_type] = self.study_types.get(study_type, 0) + 1
+
+        age_group = study.get('age_group', 'Not specified')
+        self.age_groups[age_group] = self.age_groups.get(age_group, 0) + 1
+
+        for symptom in study.get('symptom_focus', []):
+            self.symptoms_covered[symptom] = self.symptoms_covered.get(symptom, 0) + 1
+
+        for treatment in study.get('treatment_mentioned', []):
+            self.treatments_mentioned[treatment] = self.treatments_mentioned.get(treatment, 0) + 1
+
+        pubdate = study.get('pubdate', '')
+        if pubdate:
+            year_match = YEAR_PATTERN.search(pubdate)
+            if year_match:
+                year = year_match.group(1)
+                self.publication_years[year] = self.publication_years.get(year, 0) + 1
+
+        sample_size = study.get('sample_size', 0) or 0
+        if sample_size > 0:
+            self.sample_size_sketch.add(sample_size)
+            self._sample(sample_size)
+
+    def _sample(self, sample_size: int):
+        """Reservoir sampling (Algorithm R) over every positive sample size seen"""
+        if len(self.sample_sizes) < self.sample_size_reservoir:
+            self.sample_sizes.append(sample_size)
+            return
+        slot = self._rng.randrange(self.sample_size_sketch.count)
+        if slot < self.sample_size_reservoir:
+            self.sample_sizes[slot] = sample_size
+
+    def update_many(self, studies: Iterable[Dict[str, Any]]):
+        """Fold an iterable of studies into the running statistics"""
+        for study in studies:
+            self.update(study)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot of the current statistics"""
+        return {
+            'total_studies': self.total_studies,
+            'study_types': dict(self.study_types),
+            'age_groups': dict(self.age_groups),
+            'symptoms_covered': dict(self.symptoms_covered),
+            'treatments_mentioned': dict(self.treatments_mentioned),
+            'publication_years': dict(sorted(self.publication_years.items())),
+            'sample_sizes': list(self.sample_sizes),
+            'sample_size_quantiles': self.sample_size_sketch.to_dict()
+        }
+
+
+class StudyStreamWriter:
+    """Appends studies to JSONL (and optionally Parquet) as they arrive
+
+    Parquet output needs ``pyarrow``; when it is not installed only the JSONL
+    file is written. Rows are buffered up to ``parquet_batch_size`` before
+    being flushed as a row group, so memory is bounded by the batch size.
+    """
+
+    def __init__(self, jsonl_path: str, parquet_path: str = None, parquet_batch_size: int = 500):
+        self.jsonl_path = jsonl_path
+        self.parquet_path = parquet_path
+        self.parquet_batch_size = parquet_batch_size
+        self.count = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(jsonl_path)), exist_ok=True)
+        self._jsonl = open(jsonl_path, 'w', encoding='utf-8')
+
+        self._pa = None
+        self._parquet_writer = None
+        self._parquet_buffer = []
+        if parquet_path:
+            try:
+                import pyarrow
+                import pyarrow.parquet  # noqa: F401
+                self._pa = pyarrow
+            except ImportError:
+                logger.warning("pyarrow not available, skipping Parquet output")
+                self.parquet_path = None
+
+    def write(self, study: Dict[str, Any]):
+        """Write a single study"""
+        self._jsonl.write(json.dumps(study, ensure_ascii=False, separators=(',', ':')))
+        self._jsonl.write('\n')
+        self.count += 1
+
+        if self.parquet_path:
+            self._parquet_buffer.append(study)
+            if len(self._parquet_buffer) >= self.parquet_batch_size:
+                self._flush_parquet()
+
+    def _flush_parquet(self):
+        if not self._parquet_buffer:
+            return
+        table = self._pa.Table.from_pylist(self._parquet_buffer)
+        if self._parquet_writer is None:
+            self._parquet_writer = self._pa.parquet.ParquetWriter(
+                self.parquet_path, table.schema, compression='zstd'
+            )
+        else:
+            table = table.cast(self._parquet_writer.schema)
+        self._parquet_writer.write_table(table)
+        self._parquet_buffer = []
+
+    def close(self):
+        """Flush pending rows and close all files"""
+        self._jsonl.close()
+        if self.parquet_path:
+            self._flush_parquet()
+            if self._parquet_writer is not None:
+                self._parquet_writer.close()
+        logger.info(f"Streamed {self.count} studies to {self.jsonl_path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Iterate over studies stored in a JSONL file without loading it whole"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def write_json_document(path: str, header: Dict[str, Any], studies: Iterable[Dict[str, Any]],
+                        trailer: Dict[str, Any] = None, compress: bool = False,
+                        indent: int = None) -> int:
+    """Write ``{**header, "studies": [...], **trailer}`` one study at a time
+
+    The output is a regular JSON object, so existing readers keep working, but
+    the study list is never materialized in memory. Returns the study count.
+    """
+    separators = (',', ':') if indent is None else (',', ': ')
+    opener = gzip.open if compress else open
+    count = 0
+
+    with opener(path, 'wt', encoding='utf-8') as f:
+        f.write('{')
+        for key, value in header.items():
+            f.write(json.dumps(key) + separators[1])
+            f.write(json.dumps(value, ensure_ascii=False, separators=separators, indent=indent))
+            f.write(separators[0])
+        f.write('"studies"' + separators[1] + '[')
+        for study in studies:
+            if count:
+                f.write(separators[0])
+            f.write(json.dumps(study, ensure_ascii=False, separators=separators, indent=indent))
+            count += 1
+        f.write(']')
+        for key, value in (trailer or {}).items():
+            f.write(separators[0] + json.dumps(key) + separators[1])
+            f.write(json.dumps(value, ensure_ascii=False, separators=separators, indent=indent))
+        f.write('}')
+
+    return count
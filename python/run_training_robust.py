@@ -10,12 +10,14 @@ import time
 import json
 import logging
 import signal
-import subprocess
 from datetime import datetime
 from pathlib import Path
 import threading
 from typing import Dict, List, Optional
 
+from artifact_cache import ArtifactCache, TRAINING_MODULE_ARTIFACTS, DEFAULT_MAX_GB, DEFAULT_MAX_AGE_DAYS
+from training_progress import run_with_progress
+
 # Set up comprehensive logging
 def setup_logging():
     """Setup comprehensive logging with file and console output"""
@@ -38,13 +40,21 @@ def setup_logging():
     return logging.getLogger(__name__)
 
 class RobustTrainingExecutor:
-    def __init__(self):
+    def __init__(self, force=False):
         self.logger = setup_logging()
         self.base_dir = Path(__file__).parent
         self.progress_file = self.base_dir / "training_progress.json"
         self.results_file = self.base_dir / "training_results.json"
         self.is_running = True
         
+        # Unchanged modules are restored from the artifact cache unless forced
+        self.cache = ArtifactCache(self.base_dir / "processed" / "artifact_cache", root=self.base_dir)
+        self.force = force
+        
+        # Fine-grained progress events are persisted at most this often
+        self.progress_save_interval = 2.0
+        self._last_progress_save = 0.0
+        
         # Training modules configuration
         self.training_modules = {
             "cdc": {
@@ -100,12 +110,15 @@ class RobustTrainingExecutor:
             "overall_progress": 0
         }
     
-    def save_progress(self):
+    def save_progress(self, quiet=False):
         """Save current training progress"""
         try:
-            with open(self.progress_file, 'w') as f:
+            tmp_file = self.progress_file.with_suffix(".json.tmp")
+            with open(tmp_file, 'w') as f:
                 json.dump(self.progress, f, indent=2)
-            self.logger.info("💾 Progress saved successfully")
+            os.replace(tmp_file, self.progress_file)
+            if not quiet:
+                self.logger.info("💾 Progress saved successfully")
         except Exception as e:
             self.logger.error(f"❌ Error saving progress: {e}")
     
@@ -162,38 +175,46 @@ class RobustTrainingExecutor:
                 self.logger.error(f"❌ Training script not found: {script_path}")
                 return False
             
-            # Run with subprocess and capture output
-            process = subprocess.Popen(
-                [sys.executable, str(script_path)],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=self.base_dir
-            )
+            cache_key = self.cache.module_key(module_name)
+            if cache_key and not self.force and self.cache.restore(cache_key):
+                self.logger.info(f"♻️ {module_name} inputs, code and params unchanged; restored cached models")
+                self.mark_module_completed(module_name)
+                return True
+            
+            self.progress.setdefault("module_progress", {})[module_name] = {
+                "phase": None,
+                "rows": None,
+                "total": None,
+                "eta_seconds": None,
+                "metrics": {},
+                "started": datetime.now().isoformat()
+            }
             
-            # Monitor process with progress updates
-            while process.poll() is None and self.is_running:
-                time.sleep(5)  # Check every 5 seconds
+            def heartbeat():
                 elapsed = time.time() - start_time
-                self.logger.info(f"⏳ {module_name} training in progress... ({elapsed:.0f}s elapsed)")
+                state = self.progress["module_progress"][module_name]
+                phase = f" [{state['phase']}]" if state["phase"] else ""
+                eta = f", ETA {state['eta_seconds']:.0f}s" if state["eta_seconds"] is not None else ""
+                self.logger.info(f"⏳ {module_name} training in progress{phase}... ({elapsed:.0f}s elapsed{eta})")
             
-            # Get final output
-            stdout, stderr = process.communicate()
+            # Logs are forwarded live and progress events persisted as they arrive
+            returncode, stderr = run_with_progress(
+                [sys.executable, str(script_path)],
+                cwd=self.base_dir,
+                on_output=lambda stream, line: self.forward_output(module_name, stream, line),
+                on_event=lambda event: self.record_progress_event(module_name, event),
+                on_idle=heartbeat,
+                should_stop=lambda: not self.is_running
+            )
+            self.save_progress(quiet=True)
             
-            if process.returncode == 0:
+            if returncode == 0:
                 elapsed = time.time() - start_time
                 self.logger.info(f"✅ {module_name} training completed successfully! ({elapsed:.0f}s)")
                 
-                # Add to completed modules
-                if module_name not in self.progress["completed_modules"]:
-                    self.progress["completed_modules"].append(module_name)
-                
-                # Update overall progress
-                total_modules = len(self.training_modules)
-                completed = len(self.progress["completed_modules"])
-                self.progress["overall_progress"] = (completed / total_modules) * 100
-                
-                self.save_progress()
+                if cache_key:
+                    self.cache.store(cache_key, module_name, TRAINING_MODULE_ARTIFACTS[module_name]["outputs"])
+                self.mark_module_completed(module_name)
                 return True
             else:
                 self.logger.error(f"❌ {module_name} training failed!")
@@ -210,6 +231,53 @@ class RobustTrainingExecutor:
             self.logger.error(f"❌ Error running {module_name} training: {e}")
             return False
     
+    def forward_output(self, module_name: str, stream: str, line: str):
+        """Relay one line of a trainer's stdout/stderr to the log"""
+        if stream == "stderr":
+            self.logger.warning(f"[{module_name}] {line}")
+        else:
+            self.logger.info(f"[{module_name}] {line}")
+    
+    def record_progress_event(self, module_name: str, event: Dict):
+        """Fold a trainer progress event into ``training_progress.json``"""
+        state = self.progress["module_progress"][module_name]
+        kind = event.get("event")
+        state["updated"] = datetime.fromtimestamp(event.get("time", time.time())).isoformat()
+        
+        if kind == "phase":
+            state.update(phase=event.get("phase"), rows=0, total=event.get("total"), eta_seconds=None)
+            self.logger.info(f"📍 {module_name}: {event.get('phase')}")
+        elif kind == "rows":
+            state.update(rows=event.get("rows"), total=event.get("total"),
+                         rate=event.get("rate"), eta_seconds=event.get("eta_seconds"))
+            
+            # Count the running module's share of the current phase toward overall progress
+            if state["total"]:
+                fraction = min(state["rows"] / state["total"], 1.0)
+                completed = len(self.progress["completed_modules"])
+                self.progress["overall_progress"] = (completed + fraction) / len(self.training_modules) * 100
+        elif kind == "metric":
+            state["metrics"][event.get("name")] = event.get("value")
+            self.logger.info(f"📈 {module_name}: {event.get('name')} = {event.get('value')}")
+        
+        now = time.time()
+        if kind != "rows" or now - self._last_progress_save >= self.progress_save_interval:
+            self._last_progress_save = now
+            self.save_progress(quiet=True)
+    
+    def mark_module_completed(self, module_name: str):
+        """Record a finished module and update overall progress"""
+        # Add to completed modules
+        if module_name not in self.progress["completed_modules"]:
+            self.progress["completed_modules"].append(module_name)
+        
+        # Update overall progress
+        total_modules = len(self.training_modules)
+        completed = len(self.progress["completed_modules"])
+        self.progress["overall_progress"] = (completed / total_modules) * 100
+        
+        self.save_progress()
+    
     def run_all_modules(self) -> Dict:
         """Run all training modules with comprehensive tracking"""
         self.print_banner()
@@ -282,6 +350,8 @@ class RobustTrainingExecutor:
                 print("⏸️  Pausing 5 seconds before next module...")
                 time.sleep(5)
         
+        self.cache.evict(max_bytes=int(DEFAULT_MAX_GB * 1024 ** 3), max_age_days=DEFAULT_MAX_AGE_DAYS)
+        
         # Final results
         results["end_time"] = datetime.now().isoformat()
         results["success_rate"] = len(results["completed"]) / total_modules * 100
@@ -336,25 +406,31 @@ class RobustTrainingExecutor:
 def main():
     """Main execution function"""
     try:
-        executor = RobustTrainingExecutor()
+        args = sys.argv[1:]
+        force = "--force" in args
+        args = [arg for arg in args if arg != "--force"]
         
         # Check command line arguments
-        if len(sys.argv) > 1:
-            if sys.argv[1] == "--resume":
+        if args:
+            if args[0] == "--resume":
                 print("🔄 Resuming previous training session...")
-            elif sys.argv[1] == "--fresh":
+            elif args[0] == "--fresh":
                 print("🆕 Starting fresh training session...")
                 # Clear previous progress
                 progress_file = Path("training_progress.json")
                 if progress_file.exists():
                     progress_file.unlink()
             else:
-                print(f"❌ Unknown argument: {sys.argv[1]}")
-                print("Usage: python run_training_robust.py [--resume|--fresh]")
+                print(f"❌ Unknown argument: {args[0]}")
+                print("Usage: python run_training_robust.py [--resume|--fresh] [--force]")
                 return 1
         else:
             print("🚀 Starting new training session...")
         
+        if force:
+            print("🔁 Ignoring cached artifacts; every module will be retrained")
+        executor = RobustTrainingExecutor(force=force)
+        
         # Run training pipeline
         results = executor.run_all_modules()
         
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Similarity Search for BeforeDoctor TF-IDF embeddings
+Exact sparse cosine top-k plus an approximate SVD + IVF index, with batch
+queries, persistence and a latency/recall benchmark
+"""
+
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import joblib
+from scipy import sparse
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+logger = logging.getLogger(__name__)
+
+
+def _top_k_rows(scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k column indices and scores per row, best first"""
+    k = min(top_k, scores.shape[1])
+    if k == 0:
+        empty = np.zeros((scores.shape[0], 0))
+        return empty.astype(np.int64), empty
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+class SparseCosineIndex:
+    """Exact cosine top-k over an L2-normalized CSR matrix
+
+    Queries are scored in chunks with a sparse CSR·CSRᵀ product, so only a
+    ``chunk_size × n_documents`` dense block exists at any time.
+    """
+
+    kind = 'exact'
+
+    def __init__(self, matrix, chunk_size: int = 512):
+        self.matrix = normalize(sparse.csr_matrix(matrix, dtype=np.float32))
+        self.matrix_t = self.matrix.T.tocsr()
+        self.chunk_size = chunk_size
+
+    def search(self, queries, top_k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(indices, scores)`` arrays of shape ``(n_queries, top_k)``"""
+        queries = normalize(sparse.csr_matrix(queries, dtype=np.float32))
+        all_indices, all_scores = [], []
+        for start in range(0, queries.shape[0], self.chunk_size):
+            block = (queries[start:start + self.chunk_size] @ self.matrix_t).toarray()
+            indices, scores = _top_k_rows(block, top_k)
+            all_indices.append(indices)
+            all_scores.append(scores)
+        return np.vstack(all_indices), np.vstack(all_scores)
+
+    def save(self, path: Path):
+        sparse.save_npz(Path(path) / "matrix.npz", self.matrix)
+
+    @classmethod
+    def load(cls, path: Path, chunk_size: int = 512) -> 'SparseCosineIndex':
+        return cls(sparse.load_npz(Path(path) / "matrix.npz"), chunk_size=chunk_size)
+
+
+class IVFIndex:
+    """Approximate cosine top-k: TruncatedSVD projection plus an inverted file
+
+    Documents are reduced to ``n_components`` dense dimensions, clustered into
+    ``n_lists`` k-means cells, and a query only scores the documents of its
+    ``n_probe`` closest cells.
+    """
+
+    kind = 'ivf'
+
+    def __init__(self, n_components: int = 128, n_lists: Optional[int] = None,
+                 n_probe: int = 8, random_state: int = 42):
+        self.n_components = n_components
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.random_state = random_state
+        self.svd: Optional[TruncatedSVD] = None
+        self.centroids: Optional[np.ndarray] = None
+        self.vectors: Optional[np.ndarray] = None
+        self.list_offsets: Optional[np.ndarray] = None
+        self.list_ids: Optional[np.ndarray] = None
+
+    def fit(self, matrix) -> 'IVFIndex':
+        matrix = sparse.csr_matrix(matrix, dtype=np.float32)
+        n_docs, n_features = matrix.shape
+        components = max(1, min(self.n_components, n_features - 1, n_docs - 1))
+        self.svd = TruncatedSVD(n_components=components, random_state=self.random_state)
+        vectors = normalize(self.svd.fit_transform(matrix)).astype(np.float32)
+
+        n_lists = self.n_lists or max(1, int(np.sqrt(n_docs)))
+        n_lists = min(n_lists, n_docs)
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=self.random_state,
+                                 batch_size=max(1024, n_lists * 4), n_init=3)
+        assignments = kmeans.fit_predict(vectors)
+        self.centroids = normalize(kmeans.cluster_centers_).astype(np.float32)
+
+        # Store vectors grouped by list so each probed cell is a contiguous slice
+        order = np.argsort(assignments, kind='stable')
+        self.list_ids = order.astype(np.int64)
+        self.vectors = vectors[order]
+        counts = np.bincount(assignments, minlength=n_lists)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return self
+
+    def project(self, queries) -> np.ndarray:
+        return normalize(self.svd.transform(sparse.csr_matrix(queries, dtype=np.float32))).astype(np.float32)
+
+    def search(self, queries, top_k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(indices, scores)``; rows are padded with -1 / -inf if a probe finds fewer than k"""
+        projected = self.project(queries)
+        n_probe = min(self.n_probe, len(self.centroids))
+        probes = _top_k_rows(projected @ self.centroids.T, n_probe)[0]
+
+        indices = np.full((len(projected), top_k), -1, dtype=np.int64)
+        scores = np.full((len(projected), top_k), -np.inf, dtype=np.float32)
+        for row, (query, cells) in enumerate(zip(projected, probes)):
+            positions = np.concatenate([
+                np.arange(self.list_offsets[cell], self.list_offsets[cell + 1]) for cell in cells
+            ])
+            if not len(positions):
+                continue
+            candidate_scores = self.vectors[positions] @ query
+            best, best_scores = _top_k_rows(candidate_scores[None, :], top_k)
+            found = best.shape[1]
+            indices[row, :found] = self.list_ids[positions[best[0]]]
+            scores[row, :found] = best_scores[0]
+        return indices, scores
+
+    def save(self, path: Path):
+        path = Path(path)
+        joblib.dump(self.svd, path / "svd.pkl")
+        np.savez(path / "ivf.npz", centroids=self.centroids, vectors=self.vectors,
+                 list_offsets=self.list_offsets, list_ids=self.list_ids)
+
+    @classmethod
+    def load(cls, path: Path, n_probe: int = 8) -> 'IVFIndex':
+        path = Path(path)
+        index = cls(n_probe=n_probe)
+        index.svd = joblib.load(path / "svd.pkl")
+        index.n_components = index.svd.n_components
+        with np.load(path / "ivf.npz") as data:
+            index.centroids = data['centroids']
+            index.vectors = data['vectors']
+            index.list_offsets = data['list_offsets']
+            index.list_ids = data['list_ids']
+        index.n_lists = len(index.centroids)
+        return index
+
+
+class SimilaritySearch:
+    """Text-in, labels-out top-k search over a TF-IDF embedding matrix
+
+    ``vectorizer`` is any fitted transformer producing the embedding space
+    (e.g. a ``TfidfVectorizer`` or ``feature_store.TfidfProjection``).
+    """
+
+    def __init__(self, vectorizer, embeddings, labels: Sequence[str],
+                 approximate: bool = False, **ivf_params):
+        self.vectorizer = vectorizer
+        self.labels = list(labels)
+        self.exact = SparseCosineIndex(embeddings)
+        self.approximate = IVFIndex(**ivf_params).fit(embeddings) if approximate else None
+
+    def _index(self, mode: str):
+        if mode == 'approximate':
+            if self.approximate is None:
+                raise ValueError("Approximate index was not built")
+            return self.approximate
+        return self.exact
+
+    def query_batch(self, texts: Sequence[str], top_k: int = 10,
+                    mode: str = 'exact') -> List[List[Dict[str, Any]]]:
+        """Top-k most similar documents for every text"""
+        queries = self.vectorizer.transform(list(texts))
+        indices, scores = self._index(mode).search(queries, top_k)
+        results = []
+        for row_indices, row_scores in zip(indices, scores):
+            results.append([
+                {'index': int(i), 'label': self.labels[i], 'score': round(float(s), 4)}
+                for i, s in zip(row_indices, row_scores) if i >= 0
+            ])
+        return results
+
+    def query(self, text: str, top_k: int = 10, mode: str = 'exact') -> List[Dict[str, Any]]:
+        return self.query_batch([text], top_k=top_k, mode=mode)[0]
+
+    def save(self, path) -> Path:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self.vectorizer, path / "vectorizer.pkl")
+        with open(path / "labels.json", 'w', encoding='utf-8') as f:
+            json.dump(self.labels, f, ensure_ascii=False)
+        self.exact.save(path)
+        if self.approximate is not None:
+            self.approximate.save(path)
+        logger.info(f"💾 Similarity index saved: {path}")
+        return path
+
+    @classmethod
+    def load(cls, path, n_probe: int = 8) -> 'SimilaritySearch':
+        path = Path(path)
+        search = cls.__new__(cls)
+        search.vectorizer = joblib.load(path / "vectorizer.pkl")
+        with open(path / "labels.json", 'r', encoding='utf-8') as f:
+            search.labels = json.load(f)
+        search.exact = SparseCosineIndex.load(path)
+        search.approximate = IVFIndex.load(path, n_probe=n_probe) if (path / "ivf.npz").exists() else None
+        return search
+
+
+def benchmark_search(search: SimilaritySearch, queries, top_k: int = 10,
+                     batch_size: int = 64) -> Dict[str, Any]:
+    """Per-query latency (single and batched) and recall@k of approximate vs exact"""
+    queries = sparse.csr_matrix(queries)
+    results = {'queries': queries.shape[0], 'top_k': top_k}
+
+    exact_indices, _ = search.exact.search(queries, top_k)
+    indexes = [('exact', search.exact)]
+    if search.approximate is not None:
+        indexes.append(('approximate', search.approximate))
+
+    for name, index in indexes:
+        latencies = []
+        for row in range(queries.shape[0]):
+            start = time.perf_counter()
+            index.search(queries[row], top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        for begin in range(0, queries.shape[0], batch_size):
+            indices, _ = index.search(queries[begin:begin + batch_size], top_k)
+        batched_ms = (time.perf_counter() - start) * 1000 / max(queries.shape[0], 1)
+
+        entry = {
+            'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+            'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+            'batched_ms_per_query': round(batched_ms, 3),
+        }
+        if name == 'approximate':
+            approx_indices, _ = index.search(queries, top_k)
+            hits = sum(len(set(a[a >= 0]) & set(e)) for a, e in zip(approx_indices, exact_indices))
+            entry['recall_at_k'] = round(hits / exact_indices.size, 4) if exact_indices.size else None
+        results[name] = entry
+
+    logger.info(f"⏱️ Similarity search benchmark: {results}")
+    return results
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for Arrow-native Diseases_Symptoms cleaning
+Uses a small locally built dataset, no download required
+"""
+
+import sys
+from pathlib import Path
+
+# Add the diseases_symptoms_training directory to Python path
+training_dir = Path(__file__).parent / "diseases_symptoms_training"
+sys.path.insert(0, str(training_dir))
+
+def build_fixture():
+    """Small dataset with a duplicate row and a missing value"""
+    from datasets import Dataset
+
+    return Dataset.from_dict({
+        'name': ['Flu', 'Flu', 'Cold', 'Otitis', 'Croup'],
+        'symptoms': ['fever, cough', 'fever, cough', 'runny nose', None, 'barking cough'],
+        'diseases': ['influenza', 'influenza', 'common cold', 'ear infection', 'croup'],
+        'treatments': ['rest', 'rest', 'fluids', 'antibiotics', 'steroids'],
+    })
+
+def test_clean_data():
+    """Duplicates and missing values are dropped and features are built column-wise"""
+    from diseases_symptoms_trainer import DiseasesSymptomsTrainer
+
+    trainer = DiseasesSymptomsTrainer(num_proc=1)
+    df = trainer._clean_data(build_fixture())
+
+    assert len(df) == 3, f"Expected 3 rows after cleaning, got {len(df)}"
+    assert list(df.columns) == ['text_features', 'label', 'symptoms', 'diseases', 'treatments']
+    assert df['text_features'].tolist() == [
+        'fever, cough influenza',
+        'runny nose common cold',
+        'barking cough croup',
+    ]
+    assert df['label'].tolist() == ['influenza', 'common cold', 'croup']
+    print("✅ Arrow cleaning produces the expected training table")
+
+def build_fixture_on_disk(directory):
+    """The fixture loaded from a JSON file, so filter/map results get cache files"""
+    import json
+    from datasets import load_dataset
+
+    data_file = Path(directory) / "fixture.jsonl"
+    with open(data_file, 'w', encoding='utf-8') as f:
+        for row in build_fixture().to_list():
+            f.write(json.dumps(row) + "\n")
+    return load_dataset('json', data_files=str(data_file), split='train',
+                        cache_dir=str(Path(directory) / "hf_cache"))
+
+def _cache_files(directory):
+    return {path.name for path in (Path(directory) / "hf_cache").rglob("cache-*.arrow")}
+
+def test_clean_data_is_cached():
+    """A second run on the same on-disk data reuses the fingerprinted cache files"""
+    import tempfile
+    from diseases_symptoms_trainer import DiseasesSymptomsTrainer
+
+    trainer = DiseasesSymptomsTrainer(num_proc=1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fixture = build_fixture_on_disk(tmp_dir)
+        first = trainer._clean_data(fixture)
+        after_first = _cache_files(tmp_dir)
+        second = trainer._clean_data(fixture)
+        after_second = _cache_files(tmp_dir)
+
+    assert after_first, "Cleaning an on-disk dataset should write filter/map cache files"
+    assert after_second == after_first, f"Second run wrote new cache files: {after_second - after_first}"
+    assert first.equals(second), "Cached results should match the first run"
+    print("✅ Re-running cleaning reuses the cached filter/map results")
+
+if __name__ == "__main__":
+    test_clean_data()
+    test_clean_data_is_cached()
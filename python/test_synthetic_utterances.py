@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Test script for the synthetic voice utterance generator
+Writes a small multi-part Parquet directory and reads it back
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the voice_training directory to Python path
+training_dir = Path(__file__).parent / "voice_training"
+sys.path.insert(0, str(training_dir))
+
+def test_write_load_round_trip():
+    """load_utterances reads back exactly what write_utterances wrote, manifest included"""
+    import pandas as pd
+    from synthetic_utterances import generate_utterances, write_utterances, load_utterances
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest = write_utterances(tmp_dir, 12000, seed=7, chunk_rows=5000, max_workers=1)
+        assert (Path(tmp_dir) / "manifest.json").exists()
+        assert [part['rows'] for part in manifest['parts']] == [5000, 5000, 2000]
+
+        loaded = load_utterances(tmp_dir)
+        symptoms = load_utterances(tmp_dir, columns=['symptom'])
+
+    expected = generate_utterances(12000, seed=7, chunk_rows=5000)
+    pd.testing.assert_frame_equal(loaded, expected)
+    assert list(symptoms.columns) == ['symptom'] and len(symptoms) == 12000
+    print("✅ Synthetic utterances survive the Parquet round trip")
+
+if __name__ == "__main__":
+    test_write_load_round_trip()
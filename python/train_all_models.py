@@ -17,6 +17,11 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
 
+from compact_vectorizer import compact_vectorizer, dump_compact
+from inference_graph import InferenceGraph, benchmark_against_independent
+from cooccurrence_recommender import train_cooccurrence_recommender
+from treatment_store import TREATMENT_DATASET_NAME, load_treatment_store
+
 class CompleteModelTrainer:
     def __init__(self):
         self.base_dir = Path(__file__).parent
@@ -24,6 +29,11 @@ class CompleteModelTrainer:
         self.models_dir = self.base_dir / "models"
         self.models_dir.mkdir(exist_ok=True)
         
+        # Symptom vectorizer, shared by every text head in the inference graph
+        self.text_vectorizer = None
+        self.text_heads = {}
+        self.text_samples = []
+        
         print(f"Data directory: {self.data_dir}")
         print(f"Models directory: {self.models_dir}")
         
@@ -40,11 +50,9 @@ class CompleteModelTrainer:
             return []
     
     def load_treatment_dataset(self):
-        """Load the treatment dataset"""
+        """Load the treatment dataset from its compact memory-mapped store"""
         try:
-            file_path = self.data_dir / "pediatric_symptom_treatment_dataset.json"
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_treatment_store(self.data_dir / TREATMENT_DATASET_NAME)
             print(f"Loaded treatment dataset with {len(data)} records")
             return data
         except Exception as e:
@@ -93,13 +101,18 @@ class CompleteModelTrainer:
         accuracy = accuracy_score(y_test, y_pred)
         
         print(f"Symptom classifier accuracy: {accuracy:.3f}")
+        self.text_vectorizer = vectorizer
+        self.text_heads['symptom'] = model
+        self.text_samples = texts[:200]
         
         # Save model and vectorizer
         model_path = self.models_dir / "symptom_classifier.pkl"
         vectorizer_path = self.models_dir / "symptom_vectorizer.pkl"
         
         joblib.dump(model, model_path)
-        joblib.dump(vectorizer, vectorizer_path)
+        report = dump_compact(vectorizer, vectorizer_path, texts[:200])
+        print(f"Compact symptom vectorizer: {report['original']['bytes'] / 1024:.1f} KB -> "
+              f"{report['compact']['bytes'] / 1024:.1f} KB")
         
         print(f"Saved symptom classifier to {model_path}")
         return True
@@ -113,16 +126,15 @@ class CompleteModelTrainer:
             print("No data available for treatment recommender")
             return False
         
-        # Create training data
-        training_data = []
-        for record in data:
-            if 'symptom' in record and 'treatment' in record:
-                training_data.append({
-                    'symptom': record['symptom'],
-                    'age_group': record.get('age_group', 'unknown'),
-                    'severity': record.get('severity', 'unknown'),
-                    'treatment': record['treatment']
-                })
+        # Create training data from the store's columns; the label is each
+        # record's primary treatment (first medication, else first home care)
+        training_data = pd.DataFrame({
+            'symptom': data.categorical('symptom'),
+            'age_group': data.categorical('age_group'),
+            'severity': 'unknown',
+            'treatment': data.primary_treatments()
+        })
+        training_data = training_data[training_data['treatment'] != '']
         
         if len(training_data) < 10:
             print("Insufficient data for treatment recommender")
@@ -175,6 +187,25 @@ class CompleteModelTrainer:
         print(f"Saved treatment recommender to {model_path}")
         return True
     
+    def train_cooccurrence_recommender(self):
+        """Train the sparse co-occurrence treatment recommender"""
+        print("\n--- Training Co-occurrence Treatment Recommender ---")
+        
+        data = self.load_treatment_dataset()
+        if not data:
+            print("No data available for co-occurrence recommender")
+            return False
+        
+        recommender, comparison = train_cooccurrence_recommender(data, self.models_dir)
+        print(f"Saved co-occurrence recommender ({recommender.counts.nnz} non-zero counts, "
+              f"{len(recommender.treatment_names)} treatments)")
+        if comparison:
+            print(f"Co-occurrence: {comparison['cooccurrence']['bytes'] / 1024:.1f} KB, "
+                  f"{comparison['cooccurrence']['batch_ms']:.1f} ms for {comparison['queries']} queries; "
+                  f"RandomForest: {comparison['classifier']['bytes'] / 1024:.1f} KB, "
+                  f"{comparison['classifier']['batch_ms']:.1f} ms")
+        return True
+    
     def train_risk_assessor(self):
         """Train risk assessment model"""
         print("\n--- Training Risk Assessor ---")
@@ -210,9 +241,13 @@ class CompleteModelTrainer:
         texts = [item['text'] for item in training_data]
         labels = [item['risk_level'] for item in training_data]
         
-        # Vectorize text
-        vectorizer = TfidfVectorizer(max_features=500, stop_words='english')
-        X = vectorizer.fit_transform(texts)
+        # Reuse the symptom vectorizer so both heads share one featurization
+        if self.text_vectorizer is not None:
+            vectorizer = self.text_vectorizer
+            X = vectorizer.transform(texts)
+        else:
+            vectorizer = TfidfVectorizer(max_features=500, stop_words='english')
+            X = vectorizer.fit_transform(texts)
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, random_state=42)
@@ -226,17 +261,44 @@ class CompleteModelTrainer:
         accuracy = accuracy_score(y_test, y_pred)
         
         print(f"Risk assessor accuracy: {accuracy:.3f}")
+        if vectorizer is self.text_vectorizer:
+            self.text_heads['risk'] = model
         
         # Save model and vectorizer
         model_path = self.models_dir / "risk_assessor.pkl"
         vectorizer_path = self.models_dir / "risk_vectorizer.pkl"
         
         joblib.dump(model, model_path)
-        joblib.dump(vectorizer, vectorizer_path)
+        dump_compact(vectorizer, vectorizer_path)
         
         print(f"Saved risk assessor to {model_path}")
         return True
     
+    def build_inference_graph(self):
+        """Bundle the shared text vectorizer and its heads into one artifact"""
+        print("\n--- Building Text Inference Graph ---")
+        
+        if self.text_vectorizer is None or not self.text_heads:
+            print("No text models available for the inference graph")
+            return False
+        
+        graph = InferenceGraph(compact_vectorizer(self.text_vectorizer), self.text_heads)
+        graph_path = graph.save(self.models_dir / "text_inference_graph.pkl")
+        print(f"Saved inference graph with heads {', '.join(self.text_heads)} to {graph_path}")
+        
+        # Latency against loading and calling each vectorizer + model pair on its own
+        independent = {
+            'symptom': (self.models_dir / "symptom_vectorizer.pkl", self.models_dir / "symptom_classifier.pkl"),
+            'risk': (self.models_dir / "risk_vectorizer.pkl", self.models_dir / "risk_assessor.pkl"),
+        }
+        independent = {name: paths for name, paths in independent.items() if name in self.text_heads}
+        comparison = benchmark_against_independent(graph_path, independent, self.text_samples)
+        print(f"Inference graph p50/p99: {comparison['graph']['p50_ms']:.3f}/{comparison['graph']['p99_ms']:.3f} ms, "
+              f"independent: {comparison['independent']['p50_ms']:.3f}/{comparison['independent']['p99_ms']:.3f} ms "
+              f"({comparison['saved_ms_per_request']:.3f} ms saved per request)")
+        
+        return True
+    
     def create_flutter_integration(self):
         """Create Flutter integration code"""
         print("\n--- Creating Flutter Integration ---")
@@ -314,10 +376,14 @@ class AIModelService {{
         
         # Train treatment recommender
         results['treatment_recommender'] = self.train_treatment_recommender()
+        results['treatment_cooccurrence'] = self.train_cooccurrence_recommender()
         
         # Train risk assessor
         results['risk_assessor'] = self.train_risk_assessor()
         
+        # Bundle the text heads behind one shared vectorizer
+        results['inference_graph'] = self.build_inference_graph()
+        
         # Create Flutter integration
         results['flutter_integration'] = self.create_flutter_integration()
         
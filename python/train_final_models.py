@@ -12,17 +12,68 @@ import numpy as np
 from pathlib import Path
 from datetime import datetime
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, accuracy_score
+from sklearn.metrics import accuracy_score
 import joblib
 
+from inference_graph import InferenceGraph, benchmark_against_independent
+from cooccurrence_recommender import train_cooccurrence_recommender
+from treatment_store import TREATMENT_DATASET_NAME, load_treatment_store
+from artifact_cache import ArtifactCache, TRAINING_MODULE_ARTIFACTS
+from training_progress import progress_reporter
+
+# Parsed datasets shared by every trainer in the process, keyed by
+# (path, mtime_ns, size) so an edited file is re-read
+_DATASET_CACHE = {}
+
+def load_json_records_cached(file_path, extract):
+    """Parse ``file_path`` and apply ``extract`` once per file version"""
+    file_path = Path(file_path).resolve()
+    stat = file_path.stat()
+    key = (str(file_path), stat.st_mtime_ns, stat.st_size, extract.__name__)
+    if key not in _DATASET_CACHE:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            _DATASET_CACHE[key] = extract(json.load(f))
+    return _DATASET_CACHE[key]
+
+def _extract_symptom_records(data):
+    """Symptom records from the comprehensive dataset's dictionary structure"""
+    training_data = []
+    for key, value in data.items():
+        if isinstance(value, dict) and 'symptom' in value:
+            training_data.append({
+                'symptom': value['symptom'],
+                'details': value.get('details', ''),
+                'age_group': value.get('age_group', 'unknown'),
+                'severity': value.get('severity', 'unknown')
+            })
+    return training_data
+
 class FinalModelTrainer:
-    def __init__(self):
+    # Out-of-core text training: stateless hashing features, chunked partial_fit.
+    # coef_ is dense (n_classes, HASH_FEATURES) float64, so 2**15 keeps it at
+    # 256 KiB per class; the symptom head has one class per distinct symptom
+    HASH_FEATURES = 2 ** 15
+    CHUNK_SIZE = 5000
+    
+    def __init__(self, epochs=5, force=False):
         self.base_dir = Path(__file__).parent
         self.data_dir = self.base_dir.parent / "beforedoctor" / "assets" / "data"
         self.models_dir = self.base_dir / "models"
         self.models_dir.mkdir(exist_ok=True)
+        self.epochs = epochs
+        
+        # Skip training when datasets, code and params match a cached run
+        self.cache = ArtifactCache(root=self.base_dir)
+        self.force = force
+        
+        # One stateless vectorizer shared by every text head, bundled by build_inference_graph
+        self.text_vectorizer = HashingVectorizer(n_features=self.HASH_FEATURES, alternate_sign=False,
+                                                 stop_words='english', norm='l2')
+        self.text_heads = {}
+        self.text_samples = []
         
         print(f"Data directory: {self.data_dir}")
         print(f"Models directory: {self.models_dir}")
@@ -31,19 +82,7 @@ class FinalModelTrainer:
         """Load the comprehensive symptom dataset"""
         try:
             file_path = self.data_dir / "pediatric_symptom_dataset_comprehensive.json"
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Extract actual symptom data from the dictionary structure
-            training_data = []
-            for key, value in data.items():
-                if isinstance(value, dict) and 'symptom' in value:
-                    training_data.append({
-                        'symptom': value['symptom'],
-                        'details': value.get('details', ''),
-                        'age_group': value.get('age_group', 'unknown'),
-                        'severity': value.get('severity', 'unknown')
-                    })
+            training_data = load_json_records_cached(file_path, _extract_symptom_records)
             
             print(f"Extracted {len(training_data)} symptom records from comprehensive dataset")
             return training_data
@@ -52,29 +91,58 @@ class FinalModelTrainer:
             return []
     
     def load_treatment_dataset(self):
-        """Load the treatment dataset"""
+        """Load the treatment dataset from its compact memory-mapped store"""
         try:
-            file_path = self.data_dir / "pediatric_symptom_treatment_dataset.json"
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Handle different data structures
-            if isinstance(data, dict):
-                if 'records' in data:
-                    records = data['records']
-                elif 'data' in data:
-                    records = data['data']
-                else:
-                    records = [data]
-            else:
-                records = data
-            
-            print(f"Loaded treatment dataset with {len(records)} records")
-            return records
+            data = load_treatment_store(self.data_dir / TREATMENT_DATASET_NAME)
+            print(f"Loaded treatment dataset with {len(data)} records")
+            return data
         except Exception as e:
             print(f"Error loading treatment dataset: {e}")
             return []
     
+    def _text_frame(self, data, extra_columns=()):
+        """``symptom + details`` text and labels for every record with a symptom"""
+        df = pd.DataFrame(data, columns=['symptom', 'details', *extra_columns])
+        df = df[df['symptom'].fillna('').astype(str) != ''].reset_index(drop=True)
+        df['symptom'] = df['symptom'].astype(str)
+        df['text'] = (df['symptom'] + ' ' + df['details'].fillna('').astype(str)).str.strip()
+        return df
+    
+    def _train_text_model_out_of_core(self, texts, labels, phase='text_model'):
+        """Hashing features + SGD ``partial_fit`` over chunks, evaluated on a 20% holdout
+        
+        Memory is bounded by CHUNK_SIZE and time grows linearly with the
+        corpus, so no record cap is needed.
+        """
+        texts = np.asarray(texts, dtype=object)
+        labels = np.asarray(labels, dtype=object)
+        classes = np.unique(labels)
+        train_idx, test_idx = train_test_split(np.arange(len(texts)), test_size=0.2, random_state=42)
+        
+        vectorizer = self.text_vectorizer
+        model = SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42)
+        
+        # Rows across all epochs, so the ETA covers the whole fit
+        progress = progress_reporter()
+        progress.phase(phase, total=len(train_idx) * self.epochs)
+        
+        rng = np.random.default_rng(42)
+        for epoch in range(self.epochs):
+            order = rng.permutation(train_idx)
+            for start in range(0, len(order), self.CHUNK_SIZE):
+                chunk = order[start:start + self.CHUNK_SIZE]
+                model.partial_fit(vectorizer.transform(texts[chunk]), labels[chunk], classes=classes)
+                progress.rows(epoch * len(order) + start + len(chunk))
+        
+        correct = 0
+        for start in range(0, len(test_idx), self.CHUNK_SIZE):
+            chunk = test_idx[start:start + self.CHUNK_SIZE]
+            correct += int((model.predict(vectorizer.transform(texts[chunk])) == labels[chunk]).sum())
+        accuracy = correct / len(test_idx) if len(test_idx) else 0.0
+        progress.metric(f"{phase}_accuracy", accuracy)
+        
+        return vectorizer, model, accuracy
+    
     def train_symptom_classifier(self):
         """Train symptom classification model"""
         print("\n--- Training Symptom Classifier ---")
@@ -84,41 +152,18 @@ class FinalModelTrainer:
             print("No data available for symptom classifier")
             return False
         
-        # Create training data
-        training_data = []
-        for record in data[:1000]:  # Use first 1000 records for training
-            if 'symptom' in record and record['symptom']:
-                training_data.append({
-                    'text': f"{record.get('symptom', '')} {record.get('details', '')}".strip(),
-                    'symptom': record['symptom']
-                })
-        
-        if len(training_data) < 10:
+        # Train on the full corpus
+        df = self._text_frame(data)
+        if len(df) < 10:
             print("Insufficient data for symptom classifier")
             return False
         
-        print(f"Created {len(training_data)} training samples")
-        
-        # Prepare features
-        texts = [item['text'] for item in training_data]
-        labels = [item['symptom'] for item in training_data]
-        
-        # Vectorize text
-        vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
-        X = vectorizer.fit_transform(texts)
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, random_state=42)
-        
-        # Train model
-        model = RandomForestClassifier(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
-        
-        # Evaluate
-        y_pred = model.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
+        print(f"Created {len(df)} training samples")
         
+        vectorizer, model, accuracy = self._train_text_model_out_of_core(df['text'], df['symptom'], 'symptom_classifier')
         print(f"Symptom classifier accuracy: {accuracy:.3f}")
+        self.text_heads['symptom'] = model
+        self.text_samples = df['text'].head(200).tolist()
         
         # Save model and vectorizer
         model_path = self.models_dir / "symptom_classifier.pkl"
@@ -139,16 +184,15 @@ class FinalModelTrainer:
             print("No data available for treatment recommender")
             return False
         
-        # Create training data
-        training_data = []
-        for record in data:
-            if isinstance(record, dict) and 'symptom' in record and 'treatment' in record:
-                training_data.append({
-                    'symptom': record['symptom'],
-                    'age_group': record.get('age_group', 'unknown'),
-                    'severity': record.get('severity', 'unknown'),
-                    'treatment': record['treatment']
-                })
+        # Create training data from the store's columns; the label is each
+        # record's primary treatment (first medication, else first home care)
+        training_data = pd.DataFrame({
+            'symptom': data.categorical('symptom'),
+            'age_group': data.categorical('age_group'),
+            'severity': 'unknown',
+            'treatment': data.primary_treatments()
+        })
+        training_data = training_data[training_data['treatment'] != '']
         
         if len(training_data) < 10:
             print("Insufficient data for treatment recommender")
@@ -203,6 +247,25 @@ class FinalModelTrainer:
         print(f"Saved treatment recommender to {model_path}")
         return True
     
+    def train_cooccurrence_recommender(self):
+        """Train the sparse co-occurrence treatment recommender"""
+        print("\n--- Training Co-occurrence Treatment Recommender ---")
+        
+        data = self.load_treatment_dataset()
+        if not data:
+            print("No data available for co-occurrence recommender")
+            return False
+        
+        recommender, comparison = train_cooccurrence_recommender(data, self.models_dir)
+        print(f"Saved co-occurrence recommender ({recommender.counts.nnz} non-zero counts, "
+              f"{len(recommender.treatment_names)} treatments)")
+        if comparison:
+            print(f"Co-occurrence: {comparison['cooccurrence']['bytes'] / 1024:.1f} KB, "
+                  f"{comparison['cooccurrence']['batch_ms']:.1f} ms for {comparison['queries']} queries; "
+                  f"RandomForest: {comparison['classifier']['bytes'] / 1024:.1f} KB, "
+                  f"{comparison['classifier']['batch_ms']:.1f} ms")
+        return True
+    
     def train_risk_assessor(self):
         """Train risk assessment model"""
         print("\n--- Training Risk Assessor ---")
@@ -212,50 +275,23 @@ class FinalModelTrainer:
             print("No data available for risk assessor")
             return False
         
-        # Create training data with risk levels
-        training_data = []
-        for record in data[:1000]:
-            if 'symptom' in record and record['symptom']:
-                # Simple risk assessment based on symptoms
-                symptom = record['symptom'].lower()
-                if any(word in symptom for word in ['fever', 'high', 'severe', 'emergency']):
-                    risk_level = 'high'
-                elif any(word in symptom for word in ['mild', 'slight', 'minor']):
-                    risk_level = 'low'
-                else:
-                    risk_level = 'medium'
-                
-                training_data.append({
-                    'text': f"{record.get('symptom', '')} {record.get('details', '')}".strip(),
-                    'risk_level': risk_level
-                })
-        
-        if len(training_data) < 10:
+        # Risk levels from simple symptom keywords, over the full corpus
+        df = self._text_frame(data)
+        if len(df) < 10:
             print("Insufficient data for risk assessor")
             return False
         
-        print(f"Created {len(training_data)} training samples")
-        
-        # Prepare features
-        texts = [item['text'] for item in training_data]
-        labels = [item['risk_level'] for item in training_data]
-        
-        # Vectorize text
-        vectorizer = TfidfVectorizer(max_features=500, stop_words='english')
-        X = vectorizer.fit_transform(texts)
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, random_state=42)
+        symptom = df['symptom'].str.lower()
+        df['risk_level'] = np.select(
+            [symptom.str.contains('fever|high|severe|emergency'), symptom.str.contains('mild|slight|minor')],
+            ['high', 'low'], default='medium'
+        )
         
-        # Train model
-        model = RandomForestClassifier(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
-        
-        # Evaluate
-        y_pred = model.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
+        print(f"Created {len(df)} training samples")
         
+        vectorizer, model, accuracy = self._train_text_model_out_of_core(df['text'], df['risk_level'], 'risk_assessor')
         print(f"Risk assessor accuracy: {accuracy:.3f}")
+        self.text_heads['risk'] = model
         
         # Save model and vectorizer
         model_path = self.models_dir / "risk_assessor.pkl"
@@ -267,6 +303,43 @@ class FinalModelTrainer:
         print(f"Saved risk assessor to {model_path}")
         return True
     
+    def build_inference_graph(self):
+        """Bundle the shared text vectorizer and every trained head into one artifact"""
+        print("\n--- Building Text Inference Graph ---")
+        
+        if not self.text_heads:
+            print("No text models available for the inference graph")
+            return False
+        
+        # Severity head, only when the corpus carries real severity labels
+        df = self._text_frame(self.load_comprehensive_dataset(), extra_columns=['severity'])
+        df = df[df['severity'].fillna('unknown').astype(str) != 'unknown']
+        if len(df) >= 10 and df['severity'].nunique() > 1:
+            _, model, accuracy = self._train_text_model_out_of_core(df['text'], df['severity'].astype(str), 'severity_head')
+            print(f"Severity head accuracy: {accuracy:.3f}")
+            self.text_heads['severity'] = model
+        else:
+            print("No severity labels in the corpus, skipping severity head")
+        
+        graph = InferenceGraph(self.text_vectorizer, self.text_heads)
+        graph_path = graph.save(self.models_dir / "text_inference_graph.pkl")
+        print(f"Saved inference graph with heads {', '.join(self.text_heads)} to {graph_path}")
+        
+        # Latency against loading and calling each vectorizer + model pair on its own
+        independent = {
+            'symptom': (self.models_dir / "symptom_vectorizer.pkl", self.models_dir / "symptom_classifier.pkl"),
+            'risk': (self.models_dir / "risk_vectorizer.pkl", self.models_dir / "risk_assessor.pkl"),
+        }
+        independent = {name: paths for name, paths in independent.items()
+                       if name in self.text_heads and all(path.exists() for path in paths)}
+        if independent and self.text_samples:
+            comparison = benchmark_against_independent(graph_path, independent, self.text_samples)
+            print(f"Inference graph p50/p99: {comparison['graph']['p50_ms']:.3f}/{comparison['graph']['p99_ms']:.3f} ms, "
+                  f"independent: {comparison['independent']['p50_ms']:.3f}/{comparison['independent']['p99_ms']:.3f} ms "
+                  f"({comparison['saved_ms_per_request']:.3f} ms saved per request)")
+        
+        return True
+    
     def create_flutter_integration(self):
         """Create Flutter integration code"""
         print("\n--- Creating Flutter Integration ---")
@@ -332,11 +405,24 @@ class AIModelService {{
         print(f"Created Flutter integration at {integration_path}")
         return True
     
+    def cache_key(self):
+        """Artifact cache key over both datasets, the trainer code and its params"""
+        spec = TRAINING_MODULE_ARTIFACTS['final_models']
+        params = {'epochs': self.epochs, 'hash_features': self.HASH_FEATURES, 'chunk_size': self.CHUNK_SIZE}
+        return self.cache.key('final_models', spec['inputs'], spec['sources'], params)
+    
     def train_all_models(self):
         """Train all models"""
         print("Starting Final AI Model Training")
         print("=" * 50)
         
+        cache_key = self.cache_key()
+        if not self.force:
+            manifest = self.cache.restore(cache_key)
+            if manifest is not None and 'results' in manifest['metadata']:
+                print(f"Inputs unchanged; restored {len(manifest['files'])} cached artifacts ({cache_key})")
+                return manifest['metadata']['results']
+        
         results = {}
         
         # Train symptom classifier
@@ -344,10 +430,14 @@ class AIModelService {{
         
         # Train treatment recommender
         results['treatment_recommender'] = self.train_treatment_recommender()
+        results['treatment_cooccurrence'] = self.train_cooccurrence_recommender()
         
         # Train risk assessor
         results['risk_assessor'] = self.train_risk_assessor()
         
+        # Bundle the text heads behind one shared vectorizer
+        results['inference_graph'] = self.build_inference_graph()
+        
         # Create Flutter integration
         results['flutter_integration'] = self.create_flutter_integration()
         
@@ -365,11 +455,22 @@ class AIModelService {{
         
         print(f"\nOverall: {successful}/{total} models trained successfully")
         
+        # Only a complete run is reusable
+        if successful == total:
+            self.cache.store(cache_key, 'final_models', TRAINING_MODULE_ARTIFACTS['final_models']['outputs'],
+                             metadata={'results': results})
+        
         return results
 
 def main():
     """Main function"""
-    trainer = FinalModelTrainer()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train BeforeDoctor final models")
+    parser.add_argument('--force', action='store_true', help="Retrain even if a cached run matches")
+    args = parser.parse_args()
+    
+    trainer = FinalModelTrainer(force=args.force)
     results = trainer.train_all_models()
     
     if sum(results.values()) == len(results):
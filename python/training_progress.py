@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Structured Training Progress Events for BeforeDoctor
+Trainers write JSON-lines events (phase, rows, ETA, metric) to a dedicated
+channel; the executor reads it alongside the child's stdout and stderr so logs
+are forwarded live and pipes never fill up. On POSIX the channel is an
+inherited pipe fd multiplexed with selectors; on Windows, where neither
+``pass_fds`` nor selecting on pipes works, it is a loopback socket and each
+stream gets a reader thread
+"""
+
+import os
+import json
+import time
+import queue
+import socket
+import logging
+import secrets
+import selectors
+import threading
+import subprocess
+from collections import deque
+from typing import Dict, Any, Callable, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Number of the inherited fd trainers write events to (POSIX)
+PROGRESS_FD_ENV = "TRAINING_PROGRESS_FD"
+# host:port of the executor's loopback socket, and the token the trainer
+# must send first so no other local process can inject events (Windows)
+PROGRESS_ADDR_ENV = "TRAINING_PROGRESS_ADDR"
+PROGRESS_TOKEN_ENV = "TRAINING_PROGRESS_TOKEN"
+
+
+class ProgressReporter:
+    """Writes progress events for the parent executor, or nothing when run standalone
+
+    ``rows`` events are throttled to one per ``min_interval`` seconds (the
+    last row of a phase is always sent) and carry a rate and ETA when the
+    phase total is known.
+    """
+
+    def __init__(self, stream=None, min_interval: float = 0.5):
+        self.stream = stream
+        self.min_interval = min_interval
+        self.current_phase = None
+        self.total = None
+        self._phase_started = None
+        self._last_rows_sent = 0.0
+
+    @classmethod
+    def from_environment(cls, **kwargs) -> 'ProgressReporter':
+        fd = os.environ.get(PROGRESS_FD_ENV)
+        address = os.environ.get(PROGRESS_ADDR_ENV)
+        stream = None
+        try:
+            if fd:
+                stream = os.fdopen(int(fd), 'w', buffering=1, encoding='utf-8')
+            elif address:
+                host, port = address.rsplit(':', 1)
+                connection = socket.create_connection((host, int(port)), timeout=5)
+                connection.settimeout(None)
+                stream = connection.makefile('w', buffering=1, encoding='utf-8')
+                stream.write(os.environ.get(PROGRESS_TOKEN_ENV, '') + "\n")
+        except (ValueError, OSError):
+            stream = None
+        return cls(stream, **kwargs)
+
+    @property
+    def enabled(self) -> bool:
+        return self.stream is not None
+
+    def emit(self, event: str, **fields):
+        if self.stream is None:
+            return
+        record = {'event': event, 'time': round(time.time(), 3), 'phase': self.current_phase, **fields}
+        try:
+            self.stream.write(json.dumps(record, default=str) + "\n")
+        except (OSError, ValueError):
+            # The executor went away; keep training without progress
+            self.stream = None
+
+    def phase(self, name: str, total: Optional[int] = None):
+        self.current_phase = name
+        self.total = total
+        self._phase_started = time.perf_counter()
+        self._last_rows_sent = 0.0
+        self.emit('phase', total=total)
+
+    def rows(self, done: int, total: Optional[int] = None, unit: str = 'rows'):
+        total = total if total is not None else self.total
+        now = time.perf_counter()
+        finished = total is not None and done >= total
+        if not finished and now - self._last_rows_sent < self.min_interval:
+            return
+        self._last_rows_sent = now
+
+        elapsed = now - (self._phase_started or now)
+        rate = done / elapsed if elapsed > 0 else None
+        eta = (total - done) / rate if rate and total is not None else None
+        self.emit('rows', rows=done, total=total, unit=unit,
+                  rate=round(rate, 3) if rate else None,
+                  eta_seconds=round(max(eta, 0.0), 1) if eta is not None else None)
+
+    def metric(self, name: str, value):
+        self.emit('metric', name=name, value=value)
+
+    def close(self):
+        if self.stream is not None:
+            try:
+                self.stream.close()
+            except OSError:
+                pass
+            self.stream = None
+
+
+_reporter = None
+
+
+def progress_reporter() -> ProgressReporter:
+    """Process-wide reporter bound to the channel the executor passed in the environment"""
+    global _reporter
+    if _reporter is None:
+        _reporter = ProgressReporter.from_environment()
+    return _reporter
+
+
+def fit_forest_with_progress(forest, X, y, step: int = 10):
+    """Fit a sklearn forest ``step`` trees at a time, reporting trees built
+
+    Uses ``warm_start``, which draws the same per-tree seeds as a single
+    ``fit``, so the fitted forest is unchanged. Without a listening executor
+    it is a plain ``fit``.
+    """
+    reporter = progress_reporter()
+    total = forest.n_estimators
+    if not reporter.enabled or total <= step:
+        return forest.fit(X, y)
+
+    warm_start = forest.warm_start
+    forest.set_params(warm_start=True)
+    for built in range(step, total + step, step):
+        forest.set_params(n_estimators=min(built, total))
+        forest.fit(X, y)
+        reporter.rows(min(built, total), total, unit='trees')
+    forest.set_params(warm_start=warm_start)
+    return forest
+
+
+class _LineDispatcher:
+    """Routes raw lines from the child to the output and event callbacks"""
+
+    def __init__(self, on_output, on_event, tail_lines: int):
+        self.on_output = on_output
+        self.on_event = on_event
+        self.stderr_tail = deque(maxlen=tail_lines)
+
+    def dispatch(self, name: str, raw: bytes):
+        line = raw.decode('utf-8', errors='replace').rstrip("\r")
+        if name == 'progress':
+            try:
+                event = json.loads(line)
+            except ValueError:
+                event = None
+            if isinstance(event, dict):
+                if self.on_event:
+                    self.on_event(event)
+                return
+        if not line:
+            return
+        if name == 'stderr':
+            self.stderr_tail.append(line)
+        if self.on_output:
+            self.on_output(name, line)
+
+
+def _child_environment(env: Optional[Dict[str, str]]) -> Dict[str, str]:
+    child_env = dict(os.environ if env is None else env)
+    # Line-buffered child output, so logs are forwarded as they are written
+    child_env.setdefault("PYTHONUNBUFFERED", "1")
+    return child_env
+
+
+def run_with_progress(command: Sequence[str], cwd=None, env: Optional[Dict[str, str]] = None,
+                      on_output: Optional[Callable[[str, str], None]] = None,
+                      on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      on_idle: Optional[Callable[[], None]] = None, idle_interval: float = 5.0,
+                      should_stop: Optional[Callable[[], bool]] = None,
+                      tail_lines: int = 200) -> Tuple[int, str]:
+    """Run ``command`` and read its stdout, stderr and progress channel as they arrive
+
+    ``on_output(stream_name, line)`` gets every stdout/stderr line as it
+    arrives, ``on_event(event)`` every decoded progress event, and
+    ``on_idle()`` is called after ``idle_interval`` seconds without either.
+    Returns the exit code and the last ``tail_lines`` lines of stderr.
+    """
+    dispatcher = _LineDispatcher(on_output, on_event, tail_lines)
+    run = _run_with_threads if os.name == 'nt' else _run_with_selectors
+    returncode = run(list(command), cwd, _child_environment(env), dispatcher,
+                     on_idle, idle_interval, should_stop)
+    return returncode, "\n".join(dispatcher.stderr_tail)
+
+
+def _finish(process: subprocess.Popen, should_stop) -> int:
+    if process.poll() is None and should_stop and should_stop():
+        process.terminate()
+    return process.wait()
+
+
+def _run_with_selectors(command, cwd, child_env, dispatcher, on_idle, idle_interval, should_stop) -> int:
+    read_fd, write_fd = os.pipe()
+    child_env[PROGRESS_FD_ENV] = str(write_fd)
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   cwd=cwd, env=child_env, pass_fds=(write_fd,))
+    except Exception:
+        os.close(read_fd)
+        raise
+    finally:
+        # Only the child holds the write end, so EOF means it has exited
+        os.close(write_fd)
+
+    streams = {process.stdout.fileno(): 'stdout', process.stderr.fileno(): 'stderr', read_fd: 'progress'}
+    buffers = {fd: b"" for fd in streams}
+
+    selector = selectors.DefaultSelector()
+    for fd in streams:
+        os.set_blocking(fd, False)
+        selector.register(fd, selectors.EVENT_READ)
+
+    try:
+        while selector.get_map():
+            if should_stop and should_stop():
+                break
+            ready = selector.select(timeout=idle_interval)
+            if not ready:
+                if on_idle:
+                    on_idle()
+                continue
+            for key, _ in ready:
+                fd = key.fd
+                try:
+                    chunk = os.read(fd, 65536)
+                except BlockingIOError:
+                    continue
+                if not chunk:
+                    selector.unregister(fd)
+                    if buffers[fd]:
+                        dispatcher.dispatch(streams[fd], buffers[fd])
+                        buffers[fd] = b""
+                    continue
+                *lines, buffers[fd] = (buffers[fd] + chunk).split(b"\n")
+                for line in lines:
+                    dispatcher.dispatch(streams[fd], line)
+    finally:
+        selector.close()
+        returncode = _finish(process, should_stop)
+        process.stdout.close()
+        process.stderr.close()
+        os.close(read_fd)
+
+    return returncode
+
+
+def _run_with_threads(command, cwd, child_env, dispatcher, on_idle, idle_interval, should_stop) -> int:
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    listener.settimeout(0.5)
+    token = secrets.token_hex(16)
+    child_env[PROGRESS_ADDR_ENV] = f"127.0.0.1:{listener.getsockname()[1]}"
+    child_env[PROGRESS_TOKEN_ENV] = token
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   cwd=cwd, env=child_env)
+    except Exception:
+        listener.close()
+        raise
+
+    lines: queue.Queue = queue.Queue()
+
+    def pump(name, stream):
+        # A None line marks the end of a stream
+        for raw in iter(stream.readline, b""):
+            lines.put((name, raw.rstrip(b"\n")))
+        lines.put((name, None))
+
+    def accept_progress():
+        # Children that never report (or exit first) must not block the run
+        while True:
+            exited = process.poll() is not None
+            try:
+                connection, _ = listener.accept()
+            except OSError:
+                if exited:
+                    lines.put(('progress', None))
+                    return
+                continue
+            connection.settimeout(5)
+            stream = connection.makefile('rb')
+            try:
+                authenticated = stream.readline().strip() == token.encode('ascii')
+            except OSError:
+                authenticated = False
+            if authenticated:
+                connection.settimeout(None)
+                with connection, stream:
+                    pump('progress', stream)
+                return
+            stream.close()
+            connection.close()
+
+    threads = [
+        threading.Thread(target=pump, args=('stdout', process.stdout), daemon=True),
+        threading.Thread(target=pump, args=('stderr', process.stderr), daemon=True),
+        threading.Thread(target=accept_progress, daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    open_streams = len(threads)
+    try:
+        while open_streams:
+            if should_stop and should_stop():
+                break
+            try:
+                name, raw = lines.get(timeout=idle_interval)
+            except queue.Empty:
+                if on_idle:
+                    on_idle()
+                continue
+            if raw is None:
+                open_streams -= 1
+            else:
+                dispatcher.dispatch(name, raw)
+    finally:
+        listener.close()
+        returncode = _finish(process, should_stop)
+
+    return returncode
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Training DAG Scheduler for BeforeDoctor
+Runs pipeline stages (download -> process -> train -> export) as soon as their
+dependencies finish, in parallel under a global CPU-slot budget
+"""
+
+import os
+import time
+import logging
+import threading
+import subprocess
+from typing import Dict, Any, Callable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Set for every child; trainers read it through training_n_jobs()
+N_JOBS_ENV = "TRAINING_N_JOBS"
+# Thread pools of BLAS/OpenMP and joblib's view of the CPU count
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "LOKY_MAX_CPU_COUNT")
+
+FAILED_STATUSES = ("failed", "error", "skipped")
+
+
+def training_n_jobs(default=None):
+    """``n_jobs`` granted by the scheduler, or ``default`` when run standalone"""
+    value = os.environ.get(N_JOBS_ENV)
+    try:
+        return max(1, int(value)) if value else default
+    except ValueError:
+        return default
+
+
+def child_environment(slots: int) -> Dict[str, str]:
+    env = dict(os.environ)
+    env[N_JOBS_ENV] = str(slots)
+    for name in THREAD_ENV_VARS:
+        env[name] = str(slots)
+    return env
+
+
+class TrainingTask:
+    """One pipeline stage: a subprocess ``command`` or an in-process ``action``
+
+    ``slots`` is the most CPU slots the stage can use; fewer may be granted
+    when the budget is contended. With ``requires_success=False`` the task
+    runs once its dependencies have finished, whatever their outcome.
+    """
+
+    def __init__(self, name: str, command: Optional[Sequence[str]] = None,
+                 action: Optional[Callable[[], Any]] = None, depends_on: Sequence[str] = (),
+                 slots: int = 1, cwd=None, requires_success: bool = True):
+        if (command is None) == (action is None):
+            raise ValueError(f"Task '{name}' needs exactly one of command or action")
+        self.name = name
+        self.command = list(command) if command is not None else None
+        self.action = action
+        self.depends_on = list(depends_on)
+        self.slots = max(1, slots)
+        self.cwd = cwd
+        self.requires_success = requires_success
+
+        self.status = "pending"
+        self.granted_slots = 0
+        self.started = None
+        self.finished = None
+        self.returncode = None
+        self.output = ""
+        self.error = ""
+
+    @property
+    def duration(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class DagScheduler:
+    """List scheduler over a task DAG with a shared pool of CPU slots
+
+    Ready tasks start in order of their estimated critical-path length
+    (longest chain of work still behind them), using ``history`` durations
+    from a previous run where known. Each task is granted at most its own
+    ``slots`` and at most a fair share of the free slots.
+    """
+
+    def __init__(self, tasks: Sequence[TrainingTask], cpu_slots: Optional[int] = None,
+                 history: Optional[Dict[str, float]] = None):
+        self.tasks: Dict[str, TrainingTask] = {task.name: task for task in tasks}
+        self.cpu_slots = max(1, cpu_slots or os.cpu_count() or 1)
+        self.history = history or {}
+        self.order = self._topological_order()
+        self._condition = threading.Condition()
+        self._done: List[TrainingTask] = []
+        self._run_started = None
+        self._run_finished = None
+
+    def _topological_order(self) -> List[str]:
+        for task in self.tasks.values():
+            for dependency in task.depends_on:
+                if dependency not in self.tasks:
+                    raise ValueError(f"Task '{task.name}' depends on unknown task '{dependency}'")
+
+        indegree = {name: len(task.depends_on) for name, task in self.tasks.items()}
+        children = self._children()
+        order = [name for name, degree in indegree.items() if degree == 0]
+        for name in order:
+            for child in children[name]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    order.append(child)
+        if len(order) != len(self.tasks):
+            cycle = sorted(name for name, degree in indegree.items() if degree > 0)
+            raise ValueError(f"Task graph has a cycle through: {cycle}")
+        return order
+
+    def _children(self) -> Dict[str, List[str]]:
+        children = {name: [] for name in self.tasks}
+        for task in self.tasks.values():
+            for dependency in task.depends_on:
+                children[dependency].append(task.name)
+        return children
+
+    def _priorities(self) -> Dict[str, float]:
+        """Estimated length of the longest path from each task to the end"""
+        children = self._children()
+        priorities = {}
+        for name in reversed(self.order):
+            estimate = self.history.get(name, float(self.tasks[name].slots))
+            priorities[name] = estimate + max((priorities[c] for c in children[name]), default=0.0)
+        return priorities
+
+    def _execute(self, task: TrainingTask):
+        task.started = time.perf_counter()
+        try:
+            if task.action is not None:
+                success = task.action() is not False
+            else:
+                result = subprocess.run(task.command, capture_output=True, text=True, cwd=task.cwd,
+                                        env=child_environment(task.granted_slots))
+                task.returncode = result.returncode
+                task.output = result.stdout
+                task.error = result.stderr
+                success = result.returncode == 0
+            task.status = "success" if success else "failed"
+        except Exception as e:
+            task.status = "error"
+            task.error = str(e)
+        task.finished = time.perf_counter()
+
+        with self._condition:
+            self._done.append(task)
+            self._condition.notify()
+
+    def _blocked(self, task: TrainingTask) -> bool:
+        return task.requires_success and any(
+            self.tasks[d].status in FAILED_STATUSES for d in task.depends_on
+        )
+
+    def _ready(self, task: TrainingTask) -> bool:
+        if task.requires_success:
+            return all(self.tasks[d].status == "success" for d in task.depends_on)
+        return all(self.tasks[d].status not in ("pending", "running") for d in task.depends_on)
+
+    def run(self, on_finish: Optional[Callable[[TrainingTask], None]] = None) -> Dict[str, TrainingTask]:
+        """Run every task; ``on_finish`` is called on this thread as each one ends"""
+        priorities = self._priorities()
+        pending = set(self.tasks)
+        free, running = self.cpu_slots, 0
+        self._run_started = time.perf_counter()
+
+        with self._condition:
+            while pending or running:
+                # Stages behind a failed dependency will never run
+                for name in [n for n in self.order if n in pending]:
+                    task = self.tasks[name]
+                    if self._blocked(task):
+                        task.status = "skipped"
+                        pending.discard(name)
+                        logger.warning(f"⏭️ {name} skipped: a dependency did not succeed")
+                        if on_finish:
+                            on_finish(task)
+
+                ready = sorted((self.tasks[n] for n in pending if self._ready(self.tasks[n])),
+                               key=lambda t: -priorities[t.name])
+                while ready and free > 0:
+                    task = ready.pop(0)
+                    task.granted_slots = min(task.slots, max(1, free // (len(ready) + 1)))
+                    task.status = "running"
+                    free -= task.granted_slots
+                    running += 1
+                    pending.discard(task.name)
+                    logger.info(f"▶️ {task.name} started with {task.granted_slots}/{self.cpu_slots} CPU slots")
+                    threading.Thread(target=self._execute, args=(task,), daemon=True).start()
+
+                if not running:
+                    if pending and not ready:
+                        # Nothing can start and nothing will finish
+                        break
+                    continue
+
+                while not self._done:
+                    self._condition.wait()
+                while self._done:
+                    task = self._done.pop(0)
+                    free += task.granted_slots
+                    running -= 1
+                    emoji = "✅" if task.status == "success" else "❌"
+                    logger.info(f"{emoji} {task.name} {task.status} in {task.duration:.1f}s")
+                    if on_finish:
+                        on_finish(task)
+
+        self._run_finished = time.perf_counter()
+        return self.tasks
+
+    def durations(self) -> Dict[str, float]:
+        return {name: round(task.duration, 3) for name, task in self.tasks.items() if task.finished is not None}
+
+    def critical_path_report(self) -> Dict[str, Any]:
+        """Longest chain of measured durations through the DAG, plus utilization"""
+        length, previous = {}, {}
+        for name in self.order:
+            task = self.tasks[name]
+            best = max(task.depends_on, key=lambda d: length[d], default=None)
+            length[name] = task.duration + (length[best] if best else 0.0)
+            previous[name] = best
+
+        path, name = [], max(length, key=length.get) if length else None
+        while name:
+            path.append(name)
+            name = previous[name]
+        path.reverse()
+
+        wall = (self._run_finished or 0.0) - (self._run_started or 0.0)
+        serial = sum(task.duration for task in self.tasks.values())
+        slot_seconds = sum(task.duration * task.granted_slots for task in self.tasks.values())
+        return {
+            "cpu_slots": self.cpu_slots,
+            "wall_seconds": round(wall, 3),
+            "serial_seconds": round(serial, 3),
+            "speedup": round(serial / wall, 2) if wall else None,
+            "slot_utilization": round(slot_seconds / (wall * self.cpu_slots), 3) if wall else None,
+            "critical_path": path,
+            "critical_path_seconds": round(length[path[-1]], 3) if path else 0.0,
+            "tasks": {
+                name: {
+                    "status": task.status,
+                    "slots": task.granted_slots,
+                    "start_offset_seconds": round(task.started - self._run_started, 3) if task.started else None,
+                    "duration_seconds": round(task.duration, 3),
+                    "depends_on": task.depends_on,
+                }
+                for name, task in self.tasks.items()
+            },
+        }
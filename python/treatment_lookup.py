@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Treatment Lookup Engine for BeforeDoctor
+Answers "medications, home care and red flags for symptom X at age N months"
+from a symptom hash plus a numeric age-interval index over treatment records
+"""
+
+import re
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE_MONTHS = 216
+
+# Named bands used by the voice, CDC and disease modules, in months [start, end)
+NAMED_AGE_GROUPS = {
+    'newborn': (0, 1),
+    'neonate': (0, 1),
+    'infant': (0, 12),
+    'toddler': (12, 36),
+    'preschool': (36, 72),
+    'school_age': (72, 144),
+    'school age': (72, 144),
+    'adolescent': (144, MAX_AGE_MONTHS),
+    'teen': (144, MAX_AGE_MONTHS),
+}
+
+_RANGE_LABEL = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(?:-|–|to)\s*(\d+(?:\.\d+)?)\s*([a-z]*)\s*$')
+_SINGLE_LABEL = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([a-z]*)\s*$')
+_UNIT_MONTHS = {'month': 1, 'months': 1, 'mo': 1, 'm': 1, 'week': 12 / 52, 'weeks': 12 / 52,
+                'year': 12, 'years': 12, 'yr': 12, 'yrs': 12, 'y': 12, '': 12}
+
+
+def parse_age_label(label: str) -> Optional[Tuple[int, int]]:
+    """Age label to a half-open month interval ``[start, end)``
+
+    "4-12 months" -> (4, 13), "1-3 years" -> (12, 48), "toddler" -> (12, 36).
+    Bare numeric bands such as "0-2" are read as years. Returns None for
+    labels that cannot be parsed.
+    """
+    if not label:
+        return None
+    text = label.strip().lower().replace('_', ' ')
+    named = NAMED_AGE_GROUPS.get(text)
+    if named:
+        return named
+
+    match = _RANGE_LABEL.match(text)
+    if match:
+        low, high, unit = float(match.group(1)), float(match.group(2)), match.group(3)
+    else:
+        match = _SINGLE_LABEL.match(text)
+        if not match:
+            return None
+        low = high = float(match.group(1))
+        unit = match.group(2)
+    scale = _UNIT_MONTHS.get(unit)
+    if scale is None:
+        return None
+    # Inclusive upper bound: "1-3 years" covers the whole of the third year
+    return int(round(low * scale)), int(round((high + 1) * scale))
+
+
+def _normalize_symptom(symptom: str) -> str:
+    return ' '.join(str(symptom).lower().replace('_', ' ').split())
+
+
+def _unique(values) -> List:
+    seen, result = set(), []
+    for value in values:
+        key = json.dumps(value, sort_keys=True) if isinstance(value, dict) else value
+        if key not in seen:
+            seen.add(key)
+            result.append(value)
+    return result
+
+
+class TreatmentLookupEngine:
+    """Symptom hash + elementary age-segment index over treatment records
+
+    For every symptom the interval boundaries of its records split the age
+    axis into elementary segments; each segment's merged answer is computed
+    once at build time. All symptoms' boundaries are packed into one sorted
+    key array (``symptom_code * KEY_STRIDE + month``), so a lookup, or a
+    whole batch of lookups, is a single ``np.searchsorted``.
+    """
+
+    KEY_STRIDE = 1 << 16
+
+    def __init__(self):
+        self.symptoms: Dict[str, int] = {}
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.segment_ends = np.zeros(0, dtype=np.int64)
+        self.segment_answers = np.zeros(0, dtype=np.int64)
+        self.answers: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_records(cls, records) -> 'TreatmentLookupEngine':
+        """Build from treatment records (JSON dicts or a ``CompactTreatmentDataset``)"""
+        start = time.perf_counter()
+        by_symptom: Dict[str, List[Tuple[int, int, Dict[str, Any]]]] = {}
+        skipped = 0
+        for record in records:
+            interval = parse_age_label(record.get('age_group', ''))
+            symptom = _normalize_symptom(record.get('symptom', ''))
+            if interval is None or not symptom:
+                skipped += 1
+                continue
+            by_symptom.setdefault(symptom, []).append((interval[0], interval[1], record))
+
+        engine = cls()
+        keys, ends, segment_answers = [], [], []
+        answer_ids: Dict[str, int] = {}
+        for code, (symptom, entries) in enumerate(sorted(by_symptom.items())):
+            engine.symptoms[symptom] = code
+            boundaries = sorted({b for low, high, _ in entries for b in (low, high)})
+            for low, high in zip(boundaries, boundaries[1:]):
+                covering = [record for start_m, end_m, record in entries if start_m <= low and high <= end_m]
+                if not covering:
+                    continue
+                answer = engine._merge(covering)
+                answer_key = json.dumps(answer, sort_keys=True)
+                if answer_key not in answer_ids:
+                    answer_ids[answer_key] = len(engine.answers)
+                    engine.answers.append(answer)
+                keys.append(code * cls.KEY_STRIDE + low)
+                ends.append(code * cls.KEY_STRIDE + high)
+                segment_answers.append(answer_ids[answer_key])
+
+        engine.keys = np.asarray(keys, dtype=np.int64)
+        engine.segment_ends = np.asarray(ends, dtype=np.int64)
+        engine.segment_answers = np.asarray(segment_answers, dtype=np.int64)
+        logger.info(f"📇 Treatment lookup index: {len(engine.symptoms)} symptoms, {len(keys)} age segments, "
+                    f"{len(engine.answers)} distinct answers ({skipped} records skipped) "
+                    f"in {time.perf_counter() - start:.3f}s")
+        return engine
+
+    @staticmethod
+    def _merge(records: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        treatments = [record.get('treatment') or {} for record in records]
+        return {
+            'age_groups': _unique(record.get('age_group', '') for record in records),
+            'diagnoses': _unique(d for record in records for d in record.get('diagnoses') or []),
+            'medications': _unique(m for t in treatments for m in t.get('medications') or []),
+            'home_care': _unique(h for t in treatments for h in t.get('home_care') or []),
+            'red_flags': _unique(r for t in treatments for r in t.get('red_flags') or []),
+        }
+
+    def _answer_ids(self, symptoms: Sequence[str], ages_months: Sequence[float]) -> np.ndarray:
+        codes = np.array([self.symptoms.get(_normalize_symptom(s), -1) for s in symptoms], dtype=np.int64)
+        ages = np.asarray(ages_months, dtype=np.float64)
+        if not len(self.keys):
+            return np.full(len(codes), -1, dtype=np.int64)
+        valid = (codes >= 0) & (ages >= 0) & (ages < self.KEY_STRIDE)
+        query_keys = codes * self.KEY_STRIDE + np.floor(np.where(valid, ages, 0)).astype(np.int64)
+
+        # Last segment starting at or before the query, then check it has not ended
+        segment = np.maximum(np.searchsorted(self.keys, query_keys, side='right') - 1, 0)
+        found = valid & (self.keys[segment] <= query_keys) & (query_keys < self.segment_ends[segment])
+        return np.where(found, self.segment_answers[segment], -1)
+
+    def lookup_batch(self, symptoms: Sequence[str], ages_months: Sequence[float]) -> List[Optional[Dict[str, Any]]]:
+        """Answers for many (symptom, age in months) pairs; None where nothing matches"""
+        return [self.answers[i] if i >= 0 else None for i in self._answer_ids(symptoms, ages_months)]
+
+    def lookup(self, symptom: str, age_months: float) -> Optional[Dict[str, Any]]:
+        """Medications, home care, red flags and diagnoses for a symptom at an age"""
+        return self.lookup_batch([symptom], [age_months])[0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat, app-friendly form: per symptom, sorted segment starts/ends and answer ids"""
+        symptoms = {}
+        codes = self.keys // self.KEY_STRIDE
+        for symptom, code in self.symptoms.items():
+            mask = codes == code
+            symptoms[symptom] = {
+                'starts': (self.keys[mask] % self.KEY_STRIDE).tolist(),
+                'ends': (self.segment_ends[mask] % self.KEY_STRIDE).tolist(),
+                'answers': self.segment_answers[mask].tolist()
+            }
+        return {'version': 1, 'age_unit': 'months', 'symptoms': symptoms, 'answers': self.answers}
+
+    def export(self, path) -> Path:
+        """Write the index as compact JSON for the app"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+        logger.info(f"💾 Treatment lookup index exported: {path} ({path.stat().st_size / 1024:.1f} KB)")
+        return path
+
+    @classmethod
+    def load(cls, path) -> 'TreatmentLookupEngine':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        engine = cls()
+        engine.answers = data['answers']
+        keys, ends, answers = [], [], []
+        for code, (symptom, entry) in enumerate(sorted(data['symptoms'].items())):
+            engine.symptoms[symptom] = code
+            keys.extend(code * cls.KEY_STRIDE + s for s in entry['starts'])
+            ends.extend(code * cls.KEY_STRIDE + e for e in entry['ends'])
+            answers.extend(entry['answers'])
+        engine.keys = np.asarray(keys, dtype=np.int64)
+        engine.segment_ends = np.asarray(ends, dtype=np.int64)
+        engine.segment_answers = np.asarray(answers, dtype=np.int64)
+        return engine
+
+
+def benchmark_lookup(engine: TreatmentLookupEngine, records, n_queries: int = 10_000,
+                     seed: int = 42) -> Dict[str, Any]:
+    """Indexed batch lookups vs scanning all records for each query"""
+    records = list(records)
+    rng = np.random.default_rng(seed)
+    symptom_names = list(engine.symptoms)
+    symptoms = [symptom_names[i] for i in rng.integers(0, len(symptom_names), n_queries)]
+    ages = rng.integers(0, MAX_AGE_MONTHS, n_queries)
+
+    start = time.perf_counter()
+    indexed = engine.lookup_batch(symptoms, ages)
+    batch_seconds = time.perf_counter() - start
+
+    parsed = [(parse_age_label(r.get('age_group', '')), _normalize_symptom(r.get('symptom', ''))) for r in records]
+    scan_queries = min(n_queries, 500)
+    start = time.perf_counter()
+    for symptom, age in zip(symptoms[:scan_queries], ages[:scan_queries]):
+        [r for r, (interval, s) in zip(records, parsed)
+         if s == symptom and interval and interval[0] <= age < interval[1]]
+    scan_seconds = time.perf_counter() - start
+
+    results = {
+        'queries': n_queries,
+        'matched': sum(answer is not None for answer in indexed),
+        'indexed_us_per_query': round(batch_seconds * 1e6 / n_queries, 3),
+        'scan_us_per_query': round(scan_seconds * 1e6 / scan_queries, 3)
+    }
+    logger.info(f"⏱️ Treatment lookup benchmark: {results}")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from treatment_store import TREATMENT_DATASET_NAME, load_treatment_store
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Build, benchmark and export the treatment lookup index")
+    parser.add_argument('--data', default=str(Path(__file__).parent.parent / "beforedoctor" / "assets" / "data" / TREATMENT_DATASET_NAME))
+    parser.add_argument('--output', default="processed/treatment_lookup_index.json")
+    args = parser.parse_args()
+
+    dataset = load_treatment_store(args.data)
+    engine = TreatmentLookupEngine.from_records(dataset)
+    print(json.dumps(engine.lookup('fever', 18), indent=2))
+    print(json.dumps(benchmark_lookup(engine, dataset), indent=2))
+    engine.export(args.output)
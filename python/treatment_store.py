@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Compact Treatment Dataset Store for BeforeDoctor
+Compiles pediatric_symptom_treatment_large.json once into dictionary-encoded
+string tables plus offset arrays, and memory-maps them for every consumer
+"""
+
+import sys
+import json
+import time
+import logging
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TREATMENT_DATASET_NAME = "pediatric_symptom_treatment_large.json"
+STORE_SUFFIX = ".compact"
+FORMAT_VERSION = 1
+
+# Scalar fields: one code per record
+SCALAR_FIELDS = ('id', 'symptom', 'age_group')
+# List fields: codes for all items plus per-record offsets. Medications are
+# two parallel code arrays (name, type) sharing one offset array.
+LIST_FIELDS = ('diagnoses', 'home_care', 'red_flags')
+
+
+class _StringTableBuilder:
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def encode(self, value) -> int:
+        value = '' if value is None else str(value)
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def save(self, directory: Path, name: str):
+        encoded = [value.encode('utf-8') for value in self.values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        np.save(directory / f"{name}.strings.npy", np.frombuffer(b''.join(encoded), dtype=np.uint8))
+        np.save(directory / f"{name}.string_offsets.npy", offsets)
+
+
+# Compiled stores live with the other processed artifacts rather than next to
+# the JSON, which sits in the Flutter asset bundle
+STORE_ROOT = Path(__file__).resolve().parent / "processed"
+
+
+def default_store_dir(json_path) -> Path:
+    return STORE_ROOT / (Path(json_path).stem + STORE_SUFFIX)
+
+
+def _source_signature(json_path: Path) -> Dict[str, int]:
+    stat = json_path.stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _records_of(data) -> List[Dict[str, Any]]:
+    """Unwrap ``{"records": [...]}`` / ``{"data": [...]}`` documents"""
+    if isinstance(data, dict):
+        return data.get('records') or data.get('data') or [data]
+    return data
+
+
+def compile_treatment_dataset(json_path, store_dir=None) -> Path:
+    """Compile the treatment JSON into the compact store; returns the store directory"""
+    json_path = Path(json_path)
+    store_dir = Path(store_dir) if store_dir else default_store_dir(json_path)
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    with open(json_path, 'r', encoding='utf-8') as f:
+        records = _records_of(json.load(f))
+
+    tables = {name: _StringTableBuilder() for name in
+              (*SCALAR_FIELDS, *LIST_FIELDS, 'medication_name', 'medication_type')}
+    scalars = {name: np.empty(len(records), dtype=np.int32) for name in SCALAR_FIELDS}
+    list_codes = {name: [] for name in (*LIST_FIELDS, 'medication_name', 'medication_type')}
+    list_lengths = {name: np.zeros(len(records), dtype=np.int64) for name in (*LIST_FIELDS, 'medications')}
+
+    for i, record in enumerate(records):
+        for name in SCALAR_FIELDS:
+            scalars[name][i] = tables[name].encode(record.get(name))
+        treatment = record.get('treatment') or {}
+        lists = {'diagnoses': record.get('diagnoses') or [],
+                 'home_care': treatment.get('home_care') or [],
+                 'red_flags': treatment.get('red_flags') or []}
+        for name, values in lists.items():
+            list_codes[name].extend(tables[name].encode(v) for v in values)
+            list_lengths[name][i] = len(values)
+        medications = treatment.get('medications') or []
+        for medication in medications:
+            list_codes['medication_name'].append(tables['medication_name'].encode(medication.get('name')))
+            list_codes['medication_type'].append(tables['medication_type'].encode(medication.get('type')))
+        list_lengths['medications'][i] = len(medications)
+
+    for name, table in tables.items():
+        table.save(store_dir, name)
+    for name, codes in scalars.items():
+        np.save(store_dir / f"{name}.codes.npy", codes)
+    for name, codes in list_codes.items():
+        np.save(store_dir / f"{name}.codes.npy", np.asarray(codes, dtype=np.int32))
+    for name, lengths in list_lengths.items():
+        offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        np.save(store_dir / f"{name}.offsets.npy", offsets)
+
+    # The manifest is written last, so a store without one is incomplete
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'source': str(json_path),
+        'source_signature': _source_signature(json_path),
+        'records': len(records),
+        'tables': {name: len(table.values) for name, table in tables.items()},
+        'compile_seconds': round(time.perf_counter() - start, 3)
+    }
+    with open(store_dir / "manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    size = sum(p.stat().st_size for p in store_dir.glob("*.npy"))
+    logger.info(f"💾 Compiled {len(records)} treatment records into {store_dir} "
+                f"({size / 1024:.1f} KB vs {json_path.stat().st_size / 1024:.1f} KB JSON)")
+    return store_dir
+
+
+class CompactTreatmentDataset:
+    """Memory-mapped view of a compiled treatment store
+
+    Code and offset arrays are read-only ``np.memmap`` views; the string
+    tables (only distinct values) are decoded once into interned strings.
+    Iterating or indexing yields records shaped like the original JSON, for
+    code that still walks dicts.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = Path(store_dir)
+        with open(self.store_dir / "manifest.json", 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self._tables: Dict[str, List[str]] = {}
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def _array(self, filename: str) -> np.ndarray:
+        array = self._arrays.get(filename)
+        if array is None:
+            array = self._arrays[filename] = np.load(self.store_dir / filename, mmap_mode='r')
+        return array
+
+    def strings(self, table: str) -> List[str]:
+        """Decoded string table, indexed by code"""
+        values = self._tables.get(table)
+        if values is None:
+            blob = self._array(f"{table}.strings.npy").tobytes()
+            offsets = self._array(f"{table}.string_offsets.npy")
+            values = [sys.intern(blob[offsets[i]:offsets[i + 1]].decode('utf-8'))
+                      for i in range(len(offsets) - 1)]
+            self._tables[table] = values
+        return values
+
+    def codes(self, field: str) -> np.ndarray:
+        """Zero-copy codes of a scalar field, or of all items of a list field"""
+        return self._array(f"{field}.codes.npy")
+
+    def offsets(self, field: str) -> np.ndarray:
+        """Zero-copy ``n_records + 1`` offsets of a list field ('medications' for both medication arrays)"""
+        return self._array(f"{field}.offsets.npy")
+
+    def explode(self, field: str) -> Tuple[np.ndarray, np.ndarray]:
+        """``(record_index, item_codes)`` for every item of a list field
+
+        For ``medication_name`` / ``medication_type`` the offsets are the
+        shared ``medications`` offsets.
+        """
+        offsets = self.offsets('medications' if field.startswith('medication_') else field)
+        record_index = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        return record_index, self.codes(field)
+
+    def items(self, field: str, index: int) -> np.ndarray:
+        """Zero-copy slice of one record's list-field codes"""
+        offsets = self.offsets('medications' if field.startswith('medication_') else field)
+        return self.codes(field)[offsets[index]:offsets[index + 1]]
+
+    def primary_treatments(self) -> List[str]:
+        """First medication of every record, else its first home-care item, else ''"""
+        result = np.full(len(self), '', dtype=object)
+        for field, table in (('home_care', 'home_care'), ('medication_name', 'medication_name')):
+            offsets = self.offsets('medications' if field.startswith('medication_') else field)
+            has_items = np.diff(offsets) > 0
+            strings = np.asarray(self.strings(table), dtype=object)
+            # Medications are applied last so they take precedence
+            result[has_items] = strings[self.codes(field)[offsets[:-1][has_items]]]
+        return result.tolist()
+
+    def __len__(self) -> int:
+        return self.manifest['records']
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if index < 0:
+            index += len(self)
+        record = {name: self.strings(name)[self.codes(name)[index]] for name in SCALAR_FIELDS}
+        record['diagnoses'] = [self.strings('diagnoses')[c] for c in self.items('diagnoses', index)]
+        names, types = self.items('medication_name', index), self.items('medication_type', index)
+        record['treatment'] = {
+            'medications': [{'type': self.strings('medication_type')[t], 'name': self.strings('medication_name')[n]}
+                            for n, t in zip(names, types)],
+            'home_care': [self.strings('home_care')[c] for c in self.items('home_care', index)],
+            'red_flags': [self.strings('red_flags')[c] for c in self.items('red_flags', index)],
+        }
+        return record
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def categorical(self, field: str, codes: Optional[np.ndarray] = None):
+        """pandas Categorical over a field's string table, without decoding per row"""
+        import pandas as pd
+        codes = self.codes(field) if codes is None else codes
+        return pd.Categorical.from_codes(np.asarray(codes), categories=self.strings(field))
+
+
+def load_treatment_store(json_path, store_dir=None) -> CompactTreatmentDataset:
+    """Open the compact store for ``json_path``, compiling it first if missing or stale"""
+    json_path = Path(json_path)
+    store_dir = Path(store_dir) if store_dir else default_store_dir(json_path)
+    manifest_path = store_dir / "manifest.json"
+
+    stale = True
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        stale = (manifest.get('format_version') != FORMAT_VERSION
+                 or (json_path.exists() and manifest.get('source_signature') != _source_signature(json_path)))
+    if stale:
+        compile_treatment_dataset(json_path, store_dir)
+
+    dataset = CompactTreatmentDataset(store_dir)
+    logger.info(f"📂 Treatment store opened: {len(dataset)} records from {store_dir}")
+    return dataset
+
+
+def benchmark_treatment_store(json_path, store_dir=None) -> Dict[str, Any]:
+    """Load time and Python heap usage of ``json.load`` vs the memory-mapped store"""
+    json_path = Path(json_path)
+    load_treatment_store(json_path, store_dir)
+
+    def measure(load):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = load()
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, {'load_ms': round(elapsed * 1000, 3), 'peak_kb': round(peak / 1024, 1),
+                        'retained_kb': round(current / 1024, 1)}
+
+    def load_json():
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load_store():
+        dataset = CompactTreatmentDataset(store_dir or default_store_dir(json_path))
+        for field in (*SCALAR_FIELDS, 'medication_name', 'home_care'):
+            dataset.strings(field)
+            dataset.codes(field)
+        return dataset
+
+    _, json_stats = measure(load_json)
+    dataset, store_stats = measure(load_store)
+    results = {
+        'records': len(dataset),
+        'json_bytes': json_path.stat().st_size,
+        'store_bytes': sum(p.stat().st_size for p in dataset.store_dir.glob("*.npy")),
+        'json_load': json_stats,
+        'store_load': store_stats
+    }
+    logger.info(f"⏱️ Treatment store benchmark: {results}")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Compile and benchmark the compact treatment store")
+    parser.add_argument('json_path', nargs='?',
+                        default=str(Path(__file__).parent.parent / "beforedoctor" / "assets" / "data" / TREATMENT_DATASET_NAME))
+    parser.add_argument('--compile-only', action='store_true', help="Skip the load benchmark")
+    args = parser.parse_args()
+
+    compile_treatment_dataset(args.json_path)
+    if not args.compile_only:
+        print(json.dumps(benchmark_treatment_store(args.json_path), indent=2))
@@ -13,7 +13,15 @@ from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
+import sys
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from treatment_store import load_treatment_store
+from treatment_lookup import TreatmentLookupEngine
+from training_scheduler import training_n_jobs
+from training_progress import progress_reporter, fit_forest_with_progress
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -31,8 +39,7 @@ class TreatmentModelTrainer:
         try:
             # Load from assets/data directory
             data_path = "../../../beforedoctor/assets/data/pediatric_symptom_treatment_large.json"
-            with open(data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_treatment_store(data_path)
             
             logger.info(f"Loaded treatment dataset with {len(data)} records")
             return data
@@ -41,47 +48,48 @@ class TreatmentModelTrainer:
             return None
     
     def create_treatment_training_data(self, dataset):
-        """Create training data for treatment recommendations"""
-        logger.info("Creating treatment training data...")
+        """Create training data for treatment recommendations
         
-        training_data = []
+        One row per medication and per home-care item of every record, built
+        from the compact store's code and offset arrays. String columns are
+        categoricals over the store's string tables, so each distinct
+        symptom/age group/treatment is stored once.
+        """
+        logger.info("Creating treatment training data...")
         
-        # Process each treatment record
-        for record in dataset:
-            symptom = record.get('symptom', '')
-            age_group = record.get('age_group', '')
-            treatment = record.get('treatment', {})
-            
-            # Extract treatment information
-            medications = treatment.get('medications', [])
-            home_care = treatment.get('home_care', [])
-            red_flags = treatment.get('red_flags', [])
-            
-            # Create training examples for different treatment types
-            for med in medications:
-                training_example = {
-                    "symptom": symptom,
-                    "age_group": age_group,
-                    "treatment_type": "medication",
-                    "treatment_name": med.get('name', ''),
-                    "treatment_category": med.get('type', ''),
-                    "priority": "high" if med.get('type') == 'Rx' else "medium"
-                }
-                training_data.append(training_example)
-            
-            # Add home care recommendations
-            for care in home_care:
-                training_example = {
-                    "symptom": symptom,
-                    "age_group": age_group,
-                    "treatment_type": "home_care",
-                    "treatment_name": care,
-                    "treatment_category": "home_remedy",
-                    "priority": "low"
-                }
-                training_data.append(training_example)
-        
-        logger.info(f"Created {len(training_data)} treatment training examples")
+        # Medications: one row per (name, type) entry
+        medication_records, medication_names = dataset.explode('medication_name')
+        medication_types = np.asarray(dataset.categorical('medication_type', dataset.codes('medication_type')))
+        medication_rows = pd.DataFrame({
+            "record": medication_records,
+            "symptom": dataset.categorical('symptom', dataset.codes('symptom')[medication_records]),
+            "age_group": dataset.categorical('age_group', dataset.codes('age_group')[medication_records]),
+            "treatment_type": "medication",
+            "treatment_name": dataset.categorical('medication_name', medication_names),
+            "treatment_category": medication_types,
+            "priority": np.where(medication_types == 'Rx', "high", "medium")
+        })
+        
+        # Home care: one row per recommendation string
+        care_records, care_codes = dataset.explode('home_care')
+        home_care_rows = pd.DataFrame({
+            "record": care_records,
+            "symptom": dataset.categorical('symptom', dataset.codes('symptom')[care_records]),
+            "age_group": dataset.categorical('age_group', dataset.codes('age_group')[care_records]),
+            "treatment_type": "home_care",
+            "treatment_name": dataset.categorical('home_care', care_codes),
+            "treatment_category": "home_remedy",
+            "priority": "low"
+        })
+        
+        # Stable sort on the record index keeps each record's medications
+        # ahead of its home care, as in the original per-record loop
+        training_data = pd.concat([medication_rows, home_care_rows], ignore_index=True)
+        training_data = training_data.sort_values('record', kind='stable').drop(columns='record')
+        training_data = training_data.reset_index(drop=True).astype('category')
+        
+        logger.info(f"Created {len(training_data)} treatment training examples "
+                    f"({training_data.memory_usage(deep=True).sum() / 1024:.1f} KB)")
         return training_data
     
     def prepare_features(self, training_data):
@@ -91,33 +99,28 @@ class TreatmentModelTrainer:
         # Convert to DataFrame
         df = pd.DataFrame(training_data)
         
-        # Create feature encoders
+        # Categorical codes over sorted categories match LabelEncoder's
+        # encoding, so the saved encoders keep their classes_ without a
+        # fit_transform round trip
         from sklearn.preprocessing import LabelEncoder
         
         self.encoders = {}
-        self.encoders['symptom'] = LabelEncoder()
-        self.encoders['age_group'] = LabelEncoder()
-        self.encoders['treatment_type'] = LabelEncoder()
-        self.encoders['treatment_category'] = LabelEncoder()
-        self.encoders['priority'] = LabelEncoder()
-        
-        # Encode categorical features
-        df['symptom_encoded'] = self.encoders['symptom'].fit_transform(df['symptom'])
-        df['age_group_encoded'] = self.encoders['age_group'].fit_transform(df['age_group'])
-        df['treatment_type_encoded'] = self.encoders['treatment_type'].fit_transform(df['treatment_type'])
-        df['treatment_category_encoded'] = self.encoders['treatment_category'].fit_transform(df['treatment_category'])
-        df['priority_encoded'] = self.encoders['priority'].fit_transform(df['priority'])
+        feature_columns = []
+        for column in ['symptom', 'age_group', 'treatment_type', 'treatment_category', 'priority']:
+            values = df[column].astype('category').cat.remove_unused_categories()
+            values = values.cat.reorder_categories(sorted(values.cat.categories))
+            encoder = LabelEncoder()
+            encoder.classes_ = np.asarray(values.cat.categories, dtype=object)
+            self.encoders[column] = encoder
+            df[f'{column}_encoded'] = values.cat.codes
+            feature_columns.append(f'{column}_encoded')
         
         # Create feature matrix
-        feature_columns = [
-            'symptom_encoded', 'age_group_encoded', 'treatment_type_encoded',
-            'treatment_category_encoded', 'priority_encoded'
-        ]
         X = df[feature_columns]
         
         # Create target variables
-        y_treatment = df['treatment_name']
-        y_priority = df['priority']
+        y_treatment = df['treatment_name'].astype(str)
+        y_priority = df['priority'].astype(str)
         
         logger.info(f"Prepared features: {X.shape}")
         return X, y_treatment, y_priority
@@ -135,10 +138,11 @@ class TreatmentModelTrainer:
         treatment_model = RandomForestClassifier(
             n_estimators=150,
             max_depth=12,
-            random_state=42
+            random_state=42,
+            n_jobs=training_n_jobs()
         )
         
-        treatment_model.fit(X_train, y_train)
+        fit_forest_with_progress(treatment_model, X_train, y_train)
         
         # Evaluate model
         y_pred = treatment_model.predict(X_test)
@@ -165,10 +169,11 @@ class TreatmentModelTrainer:
         priority_model = RandomForestClassifier(
             n_estimators=100,
             max_depth=8,
-            random_state=42
+            random_state=42,
+            n_jobs=training_n_jobs()
         )
         
-        priority_model.fit(X_train, y_train)
+        fit_forest_with_progress(priority_model, X_train, y_train)
         
         # Evaluate model
         y_pred = priority_model.predict(X_test)
@@ -285,26 +290,39 @@ class TreatmentModelService {
         os.makedirs(self.models_dir, exist_ok=True)
         os.makedirs(self.processed_dir, exist_ok=True)
         
+        progress = progress_reporter()
+        
         # Load treatment dataset
+        progress.phase("load_data")
         dataset = self.load_treatment_dataset()
         if dataset is None:
             logger.error("Failed to load treatment dataset")
             return False
         
         # Create training data
+        progress.phase("create_training_data")
         training_data = self.create_treatment_training_data(dataset)
         
         # Prepare features
+        progress.phase("prepare_features")
         X, y_treatment, y_priority = self.prepare_features(training_data)
         
         # Train models
+        progress.phase("train_treatment_recommender")
         treatment_model, treatment_accuracy = self.train_treatment_recommender(X, y_treatment)
+        progress.metric("treatment_accuracy", treatment_accuracy)
+        progress.phase("train_priority_classifier")
         priority_model, priority_accuracy = self.train_priority_classifier(X, y_priority)
+        progress.metric("priority_accuracy", priority_accuracy)
         
         # Save encoders
         encoders_path = f"{self.models_dir}/treatment_encoders.pkl"
         joblib.dump(self.encoders, encoders_path)
         
+        # Export the age-interval treatment lookup index for the app
+        lookup_path = f"{self.processed_dir}/treatment_lookup_index.json"
+        TreatmentLookupEngine.from_records(dataset).export(lookup_path)
+        
         # Create Flutter integration
         self.create_flutter_integration_code()
         
@@ -319,7 +337,8 @@ class TreatmentModelService {
                 "treatment_recommender.pkl",
                 "treatment_priority.pkl",
                 "treatment_encoders.pkl"
-            ]
+            ],
+            "lookup_index": "treatment_lookup_index.json"
         }
         
         with open(f"{self.processed_dir}/treatment_training_results.json", "w") as f:
@@ -6,13 +6,15 @@ Downloads and processes vaccination coverage data for children 19-35 months
 
 import os
 import json
-import pandas as pd
 import logging
 from datetime import datetime
 from pathlib import Path
 import zipfile
 import shutil
 
+from dataset_ingest import link_tree, iter_csv_sources
+from dataset_profiler import profile_files
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,7 +27,10 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class VaccinationDatasetDownloader:
-    def __init__(self):
+    def __init__(self, zero_copy: bool = True):
+        # Link files from the kagglehub cache and read zips in place instead
+        # of copying and extracting them
+        self.zero_copy = zero_copy
         self.dataset_name = "cdc/vaccination-coverage-among-children-19-35-months"
         self.base_dir = Path("vaccination_coverage_training")
         self.data_dir = self.base_dir / "data"
@@ -84,6 +89,10 @@ class VaccinationDatasetDownloader:
         """Copy downloaded files to our data directory"""
         source_path = Path(source_path)
         
+        if self.zero_copy:
+            link_tree(source_path, self.data_dir)
+            return
+        
         if source_path.is_file():
             # Single file download
             shutil.copy2(source_path, self.data_dir / source_path.name)
@@ -99,6 +108,11 @@ class VaccinationDatasetDownloader:
     
     def _extract_dataset(self):
         """Extract any zip files in the data directory"""
+        if self.zero_copy:
+            # CSV members are streamed straight out of the zip during analysis
+            logger.info("Zero-copy mode: leaving zip bundles in place")
+            return
+        
         for zip_file in self.data_dir.glob("*.zip"):
             logger.info(f"Extracting: {zip_file}")
             with zipfile.ZipFile(zip_file, 'r') as zip_ref:
@@ -118,6 +132,7 @@ class VaccinationDatasetDownloader:
         }
         
         # List all files in data directory
+        files_by_path = {}
         for file_path in self.data_dir.rglob("*"):
             if file_path.is_file():
                 file_info = {
@@ -127,27 +142,41 @@ class VaccinationDatasetDownloader:
                     "relative_path": str(file_path.relative_to(self.data_dir))
                 }
                 dataset_info["files"].append(file_info)
-                
-                # Analyze CSV files
-                if file_path.suffix.lower() == '.csv':
-                    try:
-                        df = pd.read_csv(file_path)
-                        file_info["rows"] = len(df)
-                        file_info["columns"] = list(df.columns)
-                        file_info["sample_data"] = df.head(3).to_dict('records')
-                        
-                        dataset_info["data_summary"][file_path.name] = {
-                            "shape": df.shape,
-                            "columns": list(df.columns),
-                            "dtypes": df.dtypes.to_dict(),
-                            "missing_values": df.isnull().sum().to_dict(),
-                            "unique_values": {col: df[col].nunique() for col in df.columns}
-                        }
-                        
-                        logger.info(f"Analyzed {file_path.name}: {df.shape[0]} rows, {df.shape[1]} columns")
-                        
-                    except Exception as e:
-                        logger.error(f"Error analyzing {file_path}: {e}")
+                files_by_path[file_info["relative_path"]] = file_info
+        
+        # CSV files on disk plus CSV members of zip bundles (read without extracting)
+        csv_files = {}
+        for source in iter_csv_sources(self.data_dir):
+            if isinstance(source, Path):
+                file_info = files_by_path[str(source.relative_to(self.data_dir))]
+            else:
+                file_info = {
+                    "name": source.name,
+                    "extension": source.suffix,
+                    "relative_path": f"{Path(source.zip_path).relative_to(self.data_dir)}/{source.member}",
+                    "archive": str(Path(source.zip_path).relative_to(self.data_dir))
+                }
+                dataset_info["files"].append(file_info)
+            csv_files[source] = file_info
+        
+        # Analyze CSV files in a single chunked pass, one process per file
+        profiles = profile_files(list(csv_files))
+        for source, profile in profiles.items():
+            if "error" in profile:
+                continue
+            file_info = csv_files[source]
+            file_info["rows"] = profile["rows"]
+            file_info["columns"] = profile["columns"]
+            file_info["sample_data"] = profile["sample_data"]
+            
+            dataset_info["data_summary"][file_info["name"]] = {
+                "shape": profile["shape"],
+                "columns": profile["columns"],
+                "dtypes": profile["dtypes"],
+                "missing_values": profile["missing_values"],
+                "unique_values": profile["unique_values"],
+                "unique_values_method": profile["unique_values_method"]
+            }
         
         # Save dataset info
         info_file = self.processed_dir / "dataset_info.json"
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Incremental Symptom Scorer for BeforeDoctor voice input
+Scores growing partial transcripts token by token against the
+VoiceModelTrainer TF-IDF space and linear symptom head
+"""
+
+import time
+import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, List, Sequence
+
+import numpy as np
+import joblib
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalSymptomScorer:
+    """Keeps running n-gram counts and class logits for one utterance
+
+    For the (1, n)-gram TF-IDF vector ``x = c * idf / ||c * idf||`` and a
+    linear head ``W x + b``, adding a token only touches the n-grams that end
+    at it. Each n-gram update adds ``idf_j * W[j]`` to the unnormalized logits
+    and adjusts the running squared norm, so the cost per token depends on
+    ``ngram_range`` and the number of classes, not on the utterance length.
+
+    :meth:`update` keeps the same property for growing partial transcripts:
+    when the new partial extends the previous one, only the text after the
+    previous partial's last whitespace is re-tokenized.
+    """
+
+    def __init__(self, vectorizer, head, min_confidence: float = 0.6):
+        self.vocabulary = vectorizer.vocabulary_
+        self.idf = np.asarray(getattr(vectorizer, 'idf_', np.ones(len(self.vocabulary))), dtype=np.float64)
+        self.min_n, self.max_n = vectorizer.ngram_range
+        self.preprocess = vectorizer.build_preprocessor()
+        self.tokenize = vectorizer.build_tokenizer()
+        self.stop_words = frozenset(vectorizer.get_stop_words() or ())
+
+        coef = np.asarray(head.coef_, dtype=np.float64)
+        intercept = np.asarray(head.intercept_, dtype=np.float64)
+        self.binary = coef.shape[0] == 1
+        # Rows indexed by feature so one n-gram update is one contiguous row read
+        self.weights = np.ascontiguousarray(coef.T)
+        self.intercept = intercept
+        self.classes = [str(c) for c in head.classes_]
+        self.min_confidence = min_confidence
+        self.reset()
+
+    @classmethod
+    def load(cls, models_dir: str = "models", min_confidence: float = 0.6) -> 'IncrementalSymptomScorer':
+        models_dir = Path(models_dir)
+        return cls(joblib.load(models_dir / "vectorizer.pkl"),
+                   joblib.load(models_dir / "symptom_linear_head.pkl"),
+                   min_confidence=min_confidence)
+
+    def reset(self):
+        """Start a new utterance"""
+        self.tokens: List[str] = []
+        self.counts: Dict[int, int] = defaultdict(int)
+        self.raw_logits = np.zeros(self.weights.shape[1], dtype=np.float64)
+        self.norm_sq = 0.0
+        self.text = ''
+        # Offset just after the last whitespace of ``text`` and the number of
+        # tokens before it; appending text cannot change those tokens
+        self._stable_offset = 0
+        self._stable_tokens = 0
+
+    def _ngram_features(self, end: int) -> List[int]:
+        """Vocabulary ids of the n-grams ending at token position ``end``"""
+        features = []
+        for n in range(self.min_n, self.max_n + 1):
+            start = end - n + 1
+            if start < 0:
+                break
+            feature = self.vocabulary.get(' '.join(self.tokens[start:end + 1]))
+            if feature is not None:
+                features.append(feature)
+        return features
+
+    def _apply(self, feature: int, delta: int):
+        count = self.counts[feature]
+        idf = self.idf[feature]
+        # (c + d)^2 - c^2 = d * (2c + d)
+        self.norm_sq += idf * idf * delta * (2 * count + delta)
+        self.raw_logits += delta * idf * self.weights[feature]
+        count += delta
+        if count:
+            self.counts[feature] = count
+        else:
+            del self.counts[feature]
+
+    def push(self, token: str):
+        """Append one already-tokenized word"""
+        if token in self.stop_words:
+            return
+        self.tokens.append(token)
+        for feature in self._ngram_features(len(self.tokens) - 1):
+            self._apply(feature, 1)
+
+    def pop(self):
+        """Remove the last token, e.g. when the recognizer revises a word"""
+        for feature in self._ngram_features(len(self.tokens) - 1):
+            self._apply(feature, -1)
+        self.tokens.pop()
+
+    def _analyze(self, text: str) -> List[str]:
+        return [t for t in self.tokenize(self.preprocess(text)) if t not in self.stop_words]
+
+    def _rewind(self, base: int, tokens: List[str]):
+        """Make ``tokens`` follow the first ``base`` tokens, keeping their common prefix"""
+        keep = 0
+        limit = min(len(tokens), len(self.tokens) - base)
+        while keep < limit and tokens[keep] == self.tokens[base + keep]:
+            keep += 1
+        while len(self.tokens) > base + keep:
+            self.pop()
+        for token in tokens[keep:]:
+            self.push(token)
+
+    def _mark_stable(self, text: str):
+        offset = len(text)
+        while offset and not text[offset - 1].isspace():
+            offset -= 1
+        self.text = text
+        self._stable_offset = offset
+        self._stable_tokens = len(self.tokens) - len(self._analyze(text[offset:]))
+
+    def update(self, partial_transcript: str) -> Dict[str, Any]:
+        """Move to a new partial transcript and return the current hypothesis
+
+        When the partial extends the previous one, only the trailing word of
+        the previous partial and the appended text are tokenized, so the
+        append-one-word case costs O(1) tokens however long the utterance is.
+        If the recognizer revised earlier text, the whole partial is
+        re-tokenized and tokens after the common prefix are undone.
+        """
+        if partial_transcript.startswith(self.text):
+            self._rewind(self._stable_tokens,
+                         self._analyze(partial_transcript[self._stable_offset:]))
+        else:
+            self._rewind(0, self._analyze(partial_transcript))
+        self._mark_stable(partial_transcript)
+        return self.hypothesis()
+
+    def probabilities(self) -> np.ndarray:
+        norm = np.sqrt(self.norm_sq) if self.norm_sq > 1e-12 else 1.0
+        logits = self.raw_logits / norm + self.intercept
+        if self.binary:
+            positive = 1.0 / (1.0 + np.exp(-logits[0]))
+            return np.array([1.0 - positive, positive])
+        logits = logits - logits.max()
+        exp = np.exp(logits)
+        return exp / exp.sum()
+
+    def hypothesis(self) -> Dict[str, Any]:
+        """Best symptom so far; ``early`` is set once confidence passes the threshold"""
+        if not self.counts:
+            return {'symptom': None, 'confidence': 0.0, 'early': False, 'tokens': len(self.tokens)}
+        proba = self.probabilities()
+        best = int(np.argmax(proba))
+        confidence = float(proba[best])
+        return {
+            'symptom': self.classes[best],
+            'confidence': round(confidence, 4),
+            'early': confidence >= self.min_confidence,
+            'tokens': len(self.tokens)
+        }
+
+    def stream(self, partial_transcripts: Sequence[str]):
+        """Yield a hypothesis for every partial transcript of one utterance"""
+        self.reset()
+        for partial in partial_transcripts:
+            yield dict(self.update(partial), partial=partial)
+
+
+def benchmark_incremental(scorer: IncrementalSymptomScorer, vectorizer, head,
+                          utterances: Sequence[str]) -> Dict[str, Any]:
+    """Per-token latency of incremental updates vs re-scoring the full partial
+
+    Utterances are replayed word by word, so every incremental update takes
+    the append path; the full baseline calls ``vectorizer.transform`` +
+    ``head.predict_proba`` on each growing prefix. ``mean_ms_by_length``
+    shows how each grows with the partial's length in words.
+    """
+    incremental, full = defaultdict(list), defaultdict(list)
+    agreements = 0
+    for utterance in utterances:
+        words = utterance.split()
+        scorer.reset()
+        for length in range(1, len(words) + 1):
+            partial = ' '.join(words[:length])
+
+            start = time.perf_counter()
+            hypothesis = scorer.update(partial)
+            incremental[length].append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            proba = head.predict_proba(vectorizer.transform([partial]))[0]
+            full[length].append((time.perf_counter() - start) * 1000)
+
+        if hypothesis['symptom'] == str(head.classes_[int(np.argmax(proba))]):
+            agreements += 1
+
+    def summarize(latencies: Dict[int, List[float]]) -> Dict[str, Any]:
+        flat = [value for values in latencies.values() for value in values]
+        return {
+            'p50_ms': round(float(np.percentile(flat, 50)), 4) if flat else None,
+            'p99_ms': round(float(np.percentile(flat, 99)), 4) if flat else None,
+            'mean_ms_by_length': {length: round(float(np.mean(values)), 4)
+                                  for length, values in sorted(latencies.items())}
+        }
+
+    results = {
+        'utterances': len(utterances),
+        'incremental': summarize(incremental),
+        'full_rescore': summarize(full),
+        'final_agreement': round(agreements / len(utterances), 4) if utterances else None
+    }
+    logger.info(f"⏱️ Incremental scorer benchmark: {results}")
+    return results
+
+
+if __name__ == "__main__":
+    import json
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from voice_model_trainer import VOICE_PATTERNS
+
+    scorer = IncrementalSymptomScorer.load("models")
+    utterances = [phrase for phrases in VOICE_PATTERNS.values() for phrase in phrases]
+    print(json.dumps(benchmark_incremental(scorer, joblib.load("models/vectorizer.pkl"),
+                                           joblib.load("models/symptom_linear_head.pkl"),
+                                           utterances), indent=2))
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Fuzzy Symptom Vocabulary for BeforeDoctor voice input
+SymSpell-style deletion index with phonetic fallback that corrects
+misrecognized words in speech transcripts and maps them to symptoms
+"""
+
+import sys
+import json
+import time
+import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from voice_symptom_service import normalize_transcript
+
+logger = logging.getLogger(__name__)
+
+TREATMENT_DATASET_PATH = "../../../beforedoctor/assets/data/pediatric_symptom_treatment_large.json"
+
+# Words that carry no symptom information in parent speech; dropped from both
+# vocabulary phrases and transcripts before phrase matching
+FILLER_WORDS = frozenset([
+    'a', 'an', 'the', 'my', 'our', 'his', 'her', 'him', 'he', 'she', 'it', 'its',
+    'is', 'are', 'was', 'has', 'have', 'had', 'been', 'be', 'child', 'kid', 'baby',
+    'son', 'daughter', 'and', 'or', 'with', 'at', 'in', 'on', 'of', 'for', 'lot',
+    'very', 'really', 'so', 'keeps', 'keep', 'started', 'since', 'i', 'think'
+])
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance, or ``max_distance + 1`` once it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+_PHONETIC_CODES = {}
+for _letters, _code in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'), ('l', '4'), ('mn', '5'), ('r', '6')):
+    for _letter in _letters:
+        _PHONETIC_CODES[_letter] = _code
+
+
+def phonetic_key(word: str) -> str:
+    """Soundex-like key with "ph"/"gh" folded to "f", so "feaver" and "fever" collide
+
+    Unlike classic Soundex the key is not truncated, which keeps longer
+    medical words apart.
+    """
+    word = word.lower().replace('ph', 'f').replace('gh', 'f')
+    if not word:
+        return ''
+    key = [word[0]]
+    last = _PHONETIC_CODES.get(word[0], '')
+    for letter in word[1:]:
+        code = _PHONETIC_CODES.get(letter, '')
+        if code and code != last:
+            key.append(code)
+        if letter not in 'hw':
+            last = code
+    return ''.join(key)
+
+
+def _content_tokens(text: str) -> List[str]:
+    return [t for t in normalize_transcript(text).split() if t not in FILLER_WORDS]
+
+
+class SymptomVocabulary:
+    """Deletion index over symptom words plus a phrase table mapping to symptoms
+
+    Every vocabulary word is indexed under all strings obtained by deleting
+    up to ``max_distance`` characters, so a lookup only generates the deletes
+    of the query and verifies the few candidates that share one, instead of
+    comparing against the whole vocabulary.
+    """
+
+    def __init__(self, phrases: Mapping[str, Iterable[str]], max_distance: int = 2):
+        self.max_distance = max_distance
+        self.word_counts: Dict[str, int] = defaultdict(int)
+        self.phrases: Dict[Tuple[str, ...], str] = {}
+
+        for symptom, symptom_phrases in phrases.items():
+            canonical = symptom.replace('_', ' ').lower()
+            for phrase in [canonical, *symptom_phrases]:
+                tokens = tuple(_content_tokens(phrase))
+                if not tokens:
+                    continue
+                self.phrases.setdefault(tokens, canonical)
+                for token in tokens:
+                    self.word_counts[token] += 1
+
+        self.max_phrase_length = max((len(p) for p in self.phrases), default=0)
+        self.deletes: Dict[str, List[str]] = defaultdict(list)
+        self.phonetic: Dict[str, List[str]] = defaultdict(list)
+        for word in self.word_counts:
+            for variant in self._deletes(word, self._max_distance_for(word)):
+                self.deletes[variant].append(word)
+            self.phonetic[phonetic_key(word)].append(word)
+        self._corrections: Dict[str, str] = {}
+
+        logger.info(f"📚 Symptom vocabulary: {len(self.word_counts)} words, "
+                    f"{len(self.phrases)} phrases, {len(self.deletes)} delete keys")
+
+    def _max_distance_for(self, word: str) -> int:
+        """Short words tolerate fewer edits, otherwise "ear" would match "eye" """
+        if len(word) <= 3:
+            return 0
+        if len(word) <= 5:
+            return min(1, self.max_distance)
+        return self.max_distance
+
+    @staticmethod
+    def _deletes(word: str, distance: int) -> Set[str]:
+        variants = {word}
+        frontier = {word}
+        for _ in range(distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w)) if len(w) > 1}
+            variants |= frontier
+        return variants
+
+    def lookup(self, word: str) -> Optional[str]:
+        """Closest vocabulary word within the edit budget, else a phonetic match"""
+        if word in self.word_counts:
+            return word
+        if word in self._corrections:
+            return self._corrections[word] or None
+
+        budget = self._max_distance_for(word)
+        best, best_key = None, None
+        for variant in self._deletes(word, budget):
+            for candidate in self.deletes.get(variant, ()):
+                distance = edit_distance(word, candidate, budget)
+                if distance > budget:
+                    continue
+                key = (distance, -self.word_counts[candidate], candidate)
+                if best_key is None or key < best_key:
+                    best, best_key = candidate, key
+
+        if best is None and len(word) > 3:
+            # Sounds-alike words may be further apart in spelling, but not arbitrarily
+            limit = max(budget, len(word) // 2)
+            scored = [(edit_distance(word, c, limit), -self.word_counts[c], c)
+                      for c in self.phonetic.get(phonetic_key(word), ())]
+            scored = [key for key in scored if key[0] <= limit]
+            if scored:
+                best = min(scored)[2]
+
+        if len(self._corrections) >= 100_000:
+            self._corrections.clear()
+        self._corrections[word] = best or ''
+        return best
+
+    def correct(self, transcript: str) -> str:
+        """Normalized transcript with every recognizable word replaced by its vocabulary spelling"""
+        return ' '.join(self.lookup(token) or token for token in normalize_transcript(transcript).split())
+
+    def match(self, transcript: str) -> Dict[str, Any]:
+        """Corrected transcript plus the symptoms whose phrases occur in it
+
+        Longest phrases win, so "sore throat" is preferred over "throat".
+        """
+        corrected = self.correct(transcript)
+        tokens = [t for t in corrected.split() if t not in FILLER_WORDS]
+        symptoms = []
+        position = 0
+        while position < len(tokens):
+            for length in range(min(self.max_phrase_length, len(tokens) - position), 0, -1):
+                symptom = self.phrases.get(tuple(tokens[position:position + length]))
+                if symptom is not None:
+                    if symptom not in symptoms:
+                        symptoms.append(symptom)
+                    position += length
+                    break
+            else:
+                position += 1
+        return {'transcript': corrected, 'symptoms': symptoms}
+
+    def brute_force_lookup(self, word: str) -> Optional[str]:
+        """Reference lookup scanning the whole vocabulary, used by the benchmark"""
+        budget = self._max_distance_for(word)
+        best, best_key = None, None
+        for candidate in self.word_counts:
+            distance = edit_distance(word, candidate, budget)
+            if distance > budget:
+                continue
+            key = (distance, -self.word_counts[candidate], candidate)
+            if best_key is None or key < best_key:
+                best, best_key = candidate, key
+        return best
+
+
+def load_symptom_phrases(treatment_path: str = TREATMENT_DATASET_PATH) -> Dict[str, List[str]]:
+    """Merge voice patterns, PubMed symptom keywords and treatment dataset symptoms"""
+    from voice_model_trainer import VOICE_PATTERNS
+
+    phrases: Dict[str, List[str]] = defaultdict(list)
+    for symptom, voice_inputs in VOICE_PATTERNS.items():
+        phrases[symptom.replace('_', ' ')].extend(voice_inputs)
+
+    try:
+        from pubmed_dataset_downloader import PubMedDatasetDownloader
+        for symptom, keywords in PubMedDatasetDownloader().symptom_keywords.items():
+            phrases[symptom].extend(keywords)
+    except Exception as e:
+        logger.warning(f"⚠️ PubMed symptom keywords unavailable: {e}")
+
+    try:
+        with open(treatment_path, 'r', encoding='utf-8') as f:
+            for record in json.load(f):
+                symptom = record.get('symptom')
+                if symptom:
+                    phrases[symptom.lower()].append(symptom)
+    except Exception as e:
+        logger.warning(f"⚠️ Treatment dataset symptoms unavailable: {e}")
+
+    return {symptom: sorted(set(values)) for symptom, values in phrases.items()}
+
+
+def benchmark_lookup(vocabulary: SymptomVocabulary, queries: Sequence[str]) -> Dict[str, Any]:
+    """Deletion-index lookup vs a brute-force edit-distance scan over the vocabulary"""
+    results = {'queries': len(queries), 'vocabulary_words': len(vocabulary.word_counts)}
+    answers = {}
+    for name, lookup in (('deletion_index', vocabulary.lookup), ('brute_force', vocabulary.brute_force_lookup)):
+        vocabulary._corrections.clear()
+        latencies = []
+        found = []
+        for query in queries:
+            start = time.perf_counter()
+            found.append(lookup(query))
+            latencies.append((time.perf_counter() - start) * 1000)
+        answers[name] = found
+        results[name] = {
+            'p50_ms': round(float(np.percentile(latencies, 50)), 4) if latencies else None,
+            'p99_ms': round(float(np.percentile(latencies, 99)), 4) if latencies else None
+        }
+    vocabulary._corrections.clear()
+    agree = sum(a == b for a, b in zip(answers['deletion_index'], answers['brute_force']))
+    results['agreement'] = round(agree / len(queries), 4) if queries else None
+    logger.info(f"⏱️ Symptom vocabulary benchmark: {results}")
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    vocabulary = SymptomVocabulary(load_symptom_phrases())
+    for example in ("diarea since monday", "feaver and cof", "ear hurts him", "sore throte"):
+        print(example, '->', vocabulary.match(example))
+    noisy = ['diarea', 'feaver', 'vomitting', 'wheezeing', 'hedache', 'rassh', 'caugh', 'throte', 'nausia']
+    print(json.dumps(benchmark_lookup(vocabulary, noisy * 50), indent=2))
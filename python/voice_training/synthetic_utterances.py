@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Synthetic Voice Utterance Generator for BeforeDoctor
+Vectorized, seeded expansion of symptom phrases into parent-style utterances,
+written as chunked Parquet by parallel workers
+"""
+
+import os
+import json
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from voice_model_trainer import VOICE_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+# Rows at scale 1; benchmarks run at 1x / 10x / 100x
+BASE_ROWS = 50_000
+DEFAULT_CHUNK_ROWS = 250_000
+
+AGE_GROUPS = ["infant", "toddler", "preschool", "school_age", "adolescent"]
+SEVERITIES = ["mild", "moderate", "severe"]
+
+# Paraphrase slots. Index 0 of every optional slot is the empty string so a
+# template that skips the slot simply forces index 0.
+OPENERS = ["", "um ", "so ", "hi ", "okay so ", "i'm worried because ", "we noticed that ",
+           "the doctor asked and ", "i think "]
+AGE_SUBJECTS = {
+    "infant": ["my baby", "my newborn", "my 6 month old", "the baby"],
+    "toddler": ["my toddler", "my 2 year old", "my little one", "my son"],
+    "preschool": ["my 4 year old", "my daughter", "my preschooler", "my son"],
+    "school_age": ["my 8 year old", "my son", "my daughter", "my kid"],
+    "adolescent": ["my teenager", "my 14 year old", "my son", "my daughter"],
+}
+TIMES_OF_DAY = ["", " at night", " this morning", " after eating", " after school", " since last night"]
+DURATIONS = [""] + [" for a day"] + [f" for {days} days" for days in range(2, 15)]
+
+# Which optional slots each template uses: (opener, age suffix, time of day, duration)
+TEMPLATES = np.array([
+    (False, False, False, False),
+    (True, False, False, False),
+    (False, True, False, True),
+    (True, True, True, False),
+    (False, False, True, True),
+    (True, True, True, True),
+], dtype=bool)
+
+_SUBJECT_PREFIXES = ("my child ", "child ")
+
+
+def _phrase_table():
+    """Split every voice pattern into (symptom, body, has_subject)
+
+    "My child has a fever" becomes body "has a fever" with a subject slot,
+    so the generator can substitute an age-appropriate subject.
+    """
+    symptoms, bodies, has_subject = [], [], []
+    for symptom, phrases in VOICE_PATTERNS.items():
+        for phrase in phrases:
+            phrase = phrase.lower()
+            subject = phrase.startswith(_SUBJECT_PREFIXES)
+            for prefix in _SUBJECT_PREFIXES:
+                if phrase.startswith(prefix):
+                    phrase = phrase[len(prefix):]
+                    break
+            symptoms.append(symptom)
+            bodies.append(phrase)
+            has_subject.append(subject)
+    return symptoms, np.array(bodies, dtype=object), np.array(has_subject, dtype=bool)
+
+
+def _object_array(values: List[str]) -> np.ndarray:
+    return np.array(values, dtype=object)
+
+
+def generate_chunk(rows: int, seed) -> pd.DataFrame:
+    """Generate ``rows`` utterances from one seeded RNG stream
+
+    Every slot is drawn as an index array and the text is assembled with
+    elementwise concatenation of object arrays, so there is no per-row
+    Python code. ``seed`` may be an int or a ``np.random.SeedSequence``.
+    """
+    rng = np.random.default_rng(seed)
+    symptoms, bodies, has_subject = _phrase_table()
+    symptom_names = sorted(set(symptoms))
+    symptom_codes = np.array([symptom_names.index(s) for s in symptoms])
+
+    subjects = [subject for age in AGE_GROUPS for subject in AGE_SUBJECTS[age]]
+    subject_counts = np.array([len(AGE_SUBJECTS[age]) for age in AGE_GROUPS])
+    subject_offsets = np.concatenate([[0], np.cumsum(subject_counts)[:-1]])
+
+    phrase = rng.integers(0, len(bodies), rows)
+    age = rng.integers(0, len(AGE_GROUPS), rows)
+    template = TEMPLATES[rng.integers(0, len(TEMPLATES), rows)]
+    subject = subject_offsets[age] + (rng.random(rows) * subject_counts[age]).astype(np.int64)
+    opener = np.where(template[:, 0], rng.integers(1, len(OPENERS), rows), 0)
+    time_of_day = np.where(template[:, 2], rng.integers(1, len(TIMES_OF_DAY), rows), 0)
+    duration = rng.integers(1, 15, rows)
+    duration_phrase = np.where(template[:, 3], duration, 0)
+
+    subject_text = _object_array(subjects)[subject]
+    with_subject = has_subject[phrase]
+    # Subject phrases get the age subject in front ("my toddler has a fever");
+    # the others may get it as a suffix ("ear hurts in my toddler")
+    prefix = np.where(with_subject, subject_text + " ", "")
+    suffix = np.where(~with_subject & template[:, 1], " in " + subject_text, "")
+
+    text = (_object_array(OPENERS)[opener] + prefix + bodies[phrase] + suffix
+            + _object_array(TIMES_OF_DAY)[time_of_day] + _object_array(DURATIONS)[duration_phrase])
+
+    return pd.DataFrame({
+        "voice_input": text.astype(str),
+        "symptom": pd.Categorical.from_codes(symptom_codes[phrase], symptom_names),
+        "age_group": pd.Categorical.from_codes(age, AGE_GROUPS),
+        "confidence": rng.uniform(0.7, 1.0, rows).astype(np.float32),
+        "severity": pd.Categorical.from_codes(rng.integers(0, len(SEVERITIES), rows), SEVERITIES),
+        "duration": duration.astype(np.int16),
+    })
+
+
+def _chunk_plan(n_rows: int, chunk_rows: int, seed: int):
+    """Chunk sizes with one independent child seed each
+
+    Seeds are spawned from a single ``SeedSequence`` so the output depends
+    only on ``seed`` and ``chunk_rows``, not on the number of workers.
+    """
+    n_chunks = max(1, -(-n_rows // chunk_rows))
+    children = np.random.SeedSequence(seed).spawn(n_chunks)
+    sizes = [min(chunk_rows, n_rows - i * chunk_rows) for i in range(n_chunks)]
+    return list(zip(range(n_chunks), sizes, children))
+
+
+def iter_utterances(n_rows: int, seed: int = 42,
+                    chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield utterance chunks in-process"""
+    for _, rows, child in _chunk_plan(n_rows, chunk_rows, seed):
+        yield generate_chunk(rows, child)
+
+
+def generate_utterances(n_rows: int, seed: int = 42,
+                        chunk_rows: int = DEFAULT_CHUNK_ROWS) -> pd.DataFrame:
+    """All ``n_rows`` utterances as one DataFrame"""
+    return pd.concat(iter_utterances(n_rows, seed, chunk_rows), ignore_index=True)
+
+
+def _write_worker(job) -> Dict[str, Any]:
+    index, rows, child, output_dir = job
+    path = Path(output_dir) / f"part-{index:05d}.parquet"
+    generate_chunk(rows, child).to_parquet(path, index=False, engine='pyarrow', compression='zstd')
+    return {'file': path.name, 'rows': rows, 'bytes': path.stat().st_size}
+
+
+def write_utterances(output_dir, n_rows: int, seed: int = 42,
+                     chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                     max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """Write ``n_rows`` utterances as ``part-*.parquet`` files plus a manifest"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for stale in output_dir.glob("part-*.parquet"):
+        stale.unlink()
+
+    plan = _chunk_plan(n_rows, chunk_rows, seed)
+    jobs = [(index, rows, child, str(output_dir)) for index, rows, child in plan]
+    max_workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    if max_workers <= 1 or len(jobs) == 1:
+        parts = list(map(_write_worker, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            parts = list(executor.map(_write_worker, jobs))
+    elapsed = time.perf_counter() - start
+
+    manifest = {
+        'rows': n_rows,
+        'seed': seed,
+        'chunk_rows': chunk_rows,
+        'workers': max_workers,
+        'parts': parts,
+        'bytes_written': sum(part['bytes'] for part in parts),
+        'write_seconds': round(elapsed, 3),
+        'rows_per_second': round(n_rows / elapsed) if elapsed else None
+    }
+    with open(output_dir / "manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"💾 Wrote {n_rows} synthetic utterances to {output_dir} "
+                f"in {elapsed:.2f}s with {max_workers} workers")
+    return manifest
+
+
+def load_utterances(output_dir, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read a directory written by :func:`write_utterances`
+
+    Only the ``part-*.parquet`` files are read, in chunk order; pyarrow cannot
+    read the directory itself because ``manifest.json`` sits next to them.
+    """
+    parts = sorted(Path(output_dir).glob("part-*.parquet"))
+    if not parts:
+        raise FileNotFoundError(f"No part-*.parquet files in {output_dir}")
+    return pd.concat([pd.read_parquet(part, columns=columns, engine='pyarrow') for part in parts],
+                     ignore_index=True)
+
+
+def rows_for_scale(scale: int) -> int:
+    return BASE_ROWS * scale
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Generate synthetic voice utterances")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output-dir', default="processed/synthetic_utterances")
+    args = parser.parse_args()
+
+    for scale in args.scales:
+        write_utterances(Path(args.output_dir) / f"{scale}x", rows_for_scale(scale),
+                         seed=args.seed, max_workers=args.workers)
@@ -12,21 +12,77 @@ import logging
 from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
 from datetime import datetime
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from training_scheduler import training_n_jobs
+from training_progress import progress_reporter, fit_forest_with_progress
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Synthetic voice inputs per symptom, based on real symptoms
+VOICE_PATTERNS = {
+    "fever": [
+        "My child has a fever",
+        "Temperature is high",
+        "Child is running a temperature",
+        "Fever started yesterday",
+        "High fever with chills"
+    ],
+    "cough": [
+        "Child is coughing",
+        "Dry cough at night",
+        "Wet cough with phlegm",
+        "Coughing a lot",
+        "Persistent cough"
+    ],
+    "vomiting": [
+        "Child is throwing up",
+        "Vomiting after meals",
+        "Projectile vomiting",
+        "Nausea and vomiting",
+        "Vomiting multiple times"
+    ],
+    "diarrhea": [
+        "Loose stools",
+        "Watery diarrhea",
+        "Frequent bowel movements",
+        "Diarrhea for days",
+        "Stomach upset with diarrhea"
+    ],
+    "rash": [
+        "Red rash on skin",
+        "Itchy rash",
+        "Rash spreading",
+        "Bumpy rash",
+        "Rash with fever"
+    ],
+    "ear_pain": [
+        "Ear hurts",
+        "Pulling at ear",
+        "Ear infection",
+        "Pain in ear",
+        "Fluid in ear"
+    ]
+}
+
 class VoiceModelTrainer:
-    def __init__(self):
+    def __init__(self, synthetic_rows=None, seed=42):
         self.models_dir = "models"
         self.data_dir = "data"
         self.processed_dir = "processed"
         self.models = {}
         self.vectorizer = None
+        # When set, training data comes from the vectorized synthetic generator
+        self.synthetic_rows = synthetic_rows
+        self.seed = seed
         
     def load_comprehensive_dataset(self):
         """Load the comprehensive pediatric symptom dataset"""
@@ -46,56 +102,16 @@ class VoiceModelTrainer:
         """Create training data for voice-to-symptom conversion"""
         logger.info("Creating voice training data...")
         
-        training_data = []
+        if self.synthetic_rows:
+            from synthetic_utterances import generate_utterances
+            training_data = generate_utterances(self.synthetic_rows, seed=self.seed)
+            logger.info(f"Generated {len(training_data)} synthetic voice training examples")
+            return training_data
         
-        # Generate synthetic voice inputs based on real symptoms
-        voice_patterns = {
-            "fever": [
-                "My child has a fever",
-                "Temperature is high",
-                "Child is running a temperature",
-                "Fever started yesterday",
-                "High fever with chills"
-            ],
-            "cough": [
-                "Child is coughing",
-                "Dry cough at night",
-                "Wet cough with phlegm",
-                "Coughing a lot",
-                "Persistent cough"
-            ],
-            "vomiting": [
-                "Child is throwing up",
-                "Vomiting after meals",
-                "Projectile vomiting",
-                "Nausea and vomiting",
-                "Vomiting multiple times"
-            ],
-            "diarrhea": [
-                "Loose stools",
-                "Watery diarrhea",
-                "Frequent bowel movements",
-                "Diarrhea for days",
-                "Stomach upset with diarrhea"
-            ],
-            "rash": [
-                "Red rash on skin",
-                "Itchy rash",
-                "Rash spreading",
-                "Bumpy rash",
-                "Rash with fever"
-            ],
-            "ear_pain": [
-                "Ear hurts",
-                "Pulling at ear",
-                "Ear infection",
-                "Pain in ear",
-                "Fluid in ear"
-            ]
-        }
+        training_data = []
         
         # Create training examples
-        for symptom, voice_inputs in voice_patterns.items():
+        for symptom, voice_inputs in VOICE_PATTERNS.items():
             for voice_input in voice_inputs:
                 # Create multiple variations
                 for age_group in ["infant", "toddler", "preschool", "school_age", "adolescent"]:
@@ -150,10 +166,11 @@ class VoiceModelTrainer:
         symptom_model = RandomForestClassifier(
             n_estimators=100,
             max_depth=10,
-            random_state=42
+            random_state=42,
+            n_jobs=training_n_jobs()
         )
         
-        symptom_model.fit(X_train, y_train)
+        fit_forest_with_progress(symptom_model, X_train, y_train)
         
         # Evaluate model
         y_pred = symptom_model.predict(X_test)
@@ -180,10 +197,11 @@ class VoiceModelTrainer:
         severity_model = RandomForestClassifier(
             n_estimators=100,
             max_depth=8,
-            random_state=42
+            random_state=42,
+            n_jobs=training_n_jobs()
         )
         
-        severity_model.fit(X_train, y_train)
+        fit_forest_with_progress(severity_model, X_train, y_train)
         
         # Evaluate model
         y_pred = severity_model.predict(X_test)
@@ -197,6 +215,32 @@ class VoiceModelTrainer:
         
         return severity_model, accuracy
     
+    def train_symptom_linear_head(self, X, y_symptom):
+        """Train a linear symptom head for incremental scoring of partial transcripts"""
+        logger.info("Training linear symptom head...")
+        
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y_symptom, test_size=0.2, random_state=42
+        )
+        
+        # Linear in the TF-IDF features, so IncrementalSymptomScorer can update
+        # its logits one n-gram at a time
+        linear_head = LogisticRegression(max_iter=1000, random_state=42)
+        linear_head.fit(X_train, y_train)
+        
+        # Evaluate model
+        y_pred = linear_head.predict(X_test)
+        accuracy = accuracy_score(y_test, y_pred)
+        
+        logger.info(f"Linear symptom head accuracy: {accuracy:.3f}")
+        
+        # Save model
+        model_path = f"{self.models_dir}/symptom_linear_head.pkl"
+        joblib.dump(linear_head, model_path)
+        
+        return linear_head, accuracy
+    
     def create_flutter_integration_code(self):
         """Create Flutter integration code for voice models"""
         logger.info("Creating Flutter integration code...")
@@ -289,39 +333,54 @@ class VoiceModelService {
         os.makedirs(self.models_dir, exist_ok=True)
         os.makedirs(self.processed_dir, exist_ok=True)
         
+        progress = progress_reporter()
+        
         # Load comprehensive dataset
+        progress.phase("load_data")
         dataset = self.load_comprehensive_dataset()
         if dataset is None:
             logger.error("Failed to load comprehensive dataset")
             return False
         
         # Create training data
+        progress.phase("create_training_data")
         training_data = self.create_voice_training_data(dataset)
         
         # Prepare features
+        progress.phase("prepare_features")
         X, y_symptom, y_severity, y_age_group = self.prepare_features(training_data)
         
         # Train models
+        progress.phase("train_symptom_classifier")
         symptom_model, symptom_accuracy = self.train_symptom_classifier(X, y_symptom)
+        progress.metric("symptom_accuracy", symptom_accuracy)
+        progress.phase("train_severity_classifier")
         severity_model, severity_accuracy = self.train_severity_classifier(X, y_severity)
+        progress.metric("severity_accuracy", severity_accuracy)
+        progress.phase("train_symptom_linear_head")
+        linear_head, linear_head_accuracy = self.train_symptom_linear_head(X, y_symptom)
+        progress.metric("symptom_linear_head_accuracy", linear_head_accuracy)
         
         # Save vectorizer
         vectorizer_path = f"{self.models_dir}/vectorizer.pkl"
         joblib.dump(self.vectorizer, vectorizer_path)
         
         # Create Flutter integration
+        progress.phase("flutter_integration")
         self.create_flutter_integration_code()
         
         # Save training results
         results = {
             "timestamp": datetime.now().isoformat(),
-            "models_trained": 2,
+            "models_trained": 3,
             "training_examples": len(training_data),
             "symptom_accuracy": symptom_accuracy,
             "severity_accuracy": severity_accuracy,
+            "symptom_linear_head_accuracy": linear_head_accuracy,
             "model_files": [
                 "symptom_classifier.pkl",
                 "severity_classifier.pkl",
+                "symptom_linear_head.pkl",
                 "vectorizer.pkl"
             ]
         }
@@ -333,5 +392,18 @@ class VoiceModelService {
         return True
 
 if __name__ == "__main__":
-    trainer = VoiceModelTrainer()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train BeforeDoctor voice-to-symptom models")
+    parser.add_argument('--scale', type=int, default=0,
+                        help="Train on synthetic_utterances at this scale (1, 10, 100); 0 keeps the built-in examples")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    synthetic_rows = None
+    if args.scale:
+        from synthetic_utterances import rows_for_scale
+        synthetic_rows = rows_for_scale(args.scale)
+    
+    trainer = VoiceModelTrainer(synthetic_rows=synthetic_rows, seed=args.seed)
     trainer.train() 
\ No newline at end of file
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Resident Voice-to-Symptom Service for BeforeDoctor
+Loads the VoiceModelTrainer vectorizer and classifiers once and serves
+predictions with an utterance cache and micro-batching of concurrent requests
+"""
+
+import re
+import time
+import queue
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+import joblib
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^a-z0-9' ]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_transcript(text: str) -> str:
+    """Canonical form of a speech transcript used for vectorizing and caching
+
+    Unicode is NFKC-folded, case and punctuation are dropped and whitespace
+    is collapsed, so "Fever!!" and "  fever " share one cache entry.
+    """
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = _NON_WORD.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+class UtteranceCache:
+    """Thread-safe bounded LRU of prediction results keyed by normalized text"""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class VoiceSymptomService:
+    """Serves symptom and severity predictions for voice transcripts
+
+    The vectorizer and both classifiers are loaded once from ``models_dir``.
+    Concurrent :meth:`predict` calls are queued and a worker thread scores up
+    to ``max_batch_size`` of them with a single ``transform`` and one
+    ``predict_proba`` per head, waiting at most ``max_wait_ms`` for a batch to
+    fill. Results are memoized per normalized transcript.
+
+    An optional ``vocabulary`` (``symptom_vocabulary.SymptomVocabulary``)
+    corrects misrecognized words before vectorizing.
+    """
+
+    def __init__(self, models_dir: str = "models", cache_size: int = 4096,
+                 max_batch_size: int = 32, max_wait_ms: float = 2.0,
+                 latency_window: int = 10_000, vocabulary=None):
+        models_dir = Path(models_dir)
+        start = time.perf_counter()
+        self.vectorizer = joblib.load(models_dir / "vectorizer.pkl")
+        self.symptom_model = joblib.load(models_dir / "symptom_classifier.pkl")
+        self.severity_model = joblib.load(models_dir / "severity_classifier.pkl")
+        logger.info(f"✅ Voice models loaded from {models_dir} in {time.perf_counter() - start:.3f}s")
+
+        self.vocabulary = vocabulary
+        self.cache = UtteranceCache(cache_size)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.batched_requests = 0
+        self._latencies = deque(maxlen=latency_window)
+        self._latency_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._stopped = threading.Event()
+        # Guards _closed so no request is queued behind the shutdown sentinel
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._serve, name="voice-symptom-batcher", daemon=True)
+        self._worker.start()
+
+    def _score(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """One vectorization and one ``predict_proba`` per head for the whole batch"""
+        if self.vocabulary is not None:
+            texts = [self.vocabulary.correct(text) for text in texts]
+        features = self.vectorizer.transform(texts)
+        results = []
+        heads = [(self.symptom_model, 'symptom'), (self.severity_model, 'severity')]
+        probabilities = [model.predict_proba(features) for model, _ in heads]
+        for row in range(len(texts)):
+            result = {}
+            for (model, name), proba in zip(heads, probabilities):
+                best = int(np.argmax(proba[row]))
+                result[name] = str(model.classes_[best])
+                result[f'{name}_confidence'] = round(float(proba[row, best]), 4)
+            results.append(result)
+        return results
+
+    def _serve(self):
+        while not self._stopped.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if first is None:
+                break
+
+            pending = [first]
+            deadline = time.perf_counter() + self.max_wait
+            while len(pending) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._stopped.set()
+                    break
+                pending.append(item)
+
+            # Identical transcripts in the same batch are scored once
+            futures_by_text: Dict[str, List[Future]] = OrderedDict()
+            for text, future in pending:
+                futures_by_text.setdefault(text, []).append(future)
+            texts = list(futures_by_text)
+
+            try:
+                results = self._score(texts)
+            except Exception as e:
+                logger.error(f"❌ Error scoring voice batch: {e}")
+                for futures in futures_by_text.values():
+                    for future in futures:
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.batched_requests += len(pending)
+            for text, result in zip(texts, results):
+                self.cache.put(text, result)
+                for future in futures_by_text[text]:
+                    future.set_result(result)
+
+        self._fail_pending()
+
+    def _fail_pending(self):
+        """Fail every request still queued after shutdown so no caller waits forever"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                item[1].set_exception(RuntimeError("service closed"))
+
+    def _record_latency(self, start: float):
+        with self._latency_lock:
+            self._latencies.append((time.perf_counter() - start) * 1000)
+
+    def predict(self, transcript: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Symptom and severity for one transcript; safe to call from many threads"""
+        start = time.perf_counter()
+        text = normalize_transcript(transcript)
+        result = self.cache.get(text)
+        if result is None:
+            future: Future = Future()
+            with self._submit_lock:
+                if self._closed:
+                    raise RuntimeError("VoiceSymptomService is closed")
+                self._queue.put((text, future))
+            result = future.result(timeout=timeout)
+        self._record_latency(start)
+        return dict(result, transcript=text)
+
+    def predict_batch(self, transcripts: Sequence[str]) -> List[Dict[str, Any]]:
+        """Score a known batch directly, bypassing the request queue"""
+        start = time.perf_counter()
+        texts = [normalize_transcript(t) for t in transcripts]
+        results: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            cached = self.cache.get(text)
+            if cached is None:
+                missing.append(text)
+            else:
+                results[text] = cached
+        if missing:
+            for text, result in zip(missing, self._score(missing)):
+                self.cache.put(text, result)
+                results[text] = result
+        self._record_latency(start)
+        return [dict(results[text], transcript=text) for text in texts]
+
+    def latency_report(self) -> Dict[str, Any]:
+        """p50/p99 request latency over the recent window, plus batching and cache stats"""
+        with self._latency_lock:
+            latencies = list(self._latencies)
+        report = {
+            'requests': len(latencies),
+            'p50_ms': round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+            'p99_ms': round(float(np.percentile(latencies, 99)), 3) if latencies else None,
+            'batches': self.batches,
+            'mean_batch_size': round(self.batched_requests / self.batches, 2) if self.batches else 0.0,
+            'cache': self.cache.stats()
+        }
+        return report
+
+    def close(self):
+        """Serve requests queued before the call, then fail anything left"""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join(timeout=1.0)
+        if self._worker.is_alive():
+            # Still scoring a batch: stop it picking up more and fail the rest
+            self._stopped.set()
+        self._fail_pending()
+
+    def __enter__(self) -> 'VoiceSymptomService':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def benchmark_service(service: VoiceSymptomService, transcripts: Sequence[str],
+                      concurrency: int = 16, repeats: int = 4) -> Dict[str, Any]:
+    """Fire ``transcripts`` at the service from ``concurrency`` client threads"""
+    requests = list(transcripts) * repeats
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(service.predict, requests))
+    elapsed = time.perf_counter() - start
+
+    report = service.latency_report()
+    report['concurrency'] = concurrency
+    report['throughput_rps'] = round(len(requests) / elapsed, 1) if elapsed else None
+    logger.info(f"⏱️ Voice service benchmark: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    import json
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Benchmark the resident voice-to-symptom service")
+    parser.add_argument('--models-dir', default="models")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--repeats', type=int, default=4)
+    parser.add_argument('--fuzzy', action='store_true', help="Correct transcripts with the symptom vocabulary")
+    parser.add_argument('--scale', type=int, default=0,
+                        help="Query with 1000 x scale synthetic utterances instead of the voice patterns")
+    args = parser.parse_args()
+
+    from voice_model_trainer import VOICE_PATTERNS
+
+    vocabulary = None
+    if args.fuzzy:
+        from symptom_vocabulary import SymptomVocabulary, load_symptom_phrases
+        vocabulary = SymptomVocabulary(load_symptom_phrases())
+
+    if args.scale:
+        from synthetic_utterances import generate_utterances
+        queries = generate_utterances(1000 * args.scale, seed=7)['voice_input'].tolist()
+    else:
+        queries = [phrase for phrases in VOICE_PATTERNS.values() for phrase in phrases]
+    with VoiceSymptomService(args.models_dir, vocabulary=vocabulary) as service:
+        print(json.dumps(benchmark_service(service, queries, args.concurrency, args.repeats), indent=2))